@@ -1,70 +1,120 @@
 import os
+from typing import List, Optional, Tuple
 import typer
-import hashlib
-import zlib
-from git_scratch.utils.index_utils import load_index, save_index, compute_mode
+from git_scratch.utils.object_store import LooseObjectStore, get_object_store
+from git_scratch.utils.bulk_checkin import BulkCheckin, bulk_checkin_threshold
+from git_scratch.utils.index_utils import (
+    IndexTransaction, index_timestamp_ns, index_transaction, is_stat_clean, mode_from_stat, stat_data,
+)
+from git_scratch.utils.fsmonitor import query_fsmonitor
 from git_scratch.utils.gitignore_utils import load_gitignore_spec, is_ignored
+from git_scratch.utils.parallel import ordered_map
 
 app = typer.Typer()
 
-def add_file_to_index(file_path: str):
-    with open(file_path, "rb") as f:
-        content = f.read()
-
-    header = f"blob {len(content)}\0".encode()
-    full_data = header + content
-    oid = hashlib.sha1(full_data).hexdigest()
-
-    obj_dir = os.path.join(".git", "objects", oid[:2])
-    obj_path = os.path.join(obj_dir, oid[2:])
-    os.makedirs(obj_dir, exist_ok=True)
-    with open(obj_path, "wb") as f:
-        f.write(zlib.compress(full_data))
-
-    index = load_index()
-    rel_path = os.path.relpath(file_path)
-    mode = compute_mode(file_path)
+def stage_files(index: IndexTransaction, staged: List[Tuple[str, str, os.stat_result]], verbose: bool = True):
+    """
+    Record each (file path, blob oid, stat taken before hashing) in *index*.
+    """
+    for file_path, oid, st in staged:
+        rel_path = os.path.relpath(file_path)
+        mode = mode_from_stat(st)
 
-    entry = {
-        "mode": mode,
-        "oid": oid,
-        "path": rel_path
-    }
+        index.add({
+            "mode": mode,
+            "oid": oid,
+            "path": rel_path,
+            **stat_data(st),
+        })
+        if verbose:
+            typer.echo(f"{rel_path} added to index with OID {oid} and mode {mode}")
 
-    index = [e for e in index if e["path"] != rel_path]
-    index.append(entry)
+def add_files_to_index(index: IndexTransaction, file_paths: List[str], jobs: Optional[int] = None, verbose: bool = True):
+    """
+    Store the blobs of *file_paths* on a pool of *jobs* threads, then stage
+    them in *index*. With loose objects, from pit.bulkCheckinThreshold
+    files on, the blobs go into a single new pack instead.
+    """
+    # Stat before reading: a change made while hashing then shows up as a
+    # stat mismatch instead of going unnoticed
+    stats = [os.stat(path) for path in file_paths]
+    store = get_object_store()
+    threshold = bulk_checkin_threshold()
+    if isinstance(store, LooseObjectStore) and threshold and len(file_paths) >= threshold:
+        # The index is only updated once the pack has been published
+        with BulkCheckin() as bulk:
+            oids = bulk.add_files(file_paths, jobs)
+    else:
+        with store.transaction():
+            oids = list(ordered_map(store.write_file, file_paths, jobs))
+    stage_files(index, list(zip(file_paths, oids, stats)), verbose)
 
-    save_index(index)
-    typer.echo(f"{rel_path} added to index with OID {oid} and mode {mode}")
+def skip_unchanged(index: IndexTransaction, file_paths: List[str]) -> List[str]:
+    """
+    Drop the tracked files known to match the index: those the fsmonitor
+    daemon has not seen change, or else those whose stat data is clean.
+    """
+    fsmonitor = query_fsmonitor()
+    index_mtime_ns = index_timestamp_ns()
+    changed = []
+    for file_path in file_paths:
+        rel_path = os.path.relpath(file_path)
+        entry = index.get(rel_path)
+        if entry is not None:
+            if fsmonitor is not None and fsmonitor.is_unchanged(rel_path, index_mtime_ns):
+                continue
+            if is_stat_clean(entry, os.stat(file_path), index_mtime_ns):
+                continue
+        changed.append(file_path)
+    return changed
 
 @app.command()
-def add(file_path: str = typer.Argument(..., help="Path to file or directory to add.")):
+def add(
+    file_path: str = typer.Argument(..., help="Path to file or directory to add."),
+    jobs: Optional[int] = typer.Option(None, "-j", "--jobs", help="Number of threads hashing and compressing files (default: number of CPUs).")
+):
     """
-    Adds file(s) to the staging area (.git/index.json), ignoring .gitignore files.
+    Adds file(s) to the staging area (.git/index), ignoring .gitignore files.
     """
     if not os.path.exists(file_path):
         typer.secho(f"Error: {file_path} does not exist.", fg=typer.colors.RED)
         raise typer.Exit(code=1)
+    if jobs is not None and jobs < 1:
+        typer.secho("Error: --jobs must be at least 1.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
 
     spec = load_gitignore_spec()
+    whole_directory = False
 
     if os.path.isfile(file_path):
         rel_path = os.path.relpath(file_path)
-        if not is_ignored(rel_path, spec):
-            add_file_to_index(file_path)
+        to_add = [] if is_ignored(rel_path, spec) else [file_path]
     elif os.path.isdir(file_path):
-        for root, _, files in os.walk(file_path):
+        whole_directory = True
+        to_add = []
+        for root, dirs, files in os.walk(file_path):
+            # Walk in a fixed order so that the index does not depend on the file system
+            dirs.sort()
             if ".git" in root:
                 continue
-            for name in files:
+            for name in sorted(files):
                 full_path = os.path.join(root, name)
                 rel_path = os.path.relpath(full_path)
                 if is_ignored(rel_path, spec):
                     continue
-                add_file_to_index(full_path)
+                to_add.append(full_path)
     else:
         typer.secho("Unsupported file type.", fg=typer.colors.RED)
         raise typer.Exit(code=1)
 
+    try:
+        with index_transaction() as index:
+            if whole_directory:
+                to_add = skip_unchanged(index, to_add)
+            add_files_to_index(index, to_add, jobs)
+    except FileExistsError as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
 if __name__ == "__main__":
     app()
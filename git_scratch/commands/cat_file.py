@@ -1,5 +1,8 @@
+from typing import Iterable, Optional
+
 import typer
-from git_scratch.utils.read_object import read_object
+from git_scratch.utils.read_object import iter_object_ids, read_object, read_object_info
+from git_scratch.utils.refs import AmbiguousRevisionError, RevisionError, resolve_revision
 
 def error(msg: str):
     typer.secho(f"Error: {msg}", fg=typer.colors.RED)
@@ -21,18 +24,71 @@ def pretty_print_tree(content: bytes):
         typer.echo(f"{mode} {type_} {sha}\t{name}")
         i = name_end + 21
 
+def batch(names: Iterable[str], with_content: bool, buffered: bool = True):
+    """
+    Write one record per object name to stdout:
+    "<oid> <type> <size>\\n" followed, with *with_content*, by the raw
+    content and a newline. Unknown names produce "<name> missing".
+    """
+    out = typer.get_binary_stream("stdout")
+    for name in names:
+        try:
+            oid = resolve_revision(name)
+            if with_content:
+                obj_type, content = read_object(oid)
+                size = len(content)
+            else:
+                obj_type, size = read_object_info(oid)
+        except AmbiguousRevisionError:
+            out.write(f"{name} ambiguous\n".encode())
+            continue
+        except (RevisionError, FileNotFoundError, ValueError):
+            out.write(f"{name} missing\n".encode())
+            continue
+
+        out.write(f"{oid} {obj_type} {size}\n".encode())
+        if with_content:
+            out.write(content)
+            out.write(b"\n")
+        if not buffered:
+            out.flush()
+    out.flush()
+
+def _stdin_names() -> Iterable[str]:
+    for line in typer.get_binary_stream("stdin"):
+        name = line.decode().strip()
+        if name:
+            yield name
+
 def cat_file(
-    oid: str = typer.Argument(..., help="SHA-1 object ID to inspect."),
+    oid: Optional[str] = typer.Argument(None, help="SHA-1 object ID to inspect."),
     type_opt: bool = typer.Option(False, "-t", help="Show the type of the object."),
-    pretty: bool = typer.Option(False, "-p", help="Pretty-print the object’s content.")
+    pretty: bool = typer.Option(False, "-p", help="Pretty-print the object’s content."),
+    batch_mode: bool = typer.Option(False, "--batch", help="Print info and content of each object named on stdin."),
+    batch_check: bool = typer.Option(False, "--batch-check", help="Print <oid> <type> <size> of each object named on stdin."),
+    batch_all: bool = typer.Option(False, "--batch-all-objects", help="With --batch/--batch-check, report every loose and packed object."),
+    buffer: bool = typer.Option(True, "--buffer/--no-buffer", help="Buffer batch output instead of flushing after each object."),
 ):
     """
     Show information about a Git object by its OID.
     """
+    if batch_mode or batch_check or batch_all:
+        if oid or type_opt or pretty:
+            error("--batch modes read object names from stdin and take no OID, -t or -p.")
+        if not (batch_mode or batch_check):
+            error("--batch-all-objects requires --batch or --batch-check.")
+        names = iter_object_ids() if batch_all else _stdin_names()
+        try:
+            batch(names, with_content=batch_mode, buffered=buffer)
+        except BrokenPipeError:
+            # The reader went away (e.g. `| head`): stop quietly
+            pass
+        return
+
     if not (type_opt or pretty):
         error("You must specify either -t or -p.")
 
-    if len(oid) != 40 or not all(c in "0123456789abcdef" for c in oid.lower()):
+    if oid is None or len(oid) != 40 or not all(c in "0123456789abcdef" for c in oid.lower()):
         error(f"Invalid OID format: {oid}")
 
     try:
@@ -0,0 +1,37 @@
+import os
+from typing import Optional
+import typer
+
+from git_scratch.utils.commit_graph import CommitGraph, write_commit_graph
+from git_scratch.utils.refs import list_refs
+
+
+def commit_graph(
+    action: str = typer.Argument(..., help="Only 'write' is supported."),
+    changed_paths: Optional[bool] = typer.Option(
+        None, "--changed-paths/--no-changed-paths",
+        help="Store changed-path Bloom filters (default: keep them if the current graph has them)."),
+):
+    """
+    Write .git/objects/info/commit-graph for the commits reachable from
+    every ref, to speed up history walks.
+    """
+    if action != "write":
+        typer.secho(f"Error: unknown action '{action}' (expected 'write').", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    if not os.path.isdir(".git"):
+        typer.secho("Error: .git directory not found.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    try:
+        path = write_commit_graph(sorted(set(list_refs().values())), changed_paths)
+    except (FileNotFoundError, ValueError) as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    if path is None:
+        typer.echo("No commits to write.")
+        return
+    graph = CommitGraph(path)
+    typer.echo(f"Wrote {len(graph)} commit(s) to {path}")
+    graph.close()
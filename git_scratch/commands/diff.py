@@ -0,0 +1,269 @@
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+import typer
+from git_scratch.commands.log import split_paths
+from git_scratch.utils.cli import get_pathspecs
+from git_scratch.utils.config import get_config_bool, get_config_int, get_config_value
+from git_scratch.utils.hash import compute_blob_hash, compute_file_hash
+from git_scratch.utils.index_utils import index_timestamp_ns, is_stat_clean, load_index, mode_from_stat
+from git_scratch.utils.line_diff import ALGORITHMS, DEFAULT_CONTEXT, DiffTooCostly, diff_lines, split_lines, unified_hunks
+from git_scratch.utils.read_object import read_object, read_object_info
+from git_scratch.utils.merge_base import merge_bases
+from git_scratch.utils.refs import GitError, get_head_commit_oid, resolve_revision
+from git_scratch.utils.rev_walk import split_symmetric
+from git_scratch.utils.tree_diff import diff_trees
+from git_scratch.utils.tree_walker import iter_tree, match_pathspecs, normalize_pathspecs, peel_to_tree
+
+# Files bigger than this (pit.diffSizeLimit) are shown as binary
+DEFAULT_DIFF_SIZE_LIMIT = 1024 * 1024
+# So are files whose diff needs more steps than this (pit.diffWorkLimit,
+# 0 for no limit): a few seconds in Python, far more than ordinary edits
+# need, but heavily reordered files stop there
+DEFAULT_DIFF_WORK_LIMIT = 8_000_000
+# Git looks for a NUL byte in this much of a file to call it binary
+BINARY_CHECK_SIZE = 8000
+ABBREV = 7
+GITLINK_MODE = "160000"
+SYMLINK_MODE = "120000"
+
+# (mode, oid) of one side of a file pair, None where the file is missing
+Side = Optional[Tuple[str, str]]
+
+
+class FilePair:
+    """A path whose two versions differ; the new one may be in the working tree."""
+
+    def __init__(self, path: str, old: Side, new: Side, new_on_disk: bool = False):
+        self.path = path
+        self.old = old
+        self.new = new
+        self.new_on_disk = new_on_disk
+
+
+def _worktree_side(entry: dict, index_mtime_ns: int) -> Side:
+    """
+    The (mode, oid) of the working tree file of an index entry. A file
+    whose stat data matches the entry is not read: it has the entry's OID.
+    """
+    path = entry["path"]
+    try:
+        st = os.lstat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    mode = mode_from_stat(st)
+    if is_stat_clean(entry, st, index_mtime_ns):
+        return mode, entry["oid"]
+    if mode == SYMLINK_MODE:
+        return mode, compute_blob_hash(os.readlink(path).encode())[0]
+    return mode, compute_file_hash(path)
+
+
+def _selected(index: List[dict], pathspecs: Optional[List[str]]) -> Iterator[dict]:
+    specs = normalize_pathspecs(pathspecs)
+    for entry in sorted(index, key=lambda e: e["path"].encode()):
+        if specs is None or match_pathspecs(entry["path"], False, specs)[0]:
+            yield entry
+
+
+def index_worktree_pairs(pathspecs: Optional[List[str]] = None) -> Iterator[FilePair]:
+    """Changes in the working tree not yet added to the index (`git diff`)."""
+    index_mtime_ns = index_timestamp_ns()
+    for entry in _selected(load_index(), pathspecs):
+        old = (entry["mode"], entry["oid"])
+        if entry["mode"] == GITLINK_MODE:
+            continue
+        new = _worktree_side(entry, index_mtime_ns)
+        if new != old:
+            yield FilePair(entry["path"], old, new, new_on_disk=True)
+
+
+def tree_pairs(tree: Optional[str], pathspecs: Optional[List[str]] = None,
+               worktree: bool = False) -> Iterator[FilePair]:
+    """
+    Changes from *tree* to the index (`git diff --cached`), or to the
+    working tree files the index tracks with *worktree*.
+    """
+    old: Dict[str, Tuple[str, str]] = {}
+    if tree is not None:
+        old = {path: (mode, oid) for mode, oid, path in iter_tree(tree, recursive=True, pathspecs=pathspecs)}
+    index_mtime_ns = index_timestamp_ns()
+    new: Dict[str, Side] = {}
+    for entry in _selected(load_index(), pathspecs):
+        if worktree and entry["mode"] != GITLINK_MODE:
+            new[entry["path"]] = _worktree_side(entry, index_mtime_ns)
+        else:
+            new[entry["path"]] = (entry["mode"], entry["oid"])
+
+    for path in sorted(old.keys() | new.keys(), key=str.encode):
+        old_side, new_side = old.get(path), new.get(path)
+        # Same blob on both sides: nothing to read
+        if old_side != new_side:
+            yield FilePair(path, old_side, new_side, new_on_disk=worktree and new_side is not None)
+
+
+def commit_pairs(old_tree: str, new_tree: str, pathspecs: Optional[List[str]] = None) -> Iterator[FilePair]:
+    """Changes between two trees; identical subtrees are skipped whole."""
+    for change in diff_trees(old_tree, new_tree, recursive=True, pathspecs=pathspecs):
+        yield FilePair(
+            change["path"],
+            None if change["status"] == "A" else (change["old_mode"], change["old_oid"]),
+            None if change["status"] == "D" else (change["new_mode"], change["new_oid"]),
+        )
+
+
+def _size(side: Tuple[str, str], path: str, on_disk: bool) -> int:
+    if side[0] == GITLINK_MODE:
+        return 0
+    if on_disk:
+        return os.lstat(path).st_size
+    return read_object_info(side[1])[1]
+
+
+def _content(side: Side, path: str, on_disk: bool) -> bytes:
+    if side is None:
+        return b""
+    mode, oid = side
+    if mode == GITLINK_MODE:
+        return f"Subproject commit {oid}\n".encode()
+    if not on_disk:
+        return read_object(oid)[1]
+    if mode == SYMLINK_MODE:
+        return os.readlink(path).encode()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _is_binary(data: bytes) -> bool:
+    return b"\0" in data[:BINARY_CHECK_SIZE]
+
+
+def _file_type(mode: str) -> str:
+    return mode[:-4]
+
+
+def format_pair(pair: FilePair, algorithm: str = "myers", context: int = DEFAULT_CONTEXT,
+                size_limit: int = DEFAULT_DIFF_SIZE_LIMIT, indent_heuristic: bool = True,
+                minimal: bool = False, work_limit: Optional[int] = DEFAULT_DIFF_WORK_LIMIT) -> Iterator[bytes]:
+    """
+    Lazily yield the `git diff` output of a file pair: the header, then
+    one hunk at a time. Files above *size_limit* bytes are not read, and
+    like files whose diff takes more than *work_limit* steps, are
+    reported as binary.
+    """
+    old, new = pair.old, pair.new
+    if old is not None and new is not None and _file_type(old[0]) != _file_type(new[0]):
+        # A file replaced by a symlink (or the reverse) is a deletion and an addition
+        for half in (FilePair(pair.path, old, None), FilePair(pair.path, None, new, pair.new_on_disk)):
+            yield from format_pair(half, algorithm, context, size_limit, indent_heuristic, minimal, work_limit)
+        return
+
+    path = pair.path
+    header = [f"diff --git a/{path} b/{path}"]
+    old_oid = old[1][:ABBREV] if old else "0" * ABBREV
+    new_oid = new[1][:ABBREV] if new else "0" * ABBREV
+    if old is None:
+        header.append(f"new file mode {new[0]}")
+    elif new is None:
+        header.append(f"deleted file mode {old[0]}")
+    elif old[0] != new[0]:
+        header.append(f"old mode {old[0]}")
+        header.append(f"new mode {new[0]}")
+    if old is None or new is None or old[1] != new[1]:
+        mode = f" {old[0]}" if old and new and old[0] == new[0] else ""
+        header.append(f"index {old_oid}..{new_oid}{mode}")
+    yield ("\n".join(header) + "\n").encode()
+    if old is not None and new is not None and old[1] == new[1]:
+        return
+
+    a_name = f"a/{path}" if old else "/dev/null"
+    b_name = f"b/{path}" if new else "/dev/null"
+    too_big = any(side is not None and _size(side, path, on_disk) > size_limit
+                  for side, on_disk in ((old, False), (new, pair.new_on_disk)))
+    if not too_big:
+        a_data = _content(old, path, False)
+        b_data = _content(new, path, pair.new_on_disk)
+    if too_big or _is_binary(a_data) or _is_binary(b_data):
+        yield f"Binary files {a_name} and {b_name} differ\n".encode()
+        return
+
+    a, b = split_lines(a_data), split_lines(b_data)
+    try:
+        blocks = diff_lines(a, b, algorithm, indent_heuristic, minimal, work_limit)
+    except DiffTooCostly:
+        yield f"Binary files {a_name} and {b_name} differ\n".encode()
+        return
+    if not blocks:
+        return
+    yield f"--- {a_name}\n+++ {b_name}\n".encode()
+    yield from unified_hunks(a, b, blocks, context)
+
+
+def diff(
+    ctx: typer.Context,
+    args: Optional[List[str]] = typer.Argument(None, help="Up to two commits (or a..b, a...b) to compare, then optional paths, after '--'."),
+    cached: bool = typer.Option(False, "--cached", "--staged", help="Compare the index with HEAD (or the given commit)."),
+    unified: int = typer.Option(DEFAULT_CONTEXT, "-U", "--unified", help="Lines of context around each change."),
+    histogram: bool = typer.Option(False, "--histogram", help="Use the histogram diff algorithm."),
+    diff_algorithm: Optional[str] = typer.Option(None, "--diff-algorithm", help="myers (default) or histogram."),
+    minimal: bool = typer.Option(False, "--minimal", help="Spend extra time to make the smallest possible diff."),
+    indent_heuristic: Optional[bool] = typer.Option(None, "--indent-heuristic/--no-indent-heuristic", help="Place ambiguous changes by indentation (default: pit.diffIndentHeuristic, on)."),
+):
+    """
+    Show changes as unified diffs, as `git diff`: working tree vs index,
+    index vs HEAD with --cached, or between two commits.
+    The algorithm defaults to pit.diffAlgorithm; files bigger than
+    pit.diffSizeLimit bytes, or too costly to diff (pit.diffWorkLimit),
+    are reported as binary.
+    """
+    revs = list(args or [])
+    pathspecs = get_pathspecs(ctx)
+    try:
+        if pathspecs is None:
+            revs, pathspecs = split_paths(revs)
+        if len(revs) == 1 and "..." in revs[0]:
+            # a...b: the changes on b since it forked from a
+            left, right = split_symmetric(revs[0])
+            bases = merge_bases(left, [right])
+            if not bases:
+                raise ValueError(f"{revs[0]}: no merge base")
+            revs = [bases[0], right]
+        elif len(revs) == 1 and ".." in revs[0]:
+            left, _, right = revs[0].partition("..")
+            revs = [left or "HEAD", right or "HEAD"]
+        algorithm = "histogram" if histogram else diff_algorithm or get_config_value("pit", "diffAlgorithm", "myers")
+        algorithm = algorithm.lower()
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown diff algorithm '{algorithm}'")
+        size_limit = get_config_int("pit", "diffSizeLimit", DEFAULT_DIFF_SIZE_LIMIT)
+        work_limit = get_config_int("pit", "diffWorkLimit", DEFAULT_DIFF_WORK_LIMIT) or None
+        if indent_heuristic is None:
+            indent_heuristic = get_config_bool("pit", "diffIndentHeuristic", True)
+
+        if len(revs) > 2 or (cached and len(revs) > 1):
+            raise ValueError("too many revisions")
+        trees = [peel_to_tree(resolve_revision(rev)) for rev in revs]
+        if len(trees) == 2:
+            pairs = commit_pairs(trees[0], trees[1], pathspecs)
+        elif trees:
+            pairs = tree_pairs(trees[0], pathspecs, worktree=not cached)
+        elif cached:
+            head = get_head_commit_oid()
+            pairs = tree_pairs(peel_to_tree(head) if head else None, pathspecs)
+        else:
+            pairs = index_worktree_pairs(pathspecs)
+    except (GitError, ValueError, FileNotFoundError) as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    out = typer.get_binary_stream("stdout")
+    try:
+        for pair in pairs:
+            for chunk in format_pair(pair, algorithm, max(unified, 0), size_limit, indent_heuristic, minimal, work_limit):
+                out.write(chunk)
+        out.flush()
+    except BrokenPipeError:
+        # `pit diff | head`: the reader is gone, stop diffing
+        try:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+        except (OSError, ValueError):
+            pass
@@ -0,0 +1,29 @@
+from typing import List
+import typer
+from git_scratch.utils.refs import RevisionError, resolve_revision
+from git_scratch.utils.tree_diff import diff_trees, format_raw
+from git_scratch.utils.tree_walker import peel_to_tree
+
+
+def diff_tree(
+    args: List[str] = typer.Argument(..., help="Two tree-ish (tree, commit, branch...) followed by optional paths."),
+    recursive: bool = typer.Option(False, "-r", help="Recurse into subtrees."),
+    show_trees: bool = typer.Option(False, "-t", help="Show the tree entries themselves, even when recursing (implies -r)."),
+):
+    """
+    Compare the content and mode of the blobs found in two trees.
+    """
+    if len(args) < 2:
+        typer.secho("Error: diff-tree needs two tree-ish arguments.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    trees = []
+    for rev in args[:2]:
+        try:
+            trees.append(peel_to_tree(resolve_revision(rev)))
+        except (RevisionError, ValueError, FileNotFoundError) as e:
+            typer.secho(f"Error: {rev}: {e}", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+
+    for change in diff_trees(trees[0], trees[1], recursive or show_trees, args[2:], show_trees):
+        typer.echo(format_raw(change))
@@ -0,0 +1,72 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+import typer
+
+from git_scratch.utils.fsmonitor import FSMonitorDaemon, fsmonitor_request
+
+START_TIMEOUT = 5.0
+
+
+def error(message: str):
+    typer.secho(f"Error: {message}", fg=typer.colors.RED)
+    raise typer.Exit(code=1)
+
+
+def _run():
+    # Let `kill` go through the cleanup of the socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        FSMonitorDaemon().serve()
+    except OSError as e:
+        error(str(e))
+
+
+def _start():
+    if fsmonitor_request("ping") is not None:
+        typer.echo("fsmonitor daemon is already running.")
+        return
+    process = subprocess.Popen(
+        [sys.executable, "-m", "git_scratch.main", "fsmonitor", "run"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if fsmonitor_request("ping") is not None:
+            typer.echo(f"fsmonitor daemon started (pid {process.pid}).")
+            return
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    error("the fsmonitor daemon did not start (run 'pit fsmonitor run' to see why).")
+
+
+def fsmonitor(
+    action: str = typer.Argument(..., help="'start', 'stop', 'status', or 'run' in the foreground."),
+):
+    """
+    Manage the inotify daemon that tells status and add which paths changed.
+    It is only queried when pit.fsmonitor is true.
+    """
+    if not os.path.isdir(".git"):
+        error("not a git repository (no .git directory here).")
+
+    if action == "run":
+        _run()
+    elif action == "start":
+        _start()
+    elif action == "stop":
+        if fsmonitor_request("quit") is None:
+            error("fsmonitor daemon is not running.")
+        typer.echo("fsmonitor daemon stopped.")
+    elif action == "status":
+        info = fsmonitor_request("ping")
+        if info is None:
+            typer.echo("fsmonitor daemon is not running.")
+            raise typer.Exit(code=1)
+        typer.echo(f"fsmonitor daemon is watching {info['root']} (pid {info['pid']}, {info['watches']} directories).")
+    else:
+        error(f"unknown action '{action}' (expected 'start', 'stop', 'status' or 'run').")
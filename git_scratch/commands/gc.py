@@ -0,0 +1,20 @@
+import typer
+
+from git_scratch.commands.repack import repack
+from git_scratch.utils.commit_graph import write_commit_graph
+from git_scratch.utils.refs import list_refs
+from git_scratch.utils.pack_objects import DEFAULT_DEPTH, DEFAULT_WINDOW
+
+
+def gc(
+    aggressive: bool = typer.Option(False, "--aggressive", help="Search deltas harder, at the cost of time."),
+):
+    """
+    Cleanup the repository: pack reachable objects (with reachability
+    bitmaps) and drop the loose copies, then refresh the commit-graph.
+    """
+    if aggressive:
+        repack(delete=True, window=250, depth=DEFAULT_DEPTH, write_bitmap_index=True)
+    else:
+        repack(delete=True, window=DEFAULT_WINDOW, depth=DEFAULT_DEPTH, write_bitmap_index=True)
+    write_commit_graph(sorted(set(list_refs().values())))
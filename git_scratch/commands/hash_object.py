@@ -1,7 +1,7 @@
 import os
 import typer
-from git_scratch.utils.object import write_object
-from git_scratch.utils.hash import compute_blob_hash
+from git_scratch.utils.object import write_blob_from_file
+from git_scratch.utils.hash import compute_file_hash
 
 
 def hash_object(
@@ -15,11 +15,9 @@ def hash_object(
         typer.secho(f"Error: {file_path} is not a valid file.", fg=typer.colors.RED)
         raise typer.Exit(code=1)
 
-    with open(file_path, 'rb') as f:
-        content = f.read()
-        
-    oid, _ = compute_blob_hash(content)
     if write:
-        write_object(content, "blob")
+        oid = write_blob_from_file(file_path)
+    else:
+        oid = compute_file_hash(file_path)
 
     typer.echo(oid)
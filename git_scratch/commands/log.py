@@ -1,7 +1,12 @@
-import typer
+import itertools
 import os
-import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+import typer
+from git_scratch.utils.cli import get_pathspecs
 from git_scratch.utils.read_object import read_object
+from git_scratch.utils.refs import GitError, RevisionError, all_ref_tips, get_head_commit_oid
+from git_scratch.utils.rev_walk import parse_date, resolve_commits, walk_revisions
 
 def parse_commit(content: bytes) -> dict:
     """
@@ -10,7 +15,7 @@ def parse_commit(content: bytes) -> dict:
     lines = content.decode().split("\n")
     commit_data = {
         "tree": None,
-        "parent": None,
+        "parents": [],
         "author": None,
         "committer": None,
         "message": ""
@@ -22,7 +27,7 @@ def parse_commit(content: bytes) -> dict:
         if line.startswith("tree "):
             commit_data["tree"] = line.split(" ")[1]
         elif line.startswith("parent "):
-            commit_data["parent"] = line.split(" ")[1]
+            commit_data["parents"].append(line.split(" ")[1])
         elif line.startswith("author "):
             commit_data["author"] = line[7:]
         elif line.startswith("committer "):
@@ -40,63 +45,110 @@ def format_git_date(timestamp: str, tz_offset: str) -> str:
     """
     Convertit un timestamp UNIX + offset en format git log.
     """
-    t = time.localtime(int(timestamp))
-    # Format identique à `git log`
-    return time.strftime("%a %b %d %H:%M:%S %Y", t) + f" {tz_offset}"
+    # La date est affichée dans le fuseau de l'auteur, comme `git log`
+    sign = -1 if tz_offset.startswith("-") else 1
+    offset = timedelta(hours=int(tz_offset[1:3]), minutes=int(tz_offset[3:5])) * sign
+    t = datetime.fromtimestamp(int(timestamp), timezone(offset))
+    return t.strftime("%a %b ") + f"{t.day} " + t.strftime("%H:%M:%S %Y") + f" {tz_offset}"
 
 
-def log():
+def format_commit(oid: str, content: bytes, parents: List[str], oneline: bool) -> str:
     """
-    Réimplémente `git log` en lisant les commits dans .git/objects.
+    Format a commit the way `git log` (or `git log --oneline`) shows it.
     """
-    try:
-        head_path = os.path.join(".git", "HEAD")
-        with open(head_path) as f:
-            head_ref = f.read().strip()
-    except FileNotFoundError:
-        typer.secho(f"File not found: {head_path}", fg=typer.colors.RED)
-        return
+    commit = parse_commit(content)
+    if oneline:
+        return f"{oid[:7]} {commit['message'].split(chr(10), 1)[0]}\n"
+
+    # Récupère l'auteur + timestamp
+    author_name, timestamp, tz_offset = commit["author"].rsplit(" ", 2)
+    lines = [f"commit {oid}"]
+    if len(parents) > 1:
+        lines.append("Merge: " + " ".join(p[:7] for p in parents))
+    lines.append(f"Author: {author_name}")
+    lines.append(f"Date:   {format_git_date(timestamp, tz_offset)}")
+    lines.append("")
+    lines.extend(f"    {line}" for line in commit["message"].split("\n"))
+    return "\n".join(lines) + "\n"
+
+
+def split_paths(args: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split "<revisions> <paths>" given without "--": the first argument that
+    is not a revision but exists in the working tree starts the paths.
 
-    if head_ref.startswith("ref:"):
-        ref_path = os.path.join(".git", head_ref[5:])
+    Raises:
+        RevisionError: If an argument is neither a revision nor a path.
+    """
+    for i, arg in enumerate(args):
         try:
-            with open(ref_path) as f:
-                oid = f.read().strip()
-        except FileNotFoundError:
-            typer.secho(f"File not found: {ref_path}", fg=typer.colors.RED)
-            return
-    else:
-        oid = head_ref
-
-    if not oid:
-        typer.secho("No commits found or repository not initialized.", fg=typer.colors.RED)
-        return
-
-    while oid:
+            resolve_commits([arg])
+        except RevisionError:
+            if not os.path.exists(arg):
+                raise
+            for path in args[i:]:
+                if not os.path.exists(path):
+                    raise RevisionError(f"ambiguous argument '{path}': unknown revision or path not in the working tree")
+            return args[:i], args[i:]
+    return args, []
+
+
+def log(
+    ctx: typer.Context,
+    revisions: Optional[List[str]] = typer.Argument(None, help="Commits to start from (default: HEAD); ^rev or a..b exclude history. Paths may follow, after '--'."),
+    max_count: Optional[int] = typer.Option(None, "-n", "--max-count", help="Show at most this many commits."),
+    oneline: bool = typer.Option(False, "--oneline", help="Show each commit as '<short oid> <subject>'."),
+    all_refs: bool = typer.Option(False, "--all", help="Start from every ref."),
+    since: Optional[str] = typer.Option(None, "--since", "--after", help="Only commits more recent than this date."),
+    until: Optional[str] = typer.Option(None, "--until", "--before", help="Only commits older than this date."),
+):
+    """
+    Réimplémente `git log` en lisant les commits dans .git/objects.
+    Commits are shown newest committer date first, merges included.
+    With paths, only the commits changing them are shown.
+    """
+    revs = list(revisions or [])
+    pathspecs = get_pathspecs(ctx)
+    try:
+        if pathspecs is None:
+            revs, pathspecs = split_paths(revs)
+        if all_refs:
+            revs.extend(all_ref_tips())
+        if not revs:
+            head = get_head_commit_oid()
+            if not head:
+                typer.secho("No commits found or repository not initialized.", fg=typer.colors.RED)
+                return
+            revs = [head]
+        includes, excludes = resolve_commits(revs)
+        since_ts = parse_date(since) if since else None
+        until_ts = parse_date(until) if until else None
+    except (GitError, ValueError, FileNotFoundError) as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    commits = walk_revisions(includes, excludes, since_ts, until_ts, pathspecs)
+    if max_count is not None:
+        commits = itertools.islice(commits, max(max_count, 0))
+
+    out = typer.get_binary_stream("stdout")
+    first = True
+    try:
+        for info in commits:
+            try:
+                _, content = read_object(info.oid)
+            except FileNotFoundError:
+                typer.secho(f"Object {info.oid} not found in .git/objects", fg=typer.colors.RED)
+                raise typer.Exit(code=1)
+            text = format_commit(info.oid, content, info.parents, oneline)
+            if not first and not oneline:
+                text = "\n" + text
+            first = False
+            out.write(text.encode())
+        out.flush()
+    except BrokenPipeError:
+        # `pit log | head`: the reader is gone, stop walking
         try:
-            obj_type, content = read_object(oid)
-        except FileNotFoundError:
-            typer.secho(f"Object {oid} not found in .git/objects", fg=typer.colors.RED)
-            return
-
-        if obj_type != "commit":
-            typer.secho(f"Expected commit, got {obj_type}", fg=typer.colors.RED)
-            return
-
-        commit = parse_commit(content)
-
-        # Récupère l'auteur + timestamp
-        author_parts = commit["author"].rsplit(" ", 2)
-        author_name = author_parts[0]
-        timestamp = author_parts[1]
-        tz_offset = author_parts[2]
-
-        date_str = format_git_date(timestamp, tz_offset)
-
-        # Format identique à git log
-        typer.echo(f"commit {oid}")
-        typer.echo(f"Author: {author_name}")
-        typer.echo(f"Date:   {date_str}\n")
-        typer.echo(f"    {commit['message']}\n")
-
-        oid = commit["parent"]
+            os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+        except (OSError, ValueError):
+            pass
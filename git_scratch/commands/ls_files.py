@@ -1,25 +1,20 @@
-
-import os
-import json
 import typer
-
-INDEX_PATH = os.path.join(".git", "index.json")
+from git_scratch.utils.index_utils import get_index_path, get_legacy_index_path, load_index
 
 
 def ls_files():
     """
     List all staged files from the index.
     """
-    if not os.path.exists(INDEX_PATH):
+    if not get_index_path().exists() and not get_legacy_index_path().exists():
         typer.secho("Error: index file not found.", fg=typer.colors.RED)
         raise typer.Exit(code=1)
 
-    with open(INDEX_PATH, "r") as f:
-        try:
-            entries = json.load(f)
-        except json.JSONDecodeError:
-            typer.secho("Error: index file is not valid JSON.", fg=typer.colors.RED)
-            raise typer.Exit(code=1)
+    try:
+        entries = load_index()
+    except ValueError as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
 
     for entry in entries:
         typer.echo(entry["path"])
@@ -1,15 +1,40 @@
-
+from typing import List
 import typer
 from git_scratch.utils.read_object import read_object
+from git_scratch.utils.refs import AmbiguousRevisionError, RevisionError, resolve_revision
+from git_scratch.utils.tree_walker import iter_tree
+
+# Lines are written in batches rather than one echo per entry
+FLUSH_SIZE = 64 * 1024
 
 def ls_tree(
-    oid: str = typer.Argument(..., help="OID of the tree object")
+    args: List[str] = typer.Argument(..., help="Tree-ish (tree or commit OID, branch...) followed by optional paths."),
+    recursive: bool = typer.Option(False, "-r", help="Recurse into subtrees."),
+    show_trees: bool = typer.Option(False, "-t", help="Show the trees walked through, even when recursing."),
+    name_only: bool = typer.Option(False, "--name-only", help="List only the paths."),
+    null: bool = typer.Option(False, "-z", help="Terminate lines with NUL instead of newline."),
 ):
     """
     List the contents of a Git tree object.
     """
+    oid, paths = args[0], args[1:]
+    try:
+        oid = resolve_revision(oid)
+    except AmbiguousRevisionError as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    except RevisionError:
+        pass  # read as a raw object name below
+
     try:
         obj_type, content = read_object(oid)
+        # A commit lists its root tree
+        while obj_type == "tag":
+            oid = content.split(b"\n", 1)[0][len(b"object "):].decode()
+            obj_type, content = read_object(oid)
+        if obj_type == "commit":
+            oid = content.split(b"\n", 1)[0][len(b"tree "):].decode()
+            obj_type, content = read_object(oid)
     except FileNotFoundError:
         typer.secho(f"Error: Object {oid} not found.", fg=typer.colors.RED)
         raise typer.Exit(code=1)
@@ -18,22 +43,21 @@ def ls_tree(
         typer.secho(f"Error: Object {oid} is not a tree.", fg=typer.colors.RED)
         raise typer.Exit(code=1)
 
-    i = 0
-    while i < len(content):
-        # Mode (e.g., 100644 or 40000)
-        end_mode = content.index(b' ', i)
-        mode = content[i:end_mode].decode()
-        i = end_mode + 1
-
-        # Filename
-        end_path = content.index(b'\x00', i)
-        name = content[i:end_path].decode()
-        i = end_path + 1
-
-        # Raw SHA (20 bytes)
-        oid_raw = content[i:i+20]
-        oid_hex = oid_raw.hex()
-        i += 20
-        
-        obj_type = "blob" if mode.startswith("10") else "tree"
-        typer.echo(f"{mode} {obj_type} {oid_hex}\t{name}")
+    out = typer.get_binary_stream("stdout")
+    end = "\0" if null else "\n"
+    buffer = []
+    size = 0
+    for mode, entry_oid, path in iter_tree(oid, recursive, show_trees, paths, content):
+        if name_only:
+            line = path + end
+        else:
+            entry_type = "tree" if mode == "40000" else "commit" if mode == "160000" else "blob"
+            line = f"{int(mode, 8):06o} {entry_type} {entry_oid}\t{path}{end}"
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            out.write("".join(buffer).encode())
+            buffer.clear()
+            size = 0
+    out.write("".join(buffer).encode())
+    out.flush()
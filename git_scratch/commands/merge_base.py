@@ -0,0 +1,32 @@
+from typing import List
+import typer
+from git_scratch.utils.merge_base import is_ancestor, merge_bases
+from git_scratch.utils.refs import GitError
+from git_scratch.utils.rev_walk import resolve_commit
+
+
+def merge_base(
+    commits: List[str] = typer.Argument(..., help="Two or more commits; the others are merged into the first."),
+    all_bases: bool = typer.Option(False, "--all", help="Output all the merge bases, not just one."),
+    ancestor: bool = typer.Option(False, "--is-ancestor", help="Exit with 0 if the first commit is an ancestor of the second, 1 otherwise."),
+):
+    """
+    Find the best common ancestor(s) of commits, as `git merge-base`.
+    """
+    if len(commits) < 2 or (ancestor and len(commits) != 2):
+        typer.secho("Error: merge-base needs two commits.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+    try:
+        oids = [resolve_commit(name) for name in commits]
+    except (GitError, ValueError, FileNotFoundError) as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    if ancestor:
+        raise typer.Exit(code=0 if is_ancestor(oids[0], oids[1]) else 1)
+
+    bases = merge_bases(oids[0], oids[1:], all_bases)
+    if not bases:
+        raise typer.Exit(code=1)
+    for oid in bases:
+        typer.echo(oid)
@@ -0,0 +1,27 @@
+import os
+import typer
+
+from git_scratch.utils.midx import write_multi_pack_index
+from git_scratch.utils.pack import PACK_DIR, close_packs
+
+
+def multi_pack_index(
+    action: str = typer.Argument(..., help="Only 'write' is supported."),
+):
+    """
+    Write a multi-pack-index covering every pack in .git/objects/pack.
+    """
+    if action != "write":
+        typer.secho(f"Error: unknown action '{action}' (expected 'write').", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    if not os.path.isdir(PACK_DIR):
+        typer.secho("Error: .git/objects/pack not found.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    close_packs()
+    path = write_multi_pack_index(PACK_DIR)
+    if path is None:
+        typer.echo("No packs to index.")
+    else:
+        typer.echo(path)
@@ -0,0 +1,93 @@
+import os
+from typing import Optional
+import typer
+
+from git_scratch.utils.bitmap import close_bitmaps, write_bitmap
+from git_scratch.utils.config import get_config_bool
+from git_scratch.utils.index_utils import load_index
+from git_scratch.utils.midx import write_multi_pack_index
+from git_scratch.utils.pack import PACK_DIR, close_packs, list_packs
+from git_scratch.utils.pack_objects import (
+    DEFAULT_DEPTH,
+    DEFAULT_WINDOW,
+    collect_objects,
+    find_deltas,
+    remove_loose_objects,
+    write_pack,
+)
+from git_scratch.utils.refs import list_refs
+
+
+def _remove_redundant_packs(new_pack: str, packed: set) -> int:
+    """
+    Delete the packs, other than *new_pack*, whose objects are all in *packed*.
+    """
+    redundant = []
+    for pack in list_packs():
+        if os.path.samefile(pack.path, new_pack):
+            continue
+        if all(oid.hex() in packed for oid in pack.index.iter_oids()):
+            redundant.append(pack.path[:-len(".pack")])
+
+    close_packs()
+    close_bitmaps()
+    for base in redundant:
+        for ext in (".bitmap", ".idx", ".pack"):
+            if os.path.exists(base + ext):
+                os.remove(base + ext)
+    return len(redundant)
+
+
+def repack(
+    delete: bool = typer.Option(False, "-d", help="Remove loose objects and packs made redundant by the new pack."),
+    window: int = typer.Option(DEFAULT_WINDOW, "--window", help="Number of objects considered as delta bases."),
+    depth: int = typer.Option(DEFAULT_DEPTH, "--depth", help="Maximum delta chain length."),
+    write_bitmap_index: Optional[bool] = typer.Option(
+        None, "--write-bitmap-index/--no-write-bitmap-index", "-b",
+        help="Write reachability bitmaps next to the pack (default: pit.writeBitmaps, false)."),
+):
+    """
+    Pack every reachable object into a single delta-compressed packfile.
+    """
+    if not os.path.isdir(".git"):
+        typer.secho("Error: .git directory not found.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    tips = sorted(set(list_refs().values()))
+    staged = [entry["oid"] for entry in load_index()]
+
+    try:
+        objects = collect_objects(tips, staged)
+    except (FileNotFoundError, ValueError) as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    if not objects:
+        typer.echo("Nothing new to pack.")
+        return
+
+    typer.echo(f"Enumerating objects: {len(objects)}, done.")
+    deltas = find_deltas(objects, window=window, depth=depth)
+    pack_path = write_pack(objects)
+    typer.echo(f"Total {len(objects)} (delta {deltas})")
+
+    if delete:
+        packed = {obj.oid for obj in objects}
+        loose = remove_loose_objects(packed)
+        packs = _remove_redundant_packs(pack_path, packed)
+        typer.echo(f"Removed {loose} loose object(s) and {packs} redundant pack(s).")
+
+    close_packs()
+    write_multi_pack_index(PACK_DIR)
+
+    if write_bitmap_index is None:
+        try:
+            write_bitmap_index = get_config_bool("pit", "writeBitmaps", False)
+        except ValueError as e:
+            print(f"[warn] {e}")
+            write_bitmap_index = False
+    if write_bitmap_index:
+        if write_bitmap(pack_path, tips) is None:
+            typer.secho("[warn] could not map every reachable object in the pack, no bitmap written.", fg=typer.colors.YELLOW)
+
+    typer.echo(os.path.basename(pack_path))
@@ -6,8 +6,9 @@ import typer
 
 from git_scratch.utils.read_object import read_object
 from git_scratch.utils.refs import update_head_to_commit
-from git_scratch.utils.index_utils import save_index
-from git_scratch.utils.tree_walker import entries_from_tree
+from git_scratch.utils.cache_tree import CacheTree
+from git_scratch.utils.index_utils import index_transaction
+from git_scratch.utils.tree_walker import entries_from_tree, iter_tree
 
 _HEX = set("0123456789abcdef")
 
@@ -55,10 +56,10 @@ def _get_tree_oid(commit_oid: str) -> str:
 
 def _checkout_tree(tree_oid: str, dest_dir: str = ".") -> None:
     """Overwrite *dest_dir* with the blobs of *tree_oid* (tracked files only)."""
-    for entry in entries_from_tree(tree_oid):
-        file_path = Path(dest_dir) / entry["path"]
+    for _, oid, path in iter_tree(tree_oid, recursive=True):
+        file_path = Path(dest_dir) / path
         file_path.parent.mkdir(parents=True, exist_ok=True)
-        _, blob_content = read_object(entry["oid"])
+        _, blob_content = read_object(oid)
         with open(file_path, "wb") as f:
             f.write(blob_content)
 
@@ -89,7 +90,13 @@ def reset(
     # mixed
     tree_oid = _get_tree_oid(target_oid)
     if mode in {"mixed", "hard"}:
-        save_index(entries_from_tree(tree_oid))
+        try:
+            with index_transaction() as index:
+                # Every directory of the new index matches a tree of the commit
+                index.replace(entries_from_tree(tree_oid), CacheTree.from_tree(tree_oid))
+        except FileExistsError as e:
+            typer.secho(f"Error: {e}", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
 
     # hard
     if mode == "hard":
@@ -0,0 +1,126 @@
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import typer
+from git_scratch.utils.bitmap import get_pack_bitmap
+from git_scratch.utils.commit_graph import CommitInfo, read_commit_info
+from git_scratch.utils.merge_base import ahead_behind, merge_bases
+from git_scratch.utils.read_object import read_object
+from git_scratch.utils.refs import GitError, all_ref_tips, resolve_revision
+from git_scratch.utils.rev_walk import list_objects, resolve_commits, split_symmetric, walk_revisions
+
+
+def rev_list(
+    revisions: Optional[List[str]] = typer.Argument(None, help="Commits to list the history of; ^rev, a..b and a...b exclude history."),
+    count: bool = typer.Option(False, "--count", help="Print the number of commits (and objects, with --objects) instead of listing them."),
+    objects: bool = typer.Option(False, "--objects", help="Also list the trees and blobs of the commits, with their path."),
+    use_bitmap_index: bool = typer.Option(False, "--use-bitmap-index", help="Answer from the pack's reachability bitmaps (objects are then listed without paths)."),
+    left_right: bool = typer.Option(False, "--left-right", help="With a...b, mark which side each commit is reachable from ('<' or '>')."),
+    all_refs: bool = typer.Option(False, "--all", help="Start from every ref."),
+):
+    """
+    List commits in reverse chronological order, as `git rev-list`.
+    Counts use the reachability bitmaps whenever the packs have some.
+    """
+    revs = list(revisions or [])
+    if all_refs:
+        revs.extend(all_ref_tips())
+    if not revs:
+        typer.secho("Error: no revision given.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    symmetric = [rev for rev in revs if "..." in rev]
+    if left_right and (len(revs) != 1 or not symmetric):
+        typer.secho("Error: --left-right needs a single 'a...b' range.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    try:
+        if left_right:
+            left, right = split_symmetric(symmetric[0])
+            if count:
+                # Ahead/behind: one paint-down walk, no commit listed
+                typer.echo("%d\t%d" % ahead_behind(left, right))
+                return
+            bases = merge_bases(left, [right], all_bases=True)
+            left_side = {info.oid for info in walk_revisions([left], bases + [right])}
+            includes, excludes = [left, right], bases
+        else:
+            includes, excludes = resolve_commits(revs)
+    except (GitError, ValueError, FileNotFoundError) as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    tags = _tag_tips(revs) if objects else []
+    bitmap = get_pack_bitmap() if (count or use_bitmap_index) and not left_right else None
+    if bitmap is not None:
+        # Everything reachable from the tips, minus what the exclusions reach
+        bits = bitmap.reachable(includes + [oid for oid, _ in tags])
+        if excludes:
+            bits &= ~bitmap.reachable(excludes)
+        if not objects:
+            bits &= bitmap.types["commit"]
+        if count:
+            typer.echo(str(bin(bits).count("1")))
+            return
+        lines = (f"{oid}\n" for oid, _ in bitmap.iter_objects(bits))
+    else:
+        commits = walk_revisions(includes, excludes)
+        if objects or count:
+            commits = list(commits)
+        if count:
+            total = len(commits) + len(tags)
+            if objects:
+                total += sum(1 for _ in list_objects(commits, _excluded_trees(commits, excludes)))
+            typer.echo(str(total))
+            return
+        lines = _list_lines(commits, excludes, objects, tags, left_side if left_right else None)
+
+    out = typer.get_binary_stream("stdout")
+    try:
+        for line in lines:
+            out.write(line.encode())
+        out.flush()
+    except BrokenPipeError:
+        try:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+        except (OSError, ValueError):
+            pass
+
+
+def _excluded_trees(commits: List[CommitInfo], excludes: List[str]) -> List[str]:
+    # The excluded tips and the excluded parents of listed commits
+    listed = {info.oid for info in commits}
+    edges = set(excludes)
+    for info in commits:
+        edges.update(p for p in info.parents if p not in listed)
+    return [read_commit_info(oid).tree for oid in sorted(edges)]
+
+
+def _tag_tips(revs: List[str]) -> List[Tuple[str, str]]:
+    """
+    The annotated tags among the included revisions, nested ones too, as
+    (oid, tag name): `--objects` lists them between commits and trees.
+    """
+    tags: Dict[str, str] = {}
+    for rev in revs:
+        if rev.startswith("^") or ".." in rev:
+            continue
+        oid = resolve_revision(rev)
+        obj_type, content = read_object(oid)
+        while obj_type == "tag" and oid not in tags:
+            header = dict(line.split(" ", 1) for line in content.split(b"\n\n", 1)[0].decode().split("\n"))
+            tags[oid] = header["tag"]
+            oid = header["object"]
+            obj_type, content = read_object(oid)
+    return list(tags.items())
+
+
+def _list_lines(commits: Iterable[CommitInfo], excludes: List[str], objects: bool,
+                tags: List[Tuple[str, str]], left_side: Optional[Set[str]]) -> Iterator[str]:
+    for info in commits:
+        mark = "" if left_side is None else "<" if info.oid in left_side else ">"
+        yield f"{mark}{info.oid}\n"
+    for oid, name in tags:
+        yield f"{oid} {name}\n"
+    if objects:
+        for oid, path in list_objects(commits, _excluded_trees(commits, excludes)):
+            yield f"{oid} {path}\n"
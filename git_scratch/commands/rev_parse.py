@@ -2,6 +2,8 @@ import os
 import re
 import pathlib
 import typer
+from git_scratch.utils.object_store import get_object_store
+from git_scratch.utils.read_object import iter_object_ids
 
 
 def rev_parse(
@@ -27,7 +29,7 @@ def rev_parse(
 
     # check if an object exists
     def object_exists(sha: str) -> bool:
-        return (git_dir / "objects" / sha[:2] / sha[2:]).is_file()
+        return get_object_store().exists(sha.lower())
 
     # full SHA
     if len(ref) == 40 and HEX_RE.fullmatch(ref):
@@ -39,15 +41,7 @@ def rev_parse(
 
     # abbreviated SHA
     if 4 <= len(ref) < 40 and HEX_RE.fullmatch(ref):
-        matches = []
-        obj_base = git_dir / "objects"
-        for sub in obj_base.iterdir():
-            if sub.is_dir() and len(sub.name) == 2 and sub.name not in ("info", "pack"):
-                for obj in sub.iterdir():
-                    if obj.is_file():
-                        sha = sub.name + obj.name
-                        if sha.startswith(ref.lower()):
-                            matches.append(sha)
+        matches = iter_object_ids(ref.lower())
         if len(matches) == 1:
             typer.echo(matches[0])
             return
@@ -1,13 +1,19 @@
-
 import os
 import typer
-from git_scratch.utils.index_utils import load_index, save_index
+from git_scratch.utils.index_utils import index_transaction
 
 def rmfile(file_path: str):
     """
     Remove a file from the working directory and from the index.
     """
-    index = load_index()
+    try:
+        with index_transaction() as index:
+            _remove(index, file_path)
+    except FileExistsError as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+def _remove(index, file_path: str):
     filename = os.path.relpath(file_path)
 
     # --- Étape 1 : suppression du fichier dans le working directory ---
@@ -22,11 +28,7 @@ def rmfile(file_path: str):
             raise typer.Exit(code=1)
 
     # --- Étape 2 : suppression dans l’index ---
-    new_index = [entry for entry in index if entry["path"] != filename]
-    removed = len(new_index) != len(index)
-
-    if removed:
-        save_index(new_index)
+    if index.remove(filename):
         typer.echo(f"File '{filename}' removed from staging area.")
     else:
         typer.echo(f"File '{filename}' was not in the index.")
@@ -2,22 +2,20 @@ import os
 import json
 from pathlib import Path
 import typer
-import hashlib
 import pathspec
-from git_scratch.utils.index_utils import load_index, get_index_path
-from git_scratch.utils.gitignore_utils import load_gitignore_spec, is_ignored
+from git_scratch.utils.hash import compute_file_hash
+from git_scratch.utils.index_utils import load_index, index_transaction, index_timestamp_ns, is_stat_clean, stat_data
+from git_scratch.utils.untracked_cache import list_files
+from git_scratch.utils.fsmonitor import query_fsmonitor, save_fsmonitor_state
 
 
 def git_hash_object(file_path):
-    with open(file_path, "rb") as f:
-        content = f.read()
-    header = f"blob {len(content)}\0".encode()
-    store = header + content
-    return hashlib.sha1(store).hexdigest()
+    return compute_file_hash(file_path)
 
-def list_project_files():
-    # Liste tous les fichiers du projet, sauf ceux dans .git
-    return [str(f) for f in Path(".").rglob("*") if f.is_file() and ".git" not in f.parts]
+def list_project_files(spec, fsmonitor=None):
+    # Liste les fichiers non ignorés du projet, sauf ceux dans .git, en
+    # ne relisant que les dossiers modifiés depuis le dernier appel
+    return list_files(spec, fsmonitor)
 
 def load_gitignore_spec():
     # Charge le .gitignore avec pathspec
@@ -30,31 +28,56 @@ def load_gitignore_spec():
 def status():
     import time; t0 = time.time()
     index = load_index()
-    tracked_files = {item['path']: item['oid'] for item in index}
-    project_files = list_project_files()
+    tracked_files = {item['path']: item for item in index}
+    index_mtime_ns = index_timestamp_ns()
+    refreshed = []
     spec = load_gitignore_spec()
+    # Paths changed since the last run, when the fsmonitor daemon is running
+    fsmonitor = query_fsmonitor()
+    project_files = list_project_files(spec, fsmonitor)
 
     modified = []
     staged = []
     untracked = []
 
     for file_path in project_files:
-        # On ignore les fichiers dans .gitignore
-        if spec.match_file(file_path):
-            continue
-        if is_ignored(file_path, spec):
-            continue
-
-
+        # Les fichiers du .gitignore sont déjà écartés par list_project_files
         if file_path in tracked_files:
+            entry = tracked_files[file_path]
+            # Clean last time and not touched since: no need to stat it
+            if fsmonitor is not None and fsmonitor.is_unchanged(file_path, index_mtime_ns):
+                staged.append(file_path)
+                continue
+            # Unchanged stat data: no need to read the file again
+            st = os.stat(file_path)
+            if is_stat_clean(entry, st, index_mtime_ns):
+                staged.append(file_path)
+                continue
+
             current_hash = git_hash_object(file_path)
-            if current_hash == tracked_files[file_path]:
+            if current_hash == entry['oid']:
                 staged.append(file_path)
+                # Only the stat data was out of date: record it for next time
+                refreshed.append({**entry, **stat_data(st)})
             else:
                 modified.append(file_path)
         else:
             untracked.append(file_path)
 
+    if refreshed:
+        try:
+            with index_transaction() as locked_index:
+                for entry in refreshed:
+                    current = locked_index.get(entry['path'])
+                    # Skip entries changed by someone else in the meantime
+                    if current is not None and current['oid'] == entry['oid']:
+                        locked_index.add(entry)
+        except (OSError, ValueError):
+            pass  # locked or read-only repository: the refresh is only an optimisation
+
+    if fsmonitor is not None:
+        save_fsmonitor_state(fsmonitor.token, index_timestamp_ns(), modified)
+
     if staged:
         typer.echo(typer.style("Changes to be committed:", fg=typer.colors.GREEN))
         typer.echo(typer.style("  (use \"pit reset <file>...\" to unstage)\n", fg=typer.colors.GREEN))
@@ -0,0 +1,112 @@
+import os
+import re
+from typing import Iterable, List, Optional
+import typer
+from git_scratch.commands.add import add_files_to_index
+from git_scratch.utils.index_utils import IndexTransaction, index_transaction
+
+HEX_OID = re.compile(r"^[0-9a-f]{40}$")
+
+
+def error(message: str):
+    typer.secho(f"Error: {message}", fg=typer.colors.RED)
+    raise typer.Exit(code=1)
+
+
+def _stdin_records(null: bool) -> List[str]:
+    data = typer.get_binary_stream("stdin").read().decode()
+    if null:
+        return [r for r in data.split("\0") if r]
+    return [line.rstrip("\r") for line in data.split("\n") if line.strip()]
+
+
+def update_paths(index: IndexTransaction, paths: Iterable[str], add: bool, remove: bool,
+                 jobs: Optional[int] = None, verbose: bool = False):
+    """
+    Stage the current content of *paths*. New files need *add*, and
+    paths missing from the working tree are dropped only with *remove*.
+    Every path is checked before anything is hashed, so an error leaves
+    the index unchanged.
+    """
+    to_stage = []
+    for path in paths:
+        rel_path = os.path.relpath(path)
+        if os.path.isdir(path):
+            error(f"{path}: is a directory - add files inside instead")
+        if not os.path.exists(path):
+            if not remove:
+                error(f"{path}: does not exist and --remove not passed")
+            if index.remove(rel_path) and verbose:
+                typer.echo(f"remove '{rel_path}'")
+            continue
+        if rel_path not in index and not add:
+            error(f"{path}: cannot add to the index - missing --add option?")
+        to_stage.append(path)
+
+    add_files_to_index(index, to_stage, jobs, verbose=verbose)
+
+
+def apply_index_info(index: IndexTransaction, records: Iterable[str]):
+    """
+    Apply lines in the formats printed by `ls-tree` ("<mode> <type> <oid>\\t<path>")
+    or `ls-files -s` ("<mode> <oid> <stage>\\t<path>"), or simply
+    "<mode> <oid>\\t<path>". A mode of 0 removes the path.
+    """
+    parsed = []
+    for record in records:
+        info, sep, path = record.partition("\t")
+        fields = info.split()
+        if not sep or not path or len(fields) not in (2, 3):
+            error(f"malformed --index-info line: {record!r}")
+
+        mode, oid = fields[0], fields[1]
+        if len(fields) == 3:
+            if HEX_OID.match(fields[1].lower()):
+                if fields[2] != "0":
+                    error(f"unmerged entries are not supported: {record!r}")
+            else:
+                oid = fields[2]
+        oid = oid.lower()
+        if not re.fullmatch(r"[0-7]+", mode) or not HEX_OID.match(oid):
+            error(f"malformed --index-info line: {record!r}")
+        parsed.append((int(mode, 8), oid, path))
+
+    for mode, oid, path in parsed:
+        if mode == 0:
+            index.remove(path)
+        else:
+            index.add({"mode": f"{mode:o}", "oid": oid, "path": path})
+
+
+def update_index(
+    paths: Optional[List[str]] = typer.Argument(None, help="Files whose content should be staged."),
+    add: bool = typer.Option(False, "--add", help="Add files that are not in the index yet."),
+    remove: bool = typer.Option(False, "--remove", help="Remove paths that no longer exist in the working tree."),
+    stdin: bool = typer.Option(False, "--stdin", help="Read the paths to update from stdin, one per line."),
+    index_info: bool = typer.Option(False, "--index-info", help="Read '<mode> <oid>\\t<path>' records from stdin."),
+    null: bool = typer.Option(False, "-z", help="Records read from stdin are NUL-terminated."),
+    jobs: Optional[int] = typer.Option(None, "-j", "--jobs", help="Number of threads hashing files (default: number of CPUs)."),
+    verbose: bool = typer.Option(False, "--verbose", help="Report what is added and removed."),
+):
+    """
+    Register file contents in the index, with one index load and save for
+    the whole run.
+    """
+    if stdin and index_info:
+        error("--stdin and --index-info are mutually exclusive.")
+    if index_info and paths:
+        error("--index-info takes no paths.")
+    if jobs is not None and jobs < 1:
+        error("--jobs must be at least 1.")
+
+    try:
+        with index_transaction() as index:
+            if index_info:
+                apply_index_info(index, _stdin_records(null))
+            else:
+                all_paths = list(paths or [])
+                if stdin:
+                    all_paths.extend(_stdin_records(null))
+                update_paths(index, all_paths, add, remove, jobs, verbose)
+    except FileExistsError as e:
+        error(str(e))
@@ -1,14 +1,20 @@
 
+from typing import Optional
 import typer
 from git_scratch.utils.tree import create_root_tree_object
 
-def write_tree():
+def write_tree(
+    jobs: Optional[int] = typer.Option(None, "-j", "--jobs", help="Number of threads compressing and storing the trees (default: 1)."),
+):
     """
-    Writes a recursive Git tree from .git/index.json and displays its OID.
+    Writes a recursive Git tree from .git/index and displays its OID.
     """
+    if jobs is not None and jobs < 1:
+        typer.secho("Error: --jobs must be at least 1.", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
     try:
         
-        oid = create_root_tree_object() 
+        oid = create_root_tree_object(jobs) 
         typer.echo(oid)
     except ValueError as e:
         typer.secho(f"Error: {e}", fg=typer.colors.RED)
@@ -16,6 +16,17 @@ from git_scratch.commands.status import status
 from git_scratch.commands.log import log
 from git_scratch.commands.init import init
 from git_scratch.commands.reset import reset
+from git_scratch.commands.repack import repack
+from git_scratch.commands.gc import gc
+from git_scratch.commands.multi_pack_index import multi_pack_index
+from git_scratch.commands.update_index import update_index
+from git_scratch.commands.fsmonitor import fsmonitor
+from git_scratch.commands.diff_tree import diff_tree
+from git_scratch.commands.commit_graph import commit_graph
+from git_scratch.commands.merge_base import merge_base
+from git_scratch.commands.rev_list import rev_list
+from git_scratch.commands.diff import diff
+from git_scratch.utils.cli import PathspecCommand
 
 app = typer.Typer(help="Git from scratch in Python.")
 
@@ -34,8 +45,18 @@ app.command("commit")(commit)
 
 
 app.command("status")(status)
-app.command("log")(log)
+app.command("log", cls=PathspecCommand)(log)
 app.command("reset")(reset)
+app.command("repack")(repack)
+app.command("gc")(gc)
+app.command("multi-pack-index")(multi_pack_index)
+app.command("update-index")(update_index)
+app.command("fsmonitor")(fsmonitor)
+app.command("diff-tree")(diff_tree)
+app.command("commit-graph")(commit_graph)
+app.command("merge-base")(merge_base)
+app.command("rev-list")(rev_list)
+app.command("diff", cls=PathspecCommand)(diff)
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,394 @@
+import hashlib
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from git_scratch.utils.commit_graph import CommitInfo, peel_to_commit, read_commit_info
+from git_scratch.utils.pack import Pack, PackIndex, list_packs
+from git_scratch.utils.read_object import read_object, read_object_info
+from git_scratch.utils.tree_walker import parse_tree
+
+BITMAP_SIGNATURE = b"BITM"
+BITMAP_VERSION = 1
+BITMAP_OPT_FULL_DAG = 0x1
+# Besides the ref tips, one commit out of this many (newest first) gets a
+# bitmap: a query never walks more than that many commits by hand
+BITMAP_COMMIT_INTERVAL = 100
+OBJECT_TYPES = ("commit", "tree", "blob", "tag")
+
+_WORD_MASK = (1 << 64) - 1
+_MAX_RUN = (1 << 32) - 1
+_MAX_LITERALS = (1 << 31) - 1
+_HEADER = struct.Struct(">4sHHI20s")
+_ENTRY = struct.Struct(">IBB")
+
+# Loaded bitmap per file: abs path -> (mtime, PackBitmap)
+_bitmap_cache: Dict[str, Tuple[int, "PackBitmap"]] = {}
+_bitmap_cache_lock = threading.Lock()
+
+
+def ewah_encode(bits: int) -> bytes:
+    """
+    Serialize a bitset (bit i of the int is object i) as Git's EWAH:
+    64-bit words where runs of empty or full words are run-length encoded.
+    """
+    nwords = (bits.bit_length() + 63) // 64
+    words = [(bits >> (64 * i)) & _WORD_MASK for i in range(nwords)]
+    buffer: List[int] = []
+    rlw = 0
+    i = 0
+    while True:
+        run_bit = run_len = 0
+        if i < nwords and words[i] in (0, _WORD_MASK):
+            run_bit = 1 if words[i] else 0
+            clean = words[i]
+            while i < nwords and words[i] == clean and run_len < _MAX_RUN:
+                run_len += 1
+                i += 1
+        start = i
+        while i < nwords and words[i] not in (0, _WORD_MASK) and i - start < _MAX_LITERALS:
+            i += 1
+        rlw = len(buffer)
+        buffer.append(run_bit | (run_len << 1) | ((i - start) << 33))
+        buffer.extend(words[start:i])
+        if i >= nwords:
+            break
+    return (struct.pack(">II", 64 * nwords, len(buffer))
+            + struct.pack(f">{len(buffer)}Q", *buffer)
+            + struct.pack(">I", rlw))
+
+
+def ewah_decode(data, offset: int) -> Tuple[int, int]:
+    """Read an EWAH bitmap at *offset*; returns (bitset, end offset)."""
+    _, size = struct.unpack_from(">II", data, offset)
+    buffer = struct.unpack_from(f">{size}Q", data, offset + 8)
+    words = bytearray()
+    i = 0
+    while i < size:
+        rlw = buffer[i]
+        run_len = (rlw >> 1) & _MAX_RUN
+        literals = rlw >> 33
+        words += (b"\xff" if rlw & 1 else b"\x00") * (8 * run_len)
+        for word in buffer[i + 1:i + 1 + literals]:
+            words += word.to_bytes(8, "little")
+        i += 1 + literals
+    return int.from_bytes(words, "little"), offset + 8 + 8 * size + 4
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the positions of the set bits, lowest first."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for i, byte in enumerate(data):
+        if byte:
+            for j in range(8):
+                if byte >> j & 1:
+                    yield 8 * i + j
+
+
+class _Bits:
+    """A growable bytearray bitset, for O(1) tests while walking."""
+
+    def __init__(self, value: int = 0, size: int = 0):
+        self.data = bytearray(value.to_bytes(max((size + 7) // 8, (value.bit_length() + 7) // 8), "little"))
+
+    def __contains__(self, pos: int) -> bool:
+        return pos >> 3 < len(self.data) and bool(self.data[pos >> 3] & (1 << (pos & 7)))
+
+    def add(self, pos: int) -> None:
+        if pos >> 3 >= len(self.data):
+            self.data.extend(bytes((pos >> 3) + 1 - len(self.data)))
+        self.data[pos >> 3] |= 1 << (pos & 7)
+
+    def update(self, bits: int) -> None:
+        value = int.from_bytes(self.data, "little") | bits
+        self.data = bytearray(value.to_bytes(max(len(self.data), (value.bit_length() + 7) // 8), "little"))
+
+    def value(self) -> int:
+        return int.from_bytes(self.data, "little")
+
+
+class PackBitmap:
+    """
+    Reachability bitmaps of a pack (Git's .bitmap, version 1): objects are
+    numbered by their order in the pack, and selected commits store the set
+    of every object reachable from them, EWAH-compressed.
+
+    Objects outside the pack (e.g. loose commits made since) get numbers
+    after the pack's, for the life of this object.
+    """
+
+    def __init__(self, pack_path: str):
+        base = pack_path[:-len(".pack")]
+        self.path = base + ".bitmap"
+        self.index = PackIndex(base + ".idx")
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        signature, version, options, count, checksum = _HEADER.unpack_from(data, 0)
+        if signature != BITMAP_SIGNATURE or version != BITMAP_VERSION or not options & BITMAP_OPT_FULL_DAG:
+            self.close()
+            raise ValueError(f"Unsupported bitmap: {self.path}")
+        if checksum != self.index.pack_checksum:
+            self.close()
+            raise ValueError(f"Bitmap does not match its pack: {self.path}")
+
+        order = self.index.pack_order()
+        self._bit_of = [0] * len(order)
+        for bit, pos in enumerate(order):
+            self._bit_of[pos] = bit
+        self._order = order
+
+        offset = _HEADER.size
+        self.types: Dict[str, int] = {}
+        for obj_type in OBJECT_TYPES:
+            self.types[obj_type], offset = ewah_decode(data, offset)
+
+        self.commits: Dict[str, int] = {}
+        decoded: List[int] = []
+        for _ in range(count):
+            pos, xor_offset, _ = _ENTRY.unpack_from(data, offset)
+            bits, offset = ewah_decode(data, offset + _ENTRY.size)
+            if xor_offset:
+                bits ^= decoded[-xor_offset]
+            decoded.append(bits)
+            self.commits[self.index.oid_at(pos).hex()] = bits
+
+        self._extended: Dict[str, int] = {}
+        self._extended_oids: List[Tuple[str, str]] = []
+
+    def close(self) -> None:
+        self.index.close()
+
+    def position(self, oid: str, obj_type: Optional[str] = None) -> Optional[int]:
+        """
+        The bit of *oid*; objects outside the pack are numbered on demand
+        when their *obj_type* is given.
+        """
+        pos = self.index.find_position(bytes.fromhex(oid))
+        if pos is not None:
+            return self._bit_of[pos]
+        bit = self._extended.get(oid)
+        if bit is None and obj_type is not None:
+            bit = self._extended[oid] = len(self._order) + len(self._extended_oids)
+            self._extended_oids.append((oid, obj_type))
+            self.types[obj_type] |= 1 << bit
+        return bit
+
+    def oid_at(self, bit: int) -> str:
+        if bit < len(self._order):
+            return self.index.oid_at(self._order[bit]).hex()
+        return self._extended_oids[bit - len(self._order)][0]
+
+    def reachable(self, tips: Iterable[str]) -> int:
+        """
+        The set of objects reachable from *tips* (commits or annotated
+        tags): the stored bitmaps of the commits met are OR-ed in, and only
+        the commits (and their trees) not covered by one are walked.
+        """
+        bits = _Bits(size=len(self._order))
+        stack = []
+        for oid in tips:
+            # Annotated tags are reachable objects too
+            while oid not in self.commits and read_object_info(oid)[0] == "tag":
+                bits.add(self.position(oid, "tag"))
+                oid = read_object(oid)[1].split(b"\n", 1)[0][len(b"object "):].decode()
+            stack.append(oid)
+
+        walked: List[CommitInfo] = []
+        seen = set()
+        while stack:
+            oid = stack.pop()
+            if oid in seen:
+                continue
+            seen.add(oid)
+            stored = self.commits.get(oid)
+            if stored is not None:
+                bits.update(stored)
+                continue
+            pos = self.position(oid)
+            if pos is not None and pos in bits:
+                continue
+            info = read_commit_info(oid)
+            walked.append(info)
+            stack.extend(info.parents)
+
+        for info in walked:
+            pos = self.position(info.oid, "commit")
+            if pos in bits:
+                continue
+            bits.add(pos)
+            trees = [info.tree]
+            while trees:
+                tree = trees.pop()
+                pos = self.position(tree, "tree")
+                if pos in bits:
+                    continue
+                bits.add(pos)
+                _, content = read_object(tree)
+                for mode, _, oid in parse_tree(content):
+                    if mode == "40000":
+                        trees.append(oid)
+                    elif mode != "160000":
+                        bits.add(self.position(oid, "blob"))
+        return bits.value()
+
+    def iter_objects(self, bits: int) -> Iterator[Tuple[str, str]]:
+        """Yield (oid, type) for the set bits, by type then pack order."""
+        for obj_type in OBJECT_TYPES:
+            for bit in iter_bits(bits & self.types[obj_type]):
+                yield self.oid_at(bit), obj_type
+
+
+def get_pack_bitmap() -> Optional[PackBitmap]:
+    """
+    Return the bitmap of the current repository's packs (the first pack
+    that has one), reloaded only when it changes, or None.
+    """
+    for pack in list_packs():
+        path = os.path.abspath(pack.path[:-len(".pack")] + ".bitmap")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        with _bitmap_cache_lock:
+            cached = _bitmap_cache.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            if cached:
+                cached[1].close()
+                del _bitmap_cache[path]
+            try:
+                bitmap = PackBitmap(os.path.abspath(pack.path))
+            except (ValueError, struct.error, FileNotFoundError) as e:
+                print(f"[warn] {e}")
+                continue
+            _bitmap_cache[path] = (mtime, bitmap)
+            return bitmap
+    return None
+
+
+def close_bitmaps() -> None:
+    """Unmap the loaded bitmaps' indexes, e.g. before deleting packs."""
+    with _bitmap_cache_lock:
+        for _, bitmap in _bitmap_cache.values():
+            bitmap.close()
+        _bitmap_cache.clear()
+
+
+def write_bitmap(pack_path: str, tips: Iterable[str]) -> Optional[str]:
+    """
+    Write the .bitmap of *pack_path*, with a bitmap for each commit of
+    *tips* and for one commit out of BITMAP_COMMIT_INTERVAL. Each commit's
+    set is its parents' sets plus the trees and blobs they do not have, so
+    every tree is read once. Returns the path, or None if the pack does
+    not hold everything reachable from *tips* or an object cannot be read.
+    """
+    pack = Pack(pack_path)
+    index = pack.index
+    order = index.pack_order()
+    bit_of = [0] * len(order)
+    for bit, pos in enumerate(order):
+        bit_of[pos] = bit
+
+    def position(oid: str) -> int:
+        pos = index.find_position(bytes.fromhex(oid))
+        if pos is None:
+            raise KeyError(oid)
+        return bit_of[pos]
+
+    try:
+        types = {obj_type: _Bits(size=len(order)) for obj_type in OBJECT_TYPES}
+        for pos in range(len(order)):
+            types[pack.read_info(index.offset_at(pos))[0]].add(bit_of[pos])
+
+        commits: Dict[str, CommitInfo] = {}
+        tip_commits = [c for c in (peel_to_commit(t) for t in tips) if c]
+        stack = list(tip_commits)
+        while stack:
+            oid = stack.pop()
+            if oid not in commits:
+                commits[oid] = read_commit_info(oid)
+                stack.extend(commits[oid].parents)
+        if not commits:
+            return None
+
+        # Parents before children, and how many children still need each set
+        topo: List[str] = []
+        done = set()
+        children = dict.fromkeys(commits, 0)
+        for oid in commits:
+            for parent in commits[oid].parents:
+                children[parent] += 1
+            stack = [oid]
+            while stack:
+                current = stack[-1]
+                if current in done:
+                    stack.pop()
+                    continue
+                missing = [p for p in commits[current].parents if p not in done]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                stack.pop()
+                done.add(current)
+                topo.append(current)
+
+        by_date = sorted(commits, key=lambda c: -commits[c].time)
+        selected = set(tip_commits) | set(by_date[::BITMAP_COMMIT_INTERVAL])
+
+        pending: Dict[str, int] = {}
+        entries: List[Tuple[int, int]] = []
+        for oid in topo:
+            info = commits[oid]
+            base = 0
+            for parent in info.parents:
+                base |= pending[parent]
+                children[parent] -= 1
+                if not children[parent]:
+                    del pending[parent]
+            bits = _Bits(base, len(order))
+            bits.add(position(oid))
+            trees = [info.tree]
+            while trees:
+                tree = trees.pop()
+                pos = position(tree)
+                if pos in bits:
+                    continue
+                bits.add(pos)
+                _, content = read_object(tree)
+                for mode, _, child in parse_tree(content):
+                    if mode == "40000":
+                        trees.append(child)
+                    elif mode != "160000":
+                        bits.add(position(child))
+            value = bits.value()
+            if children[oid]:
+                pending[oid] = value
+            if oid in selected:
+                entries.append((index.find_position(bytes.fromhex(oid)), value))
+    except KeyError:
+        return None
+    except (ValueError, IndexError, struct.error, zlib.error, FileNotFoundError) as e:
+        print(f"[warn] {e}")
+        return None
+    finally:
+        pack.close()
+
+    data = bytearray(_HEADER.pack(BITMAP_SIGNATURE, BITMAP_VERSION, BITMAP_OPT_FULL_DAG,
+                                  len(entries), bytes(index.pack_checksum)))
+    for obj_type in OBJECT_TYPES:
+        data += ewah_encode(types[obj_type].value())
+    for pos, value in entries:
+        data += _ENTRY.pack(pos, 0, 0)
+        data += ewah_encode(value)
+    data += hashlib.sha1(data).digest()
+
+    path = pack_path[:-len(".pack")] + ".bitmap"
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    close_bitmaps()
+    os.replace(tmp_path, path)
+    return path
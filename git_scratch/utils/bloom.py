@@ -0,0 +1,108 @@
+from typing import Iterable, List, Optional, Sequence
+
+# Git's changed-path Bloom filter settings (commit-graph BIDX/BDAT chunks)
+BLOOM_HASH_VERSION = 1
+BLOOM_NUM_HASHES = 7
+BLOOM_BITS_PER_ENTRY = 10
+# Above this many changed paths a commit gets a filter that matches anything
+BLOOM_MAX_CHANGED_PATHS = 512
+BLOOM_SEEDS = (0x293AE76F, 0x7E646E2C)
+
+_MASK = 0xFFFFFFFF
+
+
+def _rotl(x: int, r: int) -> int:
+    return ((x << r) | (x >> (32 - r))) & _MASK
+
+
+def murmur3_32(data: bytes, seed: int, signed: bool = False) -> int:
+    """
+    MurmurHash3 (x86, 32 bits). With *signed*, bytes above 0x7F are
+    sign-extended like Git's version 1 filters do (a bug Git keeps for
+    compatibility).
+    """
+    if signed:
+        values = [b | 0xFFFFFF00 if b & 0x80 else b for b in data]
+    else:
+        values = list(data)
+    h = seed & _MASK
+    length = len(values)
+    nblocks = length // 4
+    for i in range(nblocks):
+        b0, b1, b2, b3 = values[4 * i:4 * i + 4]
+        k = (b0 | (b1 << 8) | (b2 << 16) | (b3 << 24)) & _MASK
+        k = (_rotl((k * 0xCC9E2D51) & _MASK, 15) * 0x1B873593) & _MASK
+        h = (_rotl(h ^ k, 13) * 5 + 0xE6546B64) & _MASK
+
+    tail = values[4 * nblocks:]
+    k = 0
+    if len(tail) == 3:
+        k ^= (tail[2] << 16) & _MASK
+    if len(tail) >= 2:
+        k ^= (tail[1] << 8) & _MASK
+    if tail:
+        k ^= tail[0]
+        k = (_rotl((k * 0xCC9E2D51) & _MASK, 15) * 0x1B873593) & _MASK
+        h ^= k
+
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & _MASK
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & _MASK
+    h ^= h >> 16
+    return h
+
+
+def bloom_key(path: str, version: int = BLOOM_HASH_VERSION, num_hashes: int = BLOOM_NUM_HASHES) -> List[int]:
+    """The *num_hashes* hash values of a path (double hashing, as Git)."""
+    data = path.encode()
+    signed = version == 1
+    h0 = murmur3_32(data, BLOOM_SEEDS[0], signed)
+    h1 = murmur3_32(data, BLOOM_SEEDS[1], signed)
+    return [(h0 + i * h1) & _MASK for i in range(num_hashes)]
+
+
+def with_leading_dirs(paths: Iterable[str]) -> List[str]:
+    """*paths* plus every directory above them ("a/b/c" -> "a/b", "a")."""
+    result = set()
+    for path in paths:
+        while path and path not in result:
+            result.add(path)
+            path = path.rpartition("/")[0]
+    return sorted(result)
+
+
+def build_bloom_filter(paths: Optional[Sequence[str]]) -> bytes:
+    """
+    Build the filter of a commit from its changed paths (leading
+    directories included). None means "too many changes": the filter
+    is then a single all-ones byte.
+    """
+    if paths is None or len(paths) > BLOOM_MAX_CHANGED_PATHS:
+        return b"\xff"
+    size = (len(paths) * BLOOM_BITS_PER_ENTRY + 7) // 8
+    if size == 0:
+        return b"\x00"
+    data = bytearray(size)
+    bits = size * 8
+    for path in paths:
+        for h in bloom_key(path):
+            pos = h % bits
+            data[pos // 8] |= 1 << (pos % 8)
+    return bytes(data)
+
+
+def bloom_filter_contains(data: bytes, key: List[int]) -> bool:
+    """
+    False when the filter proves the path is not among the commit's
+    changes; True means it may be. An empty filter proves nothing.
+    """
+    bits = len(data) * 8
+    if not bits:
+        return True
+    for h in key:
+        pos = h % bits
+        if not data[pos // 8] & (1 << (pos % 8)):
+            return False
+    return True
@@ -0,0 +1,95 @@
+import os
+import zlib
+from typing import List, Optional, Tuple
+
+from git_scratch.utils.config import get_config_int
+from git_scratch.utils.hash import compute_blob_hash
+from git_scratch.utils.midx import MIDX_NAME, write_multi_pack_index
+from git_scratch.utils.object_store import get_object_store
+from git_scratch.utils.pack import PACK_DIR, close_packs
+from git_scratch.utils.pack_writer import PackWriter
+from git_scratch.utils.parallel import ordered_map
+
+DEFAULT_BULK_CHECKIN_THRESHOLD = 1000
+# Files up to this size are hashed and deflated in memory by worker threads;
+# bigger ones are streamed into the pack by the writer itself
+MAX_IN_MEMORY_BLOB = 1024 * 1024
+
+
+def bulk_checkin_threshold() -> int:
+    """
+    Number of files from which `add` streams blobs into a single pack
+    instead of writing loose objects (pit.bulkCheckinThreshold, 0 disables).
+    """
+    try:
+        return get_config_int("pit", "bulkCheckinThreshold", DEFAULT_BULK_CHECKIN_THRESHOLD)
+    except ValueError as e:
+        print(f"[warn] {e}")
+        return DEFAULT_BULK_CHECKIN_THRESHOLD
+
+
+def object_exists(oid: str) -> bool:
+    return get_object_store().exists(oid)
+
+
+def prepare_blob(file_path: str) -> Optional[Tuple[str, int, Optional[bytes]]]:
+    """
+    Hash and deflate a small file for the pack writer.
+    Returns (oid, size, compressed data or None if the object already
+    exists), or None when the file is too big to be loaded in memory.
+    """
+    if os.stat(file_path).st_size > MAX_IN_MEMORY_BLOB:
+        return None
+    with open(file_path, "rb") as f:
+        data = f.read()
+    oid, _ = compute_blob_hash(data)
+    if object_exists(oid):
+        return oid, len(data), None
+    return oid, len(data), zlib.compress(data)
+
+
+class BulkCheckin:
+    """
+    Context manager appending blobs to one in-progress packfile.
+
+    The pack and its index are only renamed into .git/objects/pack when the
+    block exits without error; otherwise the temporary pack is discarded and
+    nothing becomes visible.
+    """
+
+    def __init__(self):
+        self.writer: Optional[PackWriter] = None
+        self.pack_path: Optional[str] = None
+
+    def __enter__(self) -> "BulkCheckin":
+        self.writer = PackWriter(count=None)
+        return self
+
+    def add_file(self, file_path: str) -> str:
+        return self.writer.add_file(file_path, exists=object_exists)
+
+    def add_files(self, file_paths: List[str], jobs: Optional[int] = None) -> List[str]:
+        """
+        Add several files, hashing and deflating them on *jobs* threads.
+        Entries are appended by the calling thread in input order, so the
+        resulting pack does not depend on scheduling. Returns the OIDs.
+        """
+        oids = []
+        for path, prepared in zip(file_paths, ordered_map(prepare_blob, file_paths, jobs)):
+            if prepared is None:
+                oids.append(self.add_file(path))
+                continue
+            oid, size, compressed = prepared
+            if compressed is not None and oid not in self.writer:
+                self.writer.add_deflated(oid, "blob", size, compressed)
+            oids.append(oid)
+        return oids
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.writer.abort()
+            return
+        self.pack_path = self.writer.finish()
+        if self.pack_path and os.path.exists(os.path.join(PACK_DIR, MIDX_NAME)):
+            close_packs()
+            write_multi_pack_index(PACK_DIR)
@@ -0,0 +1,171 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+CACHE_TREE_SIGNATURE = b"TREE"
+
+
+class CacheTree:
+    """
+    Cached tree OIDs of the index directories (Git's "TREE" extension).
+
+    Each node records the OID of the tree built for a directory and the
+    number of index entries below it; an entry count of -1 marks a
+    directory whose tree must be rebuilt.
+    """
+
+    def __init__(self, entry_count: int = -1, oid: Optional[bytes] = None):
+        self.entry_count = entry_count
+        self.oid = oid
+        self.children: Dict[str, "CacheTree"] = {}
+
+    @property
+    def valid(self) -> bool:
+        return self.entry_count >= 0
+
+    def invalidate(self, path: str) -> None:
+        """
+        Invalidate the directories containing *path*, from the root down.
+        Sibling directories keep their cached trees.
+        """
+        node = self
+        parts = path.split("/")[:-1]
+        node.entry_count = -1
+        for name in parts:
+            node = node.children.get(name)
+            if node is None:
+                return
+            node.entry_count = -1
+
+    def serialize(self) -> bytes:
+        out = bytearray()
+        self._serialize("", out)
+        return bytes(out)
+
+    def _serialize(self, name: str, out: bytearray) -> None:
+        out += name.encode() + b"\x00"
+        out += f"{self.entry_count} {len(self.children)}\n".encode()
+        if self.valid:
+            out += self.oid
+        for child_name, child in self.children.items():
+            child._serialize(child_name, out)
+
+    @classmethod
+    def parse(cls, data: bytes) -> "CacheTree":
+        """
+        Decode the payload of a TREE extension.
+
+        Raises:
+            ValueError: If the data is malformed.
+        """
+        try:
+            root, pos = cls._parse(data, 0)
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"Invalid cache-tree extension: {e}")
+        if pos != len(data):
+            raise ValueError("Invalid cache-tree extension: trailing data.")
+        return root[1]
+
+    @classmethod
+    def _parse(cls, data: bytes, pos: int) -> Tuple[Tuple[str, "CacheTree"], int]:
+        name_end = data.index(b"\x00", pos)
+        name = data[pos:name_end].decode()
+        line_end = data.index(b"\n", name_end)
+        entry_count, subtree_count = (int(x) for x in data[name_end + 1:line_end].split(b" "))
+        pos = line_end + 1
+
+        node = cls(entry_count)
+        if node.valid:
+            node.oid = data[pos:pos + 20]
+            if len(node.oid) != 20:
+                raise ValueError("truncated object id")
+            pos += 20
+        for _ in range(subtree_count):
+            (child_name, child), pos = cls._parse(data, pos)
+            node.children[child_name] = child
+        return (name, node), pos
+
+    @classmethod
+    def from_tree(cls, tree_oid: str) -> "CacheTree":
+        """
+        Build a fully valid cache-tree for the index that *tree_oid*
+        flattens to, e.g. after a reset.
+        """
+        from git_scratch.utils.read_object import read_object
+        from git_scratch.utils.tree_walker import parse_tree
+
+        _, content = read_object(tree_oid)
+        node = cls(0, bytes.fromhex(tree_oid))
+        for mode, name, oid in parse_tree(content):
+            if mode == "40000":
+                child = cls.from_tree(oid)
+                node.children[name] = child
+                node.entry_count += child.entry_count
+            else:
+                node.entry_count += 1
+        return node
+
+    def update(self, entries: List[dict], write_tree: Callable[[bytes], str]) -> str:
+        """
+        Rebuild the invalid directories from the sorted index *entries*,
+        storing new trees with *write_tree*, and return the root tree OID.
+        Valid directories are reused as they are, so only the ancestors of
+        changed paths are rehashed.
+
+        The entries are read once, in order, with a stack of the
+        directories being built: a tree is written as soon as the first
+        path outside of it comes up, children before their parents.
+        """
+        pos = 0 if not self.valid else self.entry_count
+        stack = [] if self.valid else [_PendingTree("", self, "", 0)]
+        while stack:
+            pending = stack[-1]
+            if pos < len(entries) and entries[pos]["path"].startswith(pending.prefix):
+                rest = entries[pos]["path"][len(pending.prefix):]
+                slash = rest.find("/")
+                if slash == -1:
+                    entry = entries[pos]
+                    pending.content += f"{entry['mode']} {rest}".encode() + b"\x00" + bytes.fromhex(entry["oid"])
+                    pos += 1
+                    continue
+
+                name = rest[:slash]
+                child = pending.node.children.get(name) or CacheTree()
+                if child.valid:
+                    pos += child.entry_count
+                    pending.add_subtree(name, child)
+                else:
+                    stack.append(_PendingTree(name, child, f"{pending.prefix}{name}/", pos))
+                continue
+
+            # Paths are sorted bytewise, which is exactly Git's tree order: a
+            # directory "a" is compared as "a/", so it sorts after "a.txt"
+            stack.pop()
+            node = pending.node
+            node.oid = bytes.fromhex(write_tree(bytes(pending.content)))
+            node.entry_count = pos - pending.start
+            # Directories that no longer hold any entry are dropped
+            node.children = pending.children
+            if stack:
+                stack[-1].add_subtree(pending.name, node)
+
+        if pos != len(entries):
+            raise ValueError("Index entries are not sorted.")
+        return self.oid.hex()
+
+
+class _PendingTree:
+    """
+    A directory whose tree is being built by CacheTree.update.
+    """
+    __slots__ = ("name", "node", "prefix", "start", "content", "children")
+
+    def __init__(self, name: str, node: CacheTree, prefix: str, start: int):
+        self.name = name
+        self.node = node
+        self.prefix = prefix
+        self.start = start
+        self.content = bytearray()
+        self.children: Dict[str, CacheTree] = {}
+
+    def add_subtree(self, name: str, child: CacheTree) -> None:
+        self.children[name] = child
+        self.content += f"40000 {name}".encode() + b"\x00" + child.oid
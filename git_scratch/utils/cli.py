@@ -0,0 +1,24 @@
+from typing import List, Optional
+
+import typer
+from typer.core import TyperCommand
+
+
+class PathspecCommand(TyperCommand):
+    """
+    Command taking "[<revisions>...] [--] [<paths>...]" like Git does.
+    The parser under Typer drops the "--" separator, so the arguments after
+    it are set aside in ctx.meta["pathspecs"] before parsing.
+    """
+
+    def parse_args(self, ctx: typer.Context, args: List[str]) -> List[str]:
+        if "--" in args:
+            split = args.index("--")
+            ctx.meta["pathspecs"] = args[split + 1:]
+            args = args[:split]
+        return super().parse_args(ctx, args)
+
+
+def get_pathspecs(ctx: typer.Context) -> Optional[List[str]]:
+    """The paths given after "--", or None if there was no "--"."""
+    return ctx.meta.get("pathspecs")
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 from git_scratch.utils.identity import get_author_identity, get_timestamp_info
 from git_scratch.utils.object import write_object
 
@@ -29,3 +29,19 @@ def build_commit_object(
     oid = write_object(commit_content, "commit")
 
     return oid
+
+
+def parse_commit_header(content: bytes) -> Tuple[str, List[str]]:
+    """
+    Return the tree OID and the list of parent OIDs of a raw commit object.
+    """
+    tree_oid = ""
+    parents = []
+    for line in content.split(b"\n"):
+        if not line:
+            break
+        if line.startswith(b"tree "):
+            tree_oid = line[5:].decode()
+        elif line.startswith(b"parent "):
+            parents.append(line[7:].decode())
+    return tree_oid, parents
@@ -0,0 +1,370 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from git_scratch.utils.bloom import BLOOM_BITS_PER_ENTRY, BLOOM_HASH_VERSION, BLOOM_MAX_CHANGED_PATHS, \
+    BLOOM_NUM_HASHES, build_bloom_filter, with_leading_dirs
+from git_scratch.utils.midx import binary_search
+
+COMMIT_GRAPH_PATH = os.path.join(".git", "objects", "info", "commit-graph")
+COMMIT_GRAPH_SIGNATURE = b"CGPH"
+
+CHUNK_OID_FANOUT = b"OIDF"
+CHUNK_OID_LOOKUP = b"OIDL"
+CHUNK_COMMIT_DATA = b"CDAT"
+CHUNK_EXTRA_EDGES = b"EDGE"
+CHUNK_BLOOM_INDEXES = b"BIDX"
+CHUNK_BLOOM_DATA = b"BDAT"
+_BLOOM_HEADER = struct.Struct(">III")
+
+PARENT_NONE = 0x70000000
+PARENT_EXTRA_EDGES = 0x80000000
+LAST_EDGE = 0x80000000
+GENERATION_NUMBER_MAX = 0x3FFFFFFF
+# Generation of the commits the graph does not cover
+GENERATION_NUMBER_INFINITY = 0xFFFFFFFF
+
+_COMMIT_DATA = struct.Struct(">20sIIII")
+
+# Loaded graph per file: abs path -> (mtime, CommitGraph)
+_graph_cache: Dict[str, Tuple[int, "CommitGraph"]] = {}
+_graph_cache_lock = threading.Lock()
+
+
+class CommitInfo:
+    """
+    What history walks need to know about a commit.
+    """
+    __slots__ = ("oid", "tree", "parents", "time", "generation")
+
+    def __init__(self, oid: str, tree: str, parents: List[str], time: int,
+                 generation: int = GENERATION_NUMBER_INFINITY):
+        self.oid = oid
+        self.tree = tree
+        self.parents = parents
+        self.time = time
+        self.generation = generation
+
+
+class CommitGraph:
+    """
+    Memory-mapped commit-graph file (Git's format, version 1): the commits
+    sorted by OID, with their root tree, parents as positions in the same
+    table, commit date and generation number.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._map
+
+        signature, version, hash_version, chunk_count, base_count = struct.unpack_from(">4sBBBB", data, 0)
+        if signature != COMMIT_GRAPH_SIGNATURE or version != 1 or hash_version != 1 or base_count:
+            self.close()
+            raise ValueError(f"Unsupported commit-graph: {path}")
+
+        table = [struct.unpack_from(">4sQ", data, 8 + 12 * i) for i in range(chunk_count + 1)]
+        self.chunks: Dict[bytes, Tuple[int, int]] = {
+            chunk_id: (offset, table[i + 1][1]) for i, (chunk_id, offset) in enumerate(table[:-1])
+        }
+        for required in (CHUNK_OID_FANOUT, CHUNK_OID_LOOKUP, CHUNK_COMMIT_DATA):
+            if required not in self.chunks:
+                self.close()
+                raise ValueError(f"Invalid commit-graph, missing {required.decode()} chunk: {path}")
+
+        self.fanout = struct.unpack_from(">256I", data, self.chunks[CHUNK_OID_FANOUT][0])
+        self.count = self.fanout[255]
+        self._oids = self.chunks[CHUNK_OID_LOOKUP][0]
+        self._data = self.chunks[CHUNK_COMMIT_DATA][0]
+        self._edges = self.chunks.get(CHUNK_EXTRA_EDGES, (None,))[0]
+
+        # Changed-path Bloom filters: (hash version, hashes per path), or
+        # None when the graph has none we can use
+        self.bloom_settings: Optional[Tuple[int, int]] = None
+        if CHUNK_BLOOM_INDEXES in self.chunks and CHUNK_BLOOM_DATA in self.chunks:
+            version, num_hashes, _ = _BLOOM_HEADER.unpack_from(data, self.chunks[CHUNK_BLOOM_DATA][0])
+            if version in (1, 2):
+                self.bloom_settings = (version, num_hashes)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._map.close()
+
+    def chunk(self, chunk_id: bytes) -> Optional[memoryview]:
+        if chunk_id not in self.chunks:
+            return None
+        start, end = self.chunks[chunk_id]
+        return memoryview(self._map)[start:end]
+
+    def find(self, oid: bytes) -> Optional[int]:
+        """Return the position of the binary *oid*, or None."""
+        first = oid[0]
+        lo = self.fanout[first - 1] if first else 0
+        return binary_search(self._map, self._oids, 20, lo, self.fanout[first], oid)
+
+    def oid(self, pos: int) -> str:
+        start = self._oids + 20 * pos
+        return self._map[start:start + 20].hex()
+
+    def bloom_filter(self, pos: int) -> Optional[bytes]:
+        """The changed-path Bloom filter of the commit at *pos*, if any."""
+        if self.bloom_settings is None:
+            return None
+        index = self.chunks[CHUNK_BLOOM_INDEXES][0]
+        end = struct.unpack_from(">I", self._map, index + 4 * pos)[0]
+        start = struct.unpack_from(">I", self._map, index + 4 * (pos - 1))[0] if pos else 0
+        base = self.chunks[CHUNK_BLOOM_DATA][0] + _BLOOM_HEADER.size
+        return self._map[base + start:base + end]
+
+    def commit(self, pos: int) -> CommitInfo:
+        tree, parent1, parent2, high, low = _COMMIT_DATA.unpack_from(self._map, self._data + 36 * pos)
+        parents = []
+        if parent1 != PARENT_NONE:
+            parents.append(self.oid(parent1))
+        if parent2 & PARENT_EXTRA_EDGES:
+            edge = parent2 & ~PARENT_EXTRA_EDGES
+            while True:
+                value = struct.unpack_from(">I", self._map, self._edges + 4 * edge)[0]
+                parents.append(self.oid(value & ~LAST_EDGE))
+                if value & LAST_EDGE:
+                    break
+                edge += 1
+        elif parent2 != PARENT_NONE:
+            parents.append(self.oid(parent2))
+        time = ((high & 0x3) << 32) | low
+        return CommitInfo(self.oid(pos), tree.hex(), parents, time, high >> 2)
+
+
+def get_commit_graph() -> Optional[CommitGraph]:
+    """
+    Return the commit-graph of the current repository, reloaded only when
+    the file changes, or None if there is none (or it cannot be read).
+    """
+    path = os.path.abspath(COMMIT_GRAPH_PATH)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _graph_cache_lock:
+        cached = _graph_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        if cached:
+            cached[1].close()
+            del _graph_cache[path]
+        try:
+            graph = CommitGraph(path)
+        except (ValueError, struct.error) as e:
+            print(f"[warn] {e}")
+            return None
+        _graph_cache[path] = (mtime, graph)
+        return graph
+
+
+def close_commit_graph() -> None:
+    """Unmap the loaded commit-graphs, e.g. before replacing the file."""
+    with _graph_cache_lock:
+        for _, graph in _graph_cache.values():
+            graph.close()
+        _graph_cache.clear()
+
+
+def parse_commit_info(oid: str, content: bytes) -> CommitInfo:
+    """Read the tree, parents and committer date of a raw commit."""
+    tree = ""
+    parents = []
+    time = 0
+    for line in content.split(b"\n"):
+        if not line:
+            break
+        if line.startswith(b"tree "):
+            tree = line[5:].decode()
+        elif line.startswith(b"parent "):
+            parents.append(line[7:].decode())
+        elif line.startswith(b"committer "):
+            # "committer Name <email> <timestamp> <tz>"
+            time = int(line.rsplit(b" ", 2)[1])
+    return CommitInfo(oid, tree, parents, time)
+
+
+def read_commit_info(oid: str) -> CommitInfo:
+    """
+    Return the CommitInfo of *oid*, from the commit-graph when it covers
+    the commit, so that walks do not have to inflate it.
+
+    Raises:
+        FileNotFoundError: If the commit does not exist.
+        ValueError: If *oid* is not a commit.
+    """
+    graph = get_commit_graph()
+    if graph is not None:
+        pos = graph.find(bytes.fromhex(oid))
+        if pos is not None:
+            return graph.commit(pos)
+
+    from git_scratch.utils.read_object import read_object
+    obj_type, content = read_object(oid)
+    if obj_type != "commit":
+        raise ValueError(f"object {oid} is not a commit")
+    return parse_commit_info(oid, content)
+
+
+def peel_to_commit(oid: str) -> Optional[str]:
+    """Follow annotated tags; None if *oid* does not lead to a commit."""
+    from git_scratch.utils.read_object import read_object_info, read_object
+
+    graph = get_commit_graph()
+    if graph is not None and graph.find(bytes.fromhex(oid)) is not None:
+        return oid
+    obj_type, _ = read_object_info(oid)
+    while obj_type == "tag":
+        _, content = read_object(oid)
+        oid = content.split(b"\n", 1)[0][len(b"object "):].decode()
+        obj_type, _ = read_object_info(oid)
+    return oid if obj_type == "commit" else None
+
+
+def changed_paths(old_tree: Optional[str], new_tree: str) -> Optional[List[str]]:
+    """
+    The paths changed between two trees, with their leading directories,
+    or None past BLOOM_MAX_CHANGED_PATHS (the diff is not finished then).
+    """
+    from git_scratch.utils.tree_diff import diff_trees
+
+    paths = []
+    for change in diff_trees(old_tree, new_tree):
+        paths.append(change["path"])
+        if len(paths) > BLOOM_MAX_CHANGED_PATHS:
+            return None
+    return with_leading_dirs(paths)
+
+
+def write_commit_graph(tips: Iterable[str], changed_paths_filters: Optional[bool] = None) -> Optional[str]:
+    """
+    Write .git/objects/info/commit-graph for every commit reachable from
+    *tips* (commits or tags pointing to them). Commits already in the
+    current graph are not read again. Returns the path, or None if there
+    is no commit.
+
+    With *changed_paths_filters*, a Bloom filter of the paths each commit
+    changes compared to its first parent is stored too (BIDX and BDAT
+    chunks); None keeps them only if the current graph has them. Filters
+    already in the current graph are reused.
+    """
+    old_graph = get_commit_graph()
+    if changed_paths_filters is None:
+        changed_paths_filters = old_graph is not None and old_graph.bloom_settings is not None
+    commits: Dict[str, CommitInfo] = {}
+    stack = [c for c in (peel_to_commit(t) for t in tips) if c]
+    while stack:
+        oid = stack.pop()
+        if oid in commits:
+            continue
+        info = read_commit_info(oid)
+        commits[oid] = info
+        stack.extend(p for p in info.parents if p not in commits)
+    if not commits:
+        return None
+
+    # Generation: 1 for root commits, else one more than the highest parent
+    generations: Dict[str, int] = {}
+    for oid in commits:
+        stack = [oid]
+        while stack:
+            current = stack[-1]
+            if current in generations:
+                stack.pop()
+                continue
+            missing = [p for p in commits[current].parents if p not in generations]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            parents = commits[current].parents
+            generation = 1 + max((generations[p] for p in parents), default=0)
+            generations[current] = min(generation, GENERATION_NUMBER_MAX)
+
+    oids = sorted(commits)
+    positions = {oid: i for i, oid in enumerate(oids)}
+    fanout = [0] * 256
+    for oid in oids:
+        fanout[int(oid[:2], 16)] += 1
+    total = 0
+    for i in range(256):
+        total += fanout[i]
+        fanout[i] = total
+
+    commit_data = bytearray()
+    edges: List[int] = []
+    for oid in oids:
+        info = commits[oid]
+        parents = [positions[p] for p in info.parents]
+        parent1 = parents[0] if parents else PARENT_NONE
+        if len(parents) > 2:
+            parent2 = PARENT_EXTRA_EDGES | len(edges)
+            edges.extend(parents[1:-1])
+            edges.append(parents[-1] | LAST_EDGE)
+        else:
+            parent2 = parents[1] if len(parents) > 1 else PARENT_NONE
+        high = (generations[oid] << 2) | ((info.time >> 32) & 0x3)
+        commit_data += _COMMIT_DATA.pack(bytes.fromhex(info.tree), parent1, parent2, high, info.time & 0xFFFFFFFF)
+
+    chunks = [
+        (CHUNK_OID_FANOUT, struct.pack(">256I", *fanout)),
+        (CHUNK_OID_LOOKUP, b"".join(bytes.fromhex(oid) for oid in oids)),
+        (CHUNK_COMMIT_DATA, bytes(commit_data)),
+    ]
+    if edges:
+        chunks.append((CHUNK_EXTRA_EDGES, struct.pack(f">{len(edges)}I", *edges)))
+    if changed_paths_filters:
+        chunks.extend(_bloom_chunks(oids, commits, old_graph))
+    return _write_chunk_file(chunks)
+
+
+def _bloom_chunks(oids: List[str], commits: Dict[str, CommitInfo],
+                  old_graph: Optional[CommitGraph]) -> List[Tuple[bytes, bytes]]:
+    reuse = old_graph is not None and old_graph.bloom_settings == (BLOOM_HASH_VERSION, BLOOM_NUM_HASHES)
+    ends = []
+    data = bytearray(_BLOOM_HEADER.pack(BLOOM_HASH_VERSION, BLOOM_NUM_HASHES, BLOOM_BITS_PER_ENTRY))
+    for oid in oids:
+        bloom = None
+        if reuse:
+            pos = old_graph.find(bytes.fromhex(oid))
+            if pos is not None:
+                bloom = old_graph.bloom_filter(pos) or None
+        if bloom is None:
+            info = commits[oid]
+            parent_tree = commits[info.parents[0]].tree if info.parents else None
+            bloom = build_bloom_filter(changed_paths(parent_tree, info.tree))
+        data += bloom
+        ends.append(len(data) - _BLOOM_HEADER.size)
+    return [
+        (CHUNK_BLOOM_INDEXES, struct.pack(f">{len(ends)}I", *ends)),
+        (CHUNK_BLOOM_DATA, bytes(data)),
+    ]
+
+
+def _write_chunk_file(chunks: List[Tuple[bytes, bytes]]) -> str:
+    data = bytearray(struct.pack(">4sBBBB", COMMIT_GRAPH_SIGNATURE, 1, 1, len(chunks), 0))
+    offset = len(data) + 12 * (len(chunks) + 1)
+    for chunk_id, chunk in chunks:
+        data += struct.pack(">4sQ", chunk_id, offset)
+        offset += len(chunk)
+    data += struct.pack(">4sQ", b"\x00" * 4, offset)
+    for _, chunk in chunks:
+        data += chunk
+    data += hashlib.sha1(data).digest()
+
+    os.makedirs(os.path.dirname(COMMIT_GRAPH_PATH), exist_ok=True)
+    tmp_path = COMMIT_GRAPH_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    close_commit_graph()
+    os.replace(tmp_path, COMMIT_GRAPH_PATH)
+    return COMMIT_GRAPH_PATH
@@ -0,0 +1,77 @@
+import configparser
+import os
+from typing import Dict, Optional, Tuple
+
+CONFIG_PATH = os.path.join(".git", "config")
+
+_UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+# Parsed configs: abs path -> (mtime, parser)
+_config_cache: Dict[str, Tuple[int, configparser.ConfigParser]] = {}
+
+
+def _load_config() -> Optional[configparser.ConfigParser]:
+    path = os.path.abspath(CONFIG_PATH)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _config_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    config = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        config.read(path)
+    except configparser.Error as e:
+        print(f"[warn] Failed to parse config at {path}: {e}")
+        return None
+    _config_cache[path] = (mtime, config)
+    return config
+
+
+def get_config_value(section: str, key: str, fallback: Optional[str] = None) -> Optional[str]:
+    """
+    Read *section*.*key* from the repository config (.git/config).
+    Keys are case-insensitive, as in Git.
+    """
+    config = _load_config()
+    if config is None:
+        return fallback
+    return config.get(section, key.lower(), fallback=fallback)
+
+
+def get_config_int(section: str, key: str, fallback: int) -> int:
+    """
+    Read an integer setting; Git's k/m/g suffixes are accepted.
+
+    Raises:
+        ValueError: If the value is not a valid integer.
+    """
+    value = get_config_value(section, key)
+    if value is None:
+        return fallback
+    value = value.strip().lower()
+    factor = _UNITS.get(value[-1:], 1)
+    if factor != 1:
+        value = value[:-1]
+    try:
+        return int(value) * factor
+    except ValueError:
+        raise ValueError(f"Invalid integer for {section}.{key}: '{value}'")
+
+
+def get_config_bool(section: str, key: str, fallback: bool) -> bool:
+    """
+    Read a boolean setting (true/false, yes/no, on/off, 1/0).
+    """
+    value = get_config_value(section, key)
+    if value is None:
+        return fallback
+    value = value.strip().lower()
+    if value in {"true", "yes", "on", "1", ""}:
+        return True
+    if value in {"false", "no", "off", "0"}:
+        return False
+    raise ValueError(f"Invalid boolean for {section}.{key}: '{value}'")
@@ -0,0 +1,159 @@
+from typing import Optional
+
+
+def read_delta_size(delta: bytes, pos: int) -> tuple[int, int]:
+    """
+    Read a little-endian base-128 size from a delta header.
+    Returns the size and the position just after it.
+    """
+    size = 0
+    shift = 0
+    while True:
+        byte = delta[pos]
+        pos += 1
+        size |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, pos
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    Rebuild an object from its *base* and a Git delta (copy/insert instructions).
+
+    Raises:
+        ValueError: If the delta does not match the base or is corrupt.
+    """
+    src_size, pos = read_delta_size(delta, 0)
+    if src_size != len(base):
+        raise ValueError("Delta base size mismatch.")
+    dst_size, pos = read_delta_size(delta, pos)
+
+    out = bytearray()
+    end = len(delta)
+    while pos < end:
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            # Copy from base: offset on up to 4 bytes, size on up to 3 bytes
+            offset = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            size = 0
+            for i in range(3):
+                if op & (1 << (4 + i)):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            if size == 0:
+                size = 0x10000
+            if offset + size > src_size:
+                raise ValueError("Delta copy out of base bounds.")
+            out += base[offset:offset + size]
+        elif op:
+            # Insert the next *op* bytes literally
+            out += delta[pos:pos + op]
+            pos += op
+        else:
+            raise ValueError("Invalid delta opcode 0.")
+
+    if len(out) != dst_size:
+        raise ValueError("Delta result size mismatch.")
+    return bytes(out)
+
+
+BLOCK_SIZE = 16
+MAX_COPY = 0x10000
+MAX_INSERT = 0x7F
+
+
+def _encode_size(size: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = size & 0x7F
+        size >>= 7
+        if size:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _encode_copy(offset: int, size: int) -> bytes:
+    op = 0x80
+    args = bytearray()
+    for i in range(4):
+        byte = (offset >> (8 * i)) & 0xFF
+        if byte:
+            op |= 1 << i
+            args.append(byte)
+    for i in range(3):
+        byte = (size >> (8 * i)) & 0xFF
+        if byte:
+            op |= 1 << (4 + i)
+            args.append(byte)
+    return bytes([op]) + bytes(args)
+
+
+def _emit_insert(out: bytearray, data: bytes) -> None:
+    for i in range(0, len(data), MAX_INSERT):
+        chunk = data[i:i + MAX_INSERT]
+        out.append(len(chunk))
+        out += chunk
+
+
+def create_delta(base: bytes, target: bytes, max_size: int = 0) -> Optional[bytes]:
+    """
+    Encode *target* as a Git delta against *base*.
+
+    Blocks of the base are indexed by content; matches found in the target are
+    extended in both directions and emitted as copy instructions, everything
+    else as literal inserts.
+    Returns None when the delta would exceed *max_size* (if given).
+    """
+    index: dict[bytes, int] = {}
+    for i in range(0, len(base) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        index.setdefault(base[i:i + BLOCK_SIZE], i)
+
+    out = bytearray(_encode_size(len(base)) + _encode_size(len(target)))
+    base_len = len(base)
+    end = len(target)
+    literal_start = 0
+    pos = 0
+
+    while pos + BLOCK_SIZE <= end:
+        offset = index.get(target[pos:pos + BLOCK_SIZE])
+        if offset is None:
+            pos += 1
+            continue
+
+        # Extend the match backwards over pending literals
+        start, src = pos, offset
+        while start > literal_start and src > 0 and target[start - 1] == base[src - 1]:
+            start -= 1
+            src -= 1
+
+        # Extend the match forwards, a chunk at a time then byte by byte
+        match_end, src_end = pos + BLOCK_SIZE, offset + BLOCK_SIZE
+        while (match_end + 64 <= end and src_end + 64 <= base_len
+               and target[match_end:match_end + 64] == base[src_end:src_end + 64]):
+            match_end += 64
+            src_end += 64
+        while match_end < end and src_end < base_len and target[match_end] == base[src_end]:
+            match_end += 1
+            src_end += 1
+
+        _emit_insert(out, target[literal_start:start])
+        for copy_start in range(start, match_end, MAX_COPY):
+            size = min(MAX_COPY, match_end - copy_start)
+            out += _encode_copy(src + copy_start - start, size)
+
+        pos = literal_start = match_end
+        if max_size and len(out) > max_size:
+            return None
+
+    _emit_insert(out, target[literal_start:])
+    if max_size and len(out) > max_size:
+        return None
+    return bytes(out)
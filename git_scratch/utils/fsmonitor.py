@@ -0,0 +1,318 @@
+import json
+import os
+import select
+import socket
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from git_scratch.utils.config import get_config_bool
+from git_scratch.utils.inotify import (
+    IN_ATTRIB, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_DONT_FOLLOW,
+    IN_EXCL_UNLINK, IN_IGNORED, IN_ISDIR, IN_MODIFY, IN_MOVE_SELF, IN_MOVED_FROM,
+    IN_MOVED_TO, IN_ONLYDIR, IN_Q_OVERFLOW, Inotify,
+)
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+              | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+
+# Beyond this many changed paths, clients are better off scanning
+MAX_CHANGED_PATHS = 100_000
+QUERY_TIMEOUT = 1.0
+
+
+def get_fsmonitor_socket_path() -> str:
+    # Relative to the worktree: Unix socket paths are limited to ~100 bytes
+    return os.path.join(".git", "fsmonitor.sock")
+
+
+def get_fsmonitor_state_path() -> Path:
+    return Path(os.getcwd()) / ".git" / "pit-fsmonitor-state.json"
+
+
+class FSMonitorDaemon:
+    """
+    Watch every directory of the worktree (the current directory) with
+    inotify and remember, for each changed path, the sequence number of
+    the batch of events it was last seen in.
+
+    Clients pass back the token of their previous query, "<daemon id>:<seq>",
+    and get the paths changed since. A token from another daemon, or from
+    before a lost event, gets no path list: the client must scan.
+    """
+
+    def __init__(self):
+        self.root = os.getcwd()
+        self.id = os.urandom(6).hex()
+        self.seq = 0
+        self.changes: Dict[str, int] = {}
+        # Tokens older than this missed events
+        self.overflow_seq = 0
+        # Set when a directory could not be watched: no answer can be trusted
+        self.degraded = False
+        self.watches: Dict[int, str] = {}
+        self.running = False
+        self.inotify = Inotify()
+        self._watch_tree("", [])
+
+    @property
+    def token(self) -> str:
+        return f"{self.id}:{self.seq}"
+
+    def _watch_tree(self, rel_dir: str, touched: List[str]) -> None:
+        """
+        Watch *rel_dir* and every directory below it. The paths found are
+        added to *touched*: they may have appeared before the watch did.
+        """
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            try:
+                wd = self.inotify.add_watch(os.path.join(self.root, current), WATCH_MASK)
+            except OSError as e:
+                if os.path.isdir(os.path.join(self.root, current)):
+                    # Usually fs.inotify.max_user_watches
+                    print(f"[warn] {e}")
+                    self.degraded = True
+                continue
+            self.watches[wd] = current
+            try:
+                with os.scandir(os.path.join(self.root, current)) as it:
+                    for entry in it:
+                        if not current and entry.name == ".git":
+                            continue
+                        rel_path = f"{current}/{entry.name}" if current else entry.name
+                        touched.append(rel_path)
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(rel_path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+    def _unwatch_tree(self, rel_dir: str) -> None:
+        prefix = rel_dir + "/"
+        for wd, path in list(self.watches.items()):
+            if path == rel_dir or path.startswith(prefix):
+                self.inotify.rm_watch(wd)
+                del self.watches[wd]
+
+    def _overflow(self) -> None:
+        self.changes.clear()
+        self.overflow_seq = self.seq
+
+    def process_events(self) -> None:
+        """
+        Record the pending events under a new sequence number.
+        """
+        touched: List[str] = []
+        overflow = False
+        for wd, mask, name in self.inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            base = self.watches.get(wd)
+            if base is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                if base == "":
+                    self.running = False
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                # Reported by the parent directory, except for the worktree itself
+                if base == "":
+                    self.running = False
+                continue
+
+            path = f"{base}/{name}" if base else name
+            if path == ".git" or path.startswith(".git/"):
+                continue
+            touched.append(path)
+            if mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    self._unwatch_tree(path)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(path, touched)
+
+        if not touched and not overflow:
+            return
+        self.seq += 1
+        if overflow:
+            self._overflow()
+            # Directories created meanwhile have no watch yet
+            self._watch_tree("", [])
+            return
+        for path in touched:
+            self.changes[path] = self.seq
+        if len(self.changes) > MAX_CHANGED_PATHS:
+            self._overflow()
+
+    def query(self, token: str) -> dict:
+        """
+        Answer a client: the new token, and the paths changed since *token*,
+        or None when the client has to scan the worktree itself.
+        """
+        # Events already queued by the kernel happened before the query
+        self.process_events()
+        daemon_id, _, seq = token.partition(":")
+        paths = None
+        if daemon_id == self.id and seq.isdigit() and not self.degraded:
+            since = int(seq)
+            if self.overflow_seq <= since <= self.seq:
+                paths = sorted(p for p, s in self.changes.items() if s > since)
+        return {"token": self.token, "paths": paths}
+
+    def _handle(self, conn: socket.socket) -> None:
+        conn.settimeout(QUERY_TIMEOUT)
+        try:
+            command, _, arg = _read_line(conn).partition(" ")
+            if command == "query":
+                reply = self.query(arg)
+            elif command == "ping":
+                reply = {"pid": os.getpid(), "root": self.root, "watches": len(self.watches)}
+            elif command == "quit":
+                self.running = False
+                reply = {"ok": True}
+            else:
+                reply = {"error": f"unknown command '{command}'"}
+            conn.sendall(json.dumps(reply).encode() + b"\n")
+        except OSError:
+            pass  # the client went away
+
+    def serve(self) -> None:
+        """
+        Answer queries on .git/fsmonitor.sock until asked to quit or the
+        worktree disappears.
+        """
+        socket_path = get_fsmonitor_socket_path()
+        if os.path.exists(socket_path):
+            if fsmonitor_request("ping") is not None:
+                raise FileExistsError("An fsmonitor daemon is already running.")
+            os.unlink(socket_path)  # left behind by a daemon that was killed
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(socket_path)
+            server.listen()
+            self.running = True
+            while self.running:
+                ready, _, _ = select.select([self.inotify, server], [], [], 1.0)
+                if self.inotify in ready:
+                    self.process_events()
+                if server in ready:
+                    conn, _ = server.accept()
+                    with conn:
+                        self._handle(conn)
+        finally:
+            server.close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.inotify.close()
+
+
+def _read_line(conn: socket.socket) -> str:
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode().strip()
+
+
+def fsmonitor_request(command: str) -> Optional[dict]:
+    """
+    Send one command to the daemon; None if it is not running or does not
+    answer in time. Also None where there are no Unix sockets (Windows):
+    callers then scan as if there were no daemon.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(QUERY_TIMEOUT)
+            conn.connect(get_fsmonitor_socket_path())
+            conn.sendall(command.encode() + b"\n")
+            return json.loads(_read_line(conn))
+    except (OSError, ValueError):
+        return None
+
+
+class FSMonitorAnswer:
+    """
+    Paths changed since the last saved token. *paths* is None when the
+    daemon cannot tell, and *state* is the state saved with that token.
+    """
+
+    def __init__(self, since: str, token: str, paths: Optional[Set[str]], state: dict):
+        self.since = since
+        self.token = token
+        self.paths = paths
+        self.state = state
+
+    def changed_dirs(self) -> Set[str]:
+        """
+        Directories whose listing may have changed: those of the changed
+        paths, and the changed paths that are directories themselves.
+        """
+        dirs = set()
+        for path in self.paths or ():
+            dirs.add(path)
+            dirs.add(path.rpartition("/")[0])
+        return dirs
+
+    def is_unchanged(self, path: str, index_stamp: int) -> bool:
+        """
+        True if the tracked *path* was clean when the token was saved, has
+        not been touched since, and the index has not changed either.
+        """
+        if self.paths is None or self.state.get("index") != index_stamp:
+            return False
+        return path not in self.paths and path not in self.state.get("modified", ())
+
+
+def fsmonitor_enabled() -> bool:
+    try:
+        return get_config_bool("pit", "fsmonitor", False)
+    except ValueError as e:
+        print(f"[warn] {e}")
+        return False
+
+
+def load_fsmonitor_state() -> dict:
+    try:
+        with open(get_fsmonitor_state_path(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_fsmonitor_state(token: str, index_stamp: int, modified: List[str]) -> None:
+    """
+    Record the token a status run saw the worktree at, with the index
+    it compared against and the tracked files it found modified.
+    """
+    path = get_fsmonitor_state_path()
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix="fsmonitor_", dir=path.parent)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"token": token, "index": index_stamp, "modified": modified}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def query_fsmonitor() -> Optional[FSMonitorAnswer]:
+    """
+    Ask the daemon what changed since the saved token. None when
+    pit.fsmonitor is off or the daemon is not running.
+    """
+    if not fsmonitor_enabled():
+        return None
+    state = load_fsmonitor_state()
+    since = state.get("token", "")
+    reply = fsmonitor_request(f"query {since}")
+    if not reply or "token" not in reply:
+        return None
+    paths = reply.get("paths")
+    return FSMonitorAnswer(since, reply["token"], None if paths is None else set(paths), state)
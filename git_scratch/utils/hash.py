@@ -1,8 +1,27 @@
 
 import hashlib
+import os
+
+CHUNK_SIZE = 64 * 1024
 
 def compute_blob_hash(content: bytes) -> tuple[str, bytes]:
     header = f"blob {len(content)}\0".encode()
     full_data = header + content
     oid = hashlib.sha1(full_data).hexdigest()
     return oid, full_data
+
+def compute_file_hash(file_path: str) -> str:
+    """
+    Compute the blob OID of a file by feeding it to SHA-1 in fixed-size
+    chunks, so that memory use does not depend on the file size.
+    """
+    size = os.stat(file_path).st_size
+    sha = hashlib.sha1(f"blob {size}\0".encode())
+    read = 0
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+            read += len(chunk)
+    if read != size:
+        raise ValueError(f"{file_path} changed while being hashed.")
+    return sha.hexdigest()
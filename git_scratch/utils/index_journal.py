@@ -0,0 +1,84 @@
+import hashlib
+import os
+import struct
+from pathlib import Path
+from typing import Callable, List, Optional
+
+JOURNAL_SIGNATURE = b"PITJ"
+JOURNAL_VERSION = 1
+# Signature, version and checksum of the base index the journal applies to
+HEADER_SIZE = 4 + 4 + 20
+
+
+def get_journal_path() -> Path:
+    """
+    Returns the path to .git/index.journal, the append-only log of changes
+    made on top of .git/index in split-index mode.
+    """
+    return Path(os.getcwd()) / ".git" / "index.journal"
+
+
+def read_journal(base_checksum: bytes) -> Optional[List[bytes]]:
+    """
+    Return the payloads of the journal chunks, or None if there is no
+    journal for the index whose checksum is *base_checksum* (missing file,
+    or a journal left over from an index rewritten since).
+
+    A chunk cut short by a crash, and anything after it, is ignored.
+    """
+    try:
+        with open(get_journal_path(), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    if len(data) < HEADER_SIZE or data[:4] != JOURNAL_SIGNATURE:
+        return None
+    version = struct.unpack_from(">I", data, 4)[0]
+    if version != JOURNAL_VERSION or data[8:HEADER_SIZE] != base_checksum:
+        return None
+
+    chunks = []
+    pos = HEADER_SIZE
+    while pos + 4 <= len(data):
+        size = struct.unpack_from(">I", data, pos)[0]
+        payload = data[pos + 4:pos + 4 + size]
+        checksum = data[pos + 4 + size:pos + 24 + size]
+        if len(payload) != size or hashlib.sha1(payload).digest() != checksum:
+            break
+        chunks.append(payload)
+        pos += 24 + size
+    return chunks
+
+
+def append_journal(base_checksum: bytes, fresh: bool, build_payload: Callable[[int], bytes]) -> None:
+    """
+    Append one chunk to the journal, starting a new journal for the index
+    *base_checksum* when *fresh* is set. *build_payload* receives the
+    journal timestamp, used to detect racily clean entries.
+
+    Must be called with the index lock held.
+    """
+    path = get_journal_path()
+    with open(path, "wb" if fresh else "ab") as f:
+        if fresh:
+            f.write(JOURNAL_SIGNATURE + struct.pack(">I", JOURNAL_VERSION) + base_checksum)
+            f.flush()
+        # Bump the timestamp first: an append must not keep the time of the
+        # previous chunk
+        os.utime(path)
+        payload = build_payload(os.stat(path).st_mtime_ns)
+        f.write(struct.pack(">I", len(payload)) + payload + hashlib.sha1(payload).digest())
+
+
+def remove_journal() -> None:
+    path = get_journal_path()
+    if path.exists():
+        path.unlink()
+
+
+def journal_mtime_ns() -> int:
+    try:
+        return get_journal_path().stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
@@ -2,43 +2,524 @@
 import os
 import json
 import stat
+import struct
+import hashlib
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from git_scratch.utils.cache_tree import CACHE_TREE_SIGNATURE, CacheTree
+from git_scratch.utils.config import get_config_bool, get_config_int
+from git_scratch.utils.index_journal import append_journal, journal_mtime_ns, read_journal, remove_journal
+
+INDEX_SIGNATURE = b"DIRC"
+INDEX_VERSION = 2
+SUPPORTED_INDEX_VERSIONS = (2, 3, 4)
+
+# ctime s/ns, mtime s/ns, dev, ino, mode, uid, gid, size, sha-1, flags
+ENTRY_STRUCT = struct.Struct(">10I20sH")
+FLAG_EXTENDED = 0x4000
+FLAG_NAME_MASK = 0x0FFF
+
+# The index stores every stat field on 32 bits
+UINT32 = 0xFFFFFFFF
+EMPTY_BLOB_OID = "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+# Split-index journal records: upsert an entry, delete a path, store the cache-tree
+JOURNAL_ADD = b"A"
+JOURNAL_DELETE = b"D"
+JOURNAL_TREE = b"T"
+DEFAULT_SPLIT_INDEX_MAX_PERCENT = 20
 
 def get_index_path():
     """
-    Returns the path to the .git/index.json file based on the current directory.
+    Returns the path to the binary .git/index file based on the current directory.
+    """
+    return Path(os.getcwd()) / ".git" / "index"
+
+def get_index_lock_path():
+    """
+    Returns the path to .git/index.lock, held while the index is rewritten.
+    """
+    return Path(os.getcwd()) / ".git" / "index.lock"
+
+def get_legacy_index_path():
+    """
+    Returns the path to the .git/index.json file written by older versions.
     """
     return Path(os.getcwd()) / ".git" / "index.json"
 
 def load_index():
     """
-    Load the index.json file from .git/, or return an empty list if not found.
+    Load the index from .git/index, falling back to a legacy .git/index.json.
+    In split-index mode, the changes recorded in .git/index.journal are
+    applied on top. Returns an empty list if there is no index yet.
+
+    Raises:
+        ValueError: If the index file is corrupt or uses an unsupported version.
     """
+    index = _read_index()
+    return index.sorted_entries() if index.journal_size else list(index)
+
+def _read_index() -> "IndexTransaction":
+    extensions: Dict[bytes, bytes] = {}
     index_path = get_index_path()
-    if not index_path.exists():
-        return []
+    if index_path.exists():
+        with open(index_path, "rb") as f:
+            data = f.read()
+        entries = parse_index(data, extensions)
+        checksum = data[-20:]
+        return IndexTransaction(entries, extensions, read_journal(checksum), checksum)
 
-    with open(index_path, "r") as f:
-        return json.load(f)
+    legacy_path = get_legacy_index_path()
+    if legacy_path.exists():
+        with open(legacy_path, "r") as f:
+            return IndexTransaction(json.load(f))
+    return IndexTransaction([])
 
-def save_index(index):
+def index_timestamp_ns() -> int:
     """
-    Save the given index to .git/index.json.
+    Time of the last index write (base index or journal), against which
+    racily clean entries are detected.
     """
     index_path = get_index_path()
-    index_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(index_path, "w") as f:
-        json.dump(index, f, indent=2)
+    if not index_path.exists():
+        return 0
+    return max(index_path.stat().st_mtime_ns, journal_mtime_ns())
+
+def save_index(index):
+    """
+    Save the given index to .git/index in Git's binary format (version 2).
+    """
+    with index_transaction() as transaction:
+        transaction.replace(index)
+
+def _acquire_index_lock() -> int:
+    """
+    Create .git/index.lock exclusively, as Git does, and return its
+    descriptor.
+
+    Raises:
+        FileExistsError: If another process holds the lock.
+    """
+    lock_path = get_index_lock_path()
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        return os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        raise FileExistsError(
+            f"Unable to create '{lock_path}': File exists. "
+            "Another pit process seems to be running in this repository."
+        )
+
+def _commit_index_lock(fd: int, index, extensions=()) -> None:
+    """
+    Write *index* through the lock file, then rename it over .git/index.
+    A legacy index.json is removed, which completes the migration.
+    """
+    with os.fdopen(fd, "wb") as f:
+        # The new file's timestamp, taken before writing, tells which
+        # entries are racily clean
+        f.write(serialize_index(index, os.fstat(f.fileno()).st_mtime_ns, extensions))
+    os.replace(get_index_lock_path(), get_index_path())
+    # The journal refers to the previous base index
+    remove_journal()
+
+    legacy_path = get_legacy_index_path()
+    if legacy_path.exists():
+        legacy_path.unlink()
+
+def _split_index_max_percent() -> Optional[int]:
+    """
+    Return the journal size, in percent of the index entries, above which
+    the journal is merged back; None when split-index mode is off
+    (pit.splitIndex, pit.splitIndexMaxPercentChange).
+    """
+    try:
+        if not get_config_bool("pit", "splitIndex", False):
+            return None
+        return get_config_int("pit", "splitIndexMaxPercentChange", DEFAULT_SPLIT_INDEX_MAX_PERCENT)
+    except ValueError as e:
+        print(f"[warn] {e}")
+        return None
+
+class IndexTransaction:
+    """
+    Index entries keyed by path, loaded once and written back once when
+    the enclosing index_transaction() block ends.
+
+    Changes are also kept as journal records, so that in split-index mode
+    only they are appended to .git/index.journal instead of rewriting the
+    whole index.
+    """
+
+    def __init__(self, entries, extensions: Optional[Dict[bytes, bytes]] = None,
+                 journal: Optional[List[bytes]] = None, base_checksum: Optional[bytes] = None):
+        self.entries: Dict[str, dict] = {e["path"]: e for e in entries}
+        self.changed = False
+        self.cache_tree = CacheTree()
+        if extensions and CACHE_TREE_SIGNATURE in extensions:
+            try:
+                self.cache_tree = CacheTree.parse(extensions[CACHE_TREE_SIGNATURE])
+            except ValueError:
+                pass  # only a cache: rebuilt on the next write-tree
+
+        # Checksum of the binary base index, and whether a journal for it exists
+        self.base_checksum = base_checksum
+        self.has_journal = journal is not None
+        self.journal_size = 0
+        self._records: List[Tuple[bytes, object]] = []
+        self._rewrite = False
+        for payload in journal or ():
+            for record in _decode_journal(payload):
+                self._apply(record)
+                self.journal_size += 1
+        self._records = []
+        self.changed = False
+
+    def _apply(self, record: Tuple[bytes, object]) -> None:
+        kind, value = record
+        if kind == JOURNAL_ADD:
+            self.add(value)
+        elif kind == JOURNAL_DELETE:
+            self.remove(value)
+        elif kind == JOURNAL_TREE:
+            try:
+                self.cache_tree = CacheTree.parse(value)
+            except ValueError:
+                self.cache_tree = CacheTree()
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.entries.values())
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, path: str) -> Optional[dict]:
+        return self.entries.get(path)
+
+    def add(self, entry: dict) -> None:
+        """
+        Insert *entry*, replacing any entry with the same path.
+        """
+        previous = self.entries.get(entry["path"])
+        self.entries[entry["path"]] = entry
+        # A stat refresh leaves the tree of the directory unchanged
+        if previous is None or (previous["oid"], previous["mode"]) != (entry["oid"], entry["mode"]):
+            self.cache_tree.invalidate(entry["path"])
+        self._records.append((JOURNAL_ADD, entry))
+        self.changed = True
+
+    def remove(self, path: str) -> bool:
+        """
+        Remove the entry for *path*. Returns False if there was none.
+        """
+        if self.entries.pop(path, None) is None:
+            return False
+        self.cache_tree.invalidate(path)
+        self._records.append((JOURNAL_DELETE, path))
+        self.changed = True
+        return True
+
+    def replace(self, entries, cache_tree: Optional[CacheTree] = None) -> None:
+        """
+        Replace every entry. *cache_tree* may describe the new entries,
+        e.g. when they come from a known tree.
+        """
+        self.entries = {e["path"]: e for e in entries}
+        self.cache_tree = cache_tree or CacheTree()
+        self._rewrite = True
+        self.changed = True
+
+    def sorted_entries(self) -> List[dict]:
+        return sorted(self.entries.values(), key=lambda e: e["path"].encode())
+
+    def write_tree(self, write_tree: Callable[[bytes], str]) -> str:
+        """
+        Return the root tree OID of the index, storing the trees of the
+        directories changed since the last call with *write_tree*.
+        """
+        if not self.cache_tree.valid:
+            self.cache_tree.update(self.sorted_entries(), write_tree)
+            self._records.append((JOURNAL_TREE, self.cache_tree.serialize()))
+            self.changed = True
+        return self.cache_tree.oid.hex()
+
+    def can_append_journal(self) -> bool:
+        """
+        True if the changes can go to the journal: split-index mode is on,
+        there is a binary base index, and the journal stays under
+        pit.splitIndexMaxPercentChange percent of the entries.
+        """
+        if self._rewrite or self.base_checksum is None:
+            return False
+        max_percent = _split_index_max_percent()
+        if max_percent is None:
+            return False
+        return (self.journal_size + len(self._records)) * 100 <= max_percent * len(self.entries)
+
+    def append_journal(self) -> None:
+        append_journal(
+            self.base_checksum,
+            not self.has_journal,
+            lambda timestamp: _encode_journal(self._records, timestamp),
+        )
+
+    def extensions(self) -> List[Tuple[bytes, bytes]]:
+        if not self.cache_tree.valid and not self.cache_tree.children:
+            return []
+        return [(CACHE_TREE_SIGNATURE, self.cache_tree.serialize())]
+
+@contextmanager
+def index_transaction():
+    """
+    Lock the index, load it once and yield an IndexTransaction. If it was
+    changed, it is written atomically when the block exits without error;
+    otherwise, or on error, the index is left untouched.
+
+    Raises:
+        FileExistsError: If the index is locked by another process.
+    """
+    lock_path = get_index_lock_path()
+    fd = _acquire_index_lock()
+    committed = False
+    try:
+        transaction = _read_index()
+        yield transaction
+        if transaction.changed and transaction.can_append_journal():
+            transaction.append_journal()
+        elif transaction.changed:
+            # The descriptor is consumed by the commit, even if it fails
+            descriptor, fd = fd, None
+            _commit_index_lock(descriptor, list(transaction), transaction.extensions())
+            committed = True
+    finally:
+        if fd is not None:
+            os.close(fd)
+        if not committed and lock_path.exists():
+            lock_path.unlink()
+
+def serialize_index(index, index_mtime_ns: int = 0, extensions=()) -> bytes:
+    """
+    Encode entries as a DIRC version 2 index: header, entries sorted by
+    path, the (signature, payload) *extensions*, and a trailing SHA-1 of
+    everything before it.
+
+    Entries modified at or after *index_mtime_ns* could change again within
+    the same timestamp tick without their stat data changing ("racy git"):
+    their size is written as 0 so that they are always rehashed.
+    """
+    entries = sorted(index, key=lambda e: e["path"].encode())
+    out = bytearray(INDEX_SIGNATURE + struct.pack(">II", INDEX_VERSION, len(entries)))
+
+    for entry in entries:
+        packed = _pack_entry(entry, index_mtime_ns)
+        out += packed
+        # 1 to 8 NUL bytes so that the entry length is a multiple of 8
+        out += b"\x00" * (8 - len(packed) % 8)
+
+    for signature, payload in extensions:
+        out += signature + struct.pack(">I", len(payload)) + payload
+
+    out += hashlib.sha1(out).digest()
+    return bytes(out)
+
+def _pack_entry(entry: dict, index_mtime_ns: int = 0) -> bytes:
+    """
+    Encode the fixed-width fields and the path of an entry, unpadded.
+    """
+    path = entry["path"].encode()
+    ctime = entry.get("ctime_ns", 0)
+    mtime = entry.get("mtime_ns", 0)
+    size = entry.get("size", 0)
+    if index_mtime_ns and mtime >= index_mtime_ns:
+        size = 0
+    return ENTRY_STRUCT.pack(
+        (ctime // 10**9) & UINT32, ctime % 10**9,
+        (mtime // 10**9) & UINT32, mtime % 10**9,
+        entry.get("dev", 0) & UINT32,
+        entry.get("ino", 0) & UINT32,
+        int(entry["mode"], 8),
+        entry.get("uid", 0) & UINT32,
+        entry.get("gid", 0) & UINT32,
+        size & UINT32,
+        bytes.fromhex(entry["oid"]),
+        min(len(path), FLAG_NAME_MASK),
+    ) + path
+
+def _entry_from_fields(fields: tuple, path: bytes) -> dict:
+    (ctime_s, ctime_ns, mtime_s, mtime_ns, dev, ino,
+     mode, uid, gid, size, oid, _) = fields
+    return {
+        "mode": f"{mode:o}",
+        "oid": oid.hex(),
+        "path": path.decode(),
+        "ctime_ns": ctime_s * 10**9 + ctime_ns,
+        "mtime_ns": mtime_s * 10**9 + mtime_ns,
+        "dev": dev,
+        "ino": ino,
+        "uid": uid,
+        "gid": gid,
+        "size": size,
+    }
+
+def _encode_journal(records: List[Tuple[bytes, object]], timestamp_ns: int) -> bytes:
+    out = bytearray()
+    for kind, value in records:
+        out += kind
+        if kind == JOURNAL_ADD:
+            out += _pack_entry(value, timestamp_ns) + b"\x00"
+        elif kind == JOURNAL_DELETE:
+            out += value.encode() + b"\x00"
+        else:
+            out += struct.pack(">I", len(value)) + value
+    return bytes(out)
+
+def _decode_journal(payload: bytes) -> Iterator[Tuple[bytes, object]]:
+    pos = 0
+    while pos < len(payload):
+        kind = payload[pos:pos + 1]
+        pos += 1
+        if kind == JOURNAL_ADD:
+            fields = ENTRY_STRUCT.unpack_from(payload, pos)
+            end = payload.index(b"\x00", pos + ENTRY_STRUCT.size)
+            yield kind, _entry_from_fields(fields, payload[pos + ENTRY_STRUCT.size:end])
+            pos = end + 1
+        elif kind == JOURNAL_DELETE:
+            end = payload.index(b"\x00", pos)
+            yield kind, payload[pos:end].decode()
+            pos = end + 1
+        elif kind == JOURNAL_TREE:
+            size = struct.unpack_from(">I", payload, pos)[0]
+            yield kind, payload[pos + 4:pos + 4 + size]
+            pos += 4 + size
+        else:
+            raise ValueError(f"Invalid index journal record {kind!r}.")
+
+def parse_index(data: bytes, extensions: Optional[Dict[bytes, bytes]] = None):
+    """
+    Decode a DIRC index (versions 2, 3 and 4). The payload of optional
+    extensions is stored in *extensions* when given, otherwise skipped.
+
+    Raises:
+        ValueError: If the file is corrupt or uses an unsupported version.
+    """
+    if len(data) < 32 or data[:4] != INDEX_SIGNATURE:
+        raise ValueError("Invalid index file: bad signature.")
+    if hashlib.sha1(data[:-20]).digest() != data[-20:]:
+        raise ValueError("Invalid index file: checksum mismatch.")
+    version, count = struct.unpack_from(">II", data, 4)
+    if version not in SUPPORTED_INDEX_VERSIONS:
+        raise ValueError(f"Unsupported index version {version}.")
+
+    entries = []
+    pos = 12
+    previous = b""
+    for _ in range(count):
+        start = pos
+        fields = ENTRY_STRUCT.unpack_from(data, pos)
+        flags = fields[-1]
+        pos += ENTRY_STRUCT.size
+        if flags & FLAG_EXTENDED:
+            if version < 3:
+                raise ValueError("Invalid index file: extended flags in a version 2 index.")
+            pos += 2
+
+        if version == 4:
+            # Path prefix-compressed against the previous entry, no padding
+            strip, pos = _read_varint(data, pos)
+            end = data.index(b"\x00", pos)
+            path = previous[:len(previous) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            end = data.index(b"\x00", pos)
+            path = data[pos:end]
+            length = end - start
+            pos = start + length + 8 - length % 8
+        previous = path
+
+        entries.append(_entry_from_fields(fields, path))
+
+    # Extensions: 4-byte signature and 32-bit size. Those starting with an
+    # uppercase letter are optional and can be ignored.
+    while pos < len(data) - 20:
+        signature = data[pos:pos + 4]
+        size = struct.unpack_from(">I", data, pos + 4)[0]
+        if not (b"A" <= signature[:1] <= b"Z"):
+            raise ValueError(f"Unsupported index extension {signature!r}.")
+        if extensions is not None:
+            extensions[signature] = data[pos + 8:pos + 8 + size]
+        pos += 8 + size
+
+    return entries
+
+def _read_varint(data: bytes, pos: int):
+    """
+    Decode the offset-encoded integer used by index version 4.
+    """
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos
+
+def stat_data(st: os.stat_result) -> dict:
+    """
+    Return the stat fields stored in an index entry for *st*.
+    """
+    return {
+        "ctime_ns": st.st_ctime_ns,
+        "mtime_ns": st.st_mtime_ns,
+        "dev": st.st_dev,
+        "ino": st.st_ino,
+        "uid": st.st_uid,
+        "gid": st.st_gid,
+        "size": st.st_size,
+    }
+
+def _stat_key(values: dict) -> tuple:
+    # Compare what the index can hold: seconds and sizes are truncated to 32 bits
+    return (
+        (values.get("ctime_ns", 0) // 10**9) & UINT32, values.get("ctime_ns", 0) % 10**9,
+        (values.get("mtime_ns", 0) // 10**9) & UINT32, values.get("mtime_ns", 0) % 10**9,
+        values.get("dev", 0) & UINT32,
+        values.get("ino", 0) & UINT32,
+        values.get("uid", 0) & UINT32,
+        values.get("gid", 0) & UINT32,
+        values.get("size", 0) & UINT32,
+    )
+
+def is_stat_clean(entry: dict, st: os.stat_result, index_mtime_ns: int) -> bool:
+    """
+    True if *entry* can be trusted to match the file described by *st*
+    without rehashing it: its stat data must be identical and it must not
+    be racily clean, i.e. modified in the same tick as the index write.
+    """
+    if _stat_key(entry) != _stat_key(stat_data(st)):
+        return False
+    if entry.get("mtime_ns", 0) >= index_mtime_ns:
+        return False
+    # A size of 0 on a non-empty blob marks an entry smudged as racy
+    if entry.get("size", 0) == 0 and entry["oid"] != EMPTY_BLOB_OID:
+        return False
+    return True
 
 def compute_mode(file_path):
     """
     Compute the file mode as a string (e.g. '100644', '100755', '120000').
     """
-    st = os.stat(file_path)
+    return mode_from_stat(os.stat(file_path))
+
+def mode_from_stat(st: os.stat_result) -> str:
     if stat.S_ISLNK(st.st_mode):
         return "120000"
     elif st.st_mode & stat.S_IXUSR:
         return "100755"
     else:
         return "100644"
-
@@ -0,0 +1,86 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import sys
+from typing import List, Tuple
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+# struct inotify_event: wd, mask, cookie, len, then the NUL-padded name
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+def _error(message: str) -> OSError:
+    code = ctypes.get_errno()
+    return OSError(code, f"{message}: {os.strerror(code)}")
+
+
+class Inotify:
+    """
+    Minimal ctypes binding of the Linux inotify API, in non-blocking mode.
+
+    Raises:
+        OSError: If inotify is not available on this system.
+    """
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux.")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise _error("inotify_init1 failed")
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            raise _error(f"Cannot watch {path}")
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        # The watch may already be gone with its directory
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """
+        Return every pending (wd, mask, name) event without blocking.
+        """
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                return events
+            pos = 0
+            while pos + _EVENT.size <= len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                name = os.fsdecode(data[pos:pos + length].rstrip(b"\x00"))
+                pos += length
+                events.append((wd, mask, name))
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
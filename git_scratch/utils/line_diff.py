@@ -0,0 +1,688 @@
+import sys
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_CONTEXT = 3
+ALGORITHMS = ("myers", "histogram")
+# Lines more frequent than this are not used as anchors by the histogram
+# algorithm (Git's value); a region made only of those goes to Myers
+MAX_CHAIN_LENGTH = 64
+# Git's Myers heuristics (xdiff): cost above which the search may stop
+# early, length of a snake worth stopping on, how far to look around a
+# frequent line to decide whether to drop it
+MAX_COST_MIN = 256
+HEURISTIC_MIN_COST = 256
+HEURISTIC_FACTOR = 4
+SNAKE_COUNT = 20
+MAX_EQUAL_LIMIT = 1024
+SIMSCAN_WINDOW = 100
+KPDIS_RUN = 4
+_LINE_MAX = sys.maxsize
+# Git only shows this much of the line quoted after a hunk header
+FUNC_LINE_LENGTH = 80
+
+# Git's indent heuristic: where to put an ambiguous group of changed lines
+MAX_INDENT = 200
+MAX_BLANKS = 20
+INDENT_HEURISTIC_MAX_SLIDING = 100
+START_OF_FILE_PENALTY = 1
+END_OF_FILE_PENALTY = 21
+TOTAL_BLANK_WEIGHT = -30
+POST_BLANK_WEIGHT = 6
+RELATIVE_INDENT_PENALTY = -4
+RELATIVE_INDENT_WITH_BLANK_PENALTY = 10
+RELATIVE_OUTDENT_PENALTY = 24
+RELATIVE_OUTDENT_WITH_BLANK_PENALTY = 17
+RELATIVE_DEDENT_PENALTY = 23
+RELATIVE_DEDENT_WITH_BLANK_PENALTY = 17
+INDENT_WEIGHT = 60
+
+# A changed region: old lines [a_start, a_end) became new lines [b_start, b_end)
+Block = Tuple[int, int, int, int]
+
+
+class DiffTooCostly(ValueError):
+    """Raised when a diff needs more work than it was allowed."""
+
+
+class _Budget:
+    """
+    Work left for one diff, counted in elementary steps (a diagonal
+    tried, a line compared or indexed); None means unlimited.
+    """
+
+    def __init__(self, limit: Optional[int]):
+        self.left = limit
+
+    def spend(self, steps: int) -> None:
+        if self.left is None:
+            return
+        self.left -= steps
+        if self.left < 0:
+            raise DiffTooCostly("diff too costly")
+
+
+def split_lines(data: bytes) -> List[bytes]:
+    """Split *data* into lines, keeping their "\\n" (the last may lack it)."""
+    lines = data.split(b"\n")
+    last = lines.pop()
+    result = [line + b"\n" for line in lines]
+    if last:
+        result.append(last)
+    return result
+
+
+def _intern(a: Sequence[bytes], b: Sequence[bytes]) -> Tuple[List[int], List[int]]:
+    # Compare small ints instead of byte strings
+    ids: Dict[bytes, int] = {}
+    return ([ids.setdefault(line, len(ids)) for line in a],
+            [ids.setdefault(line, len(ids)) for line in b])
+
+
+def _bogosqrt(n: int) -> int:
+    # Git's cheap power-of-two square root
+    root = 1
+    while n > 0:
+        n >>= 2
+        root <<= 1
+    return root
+
+
+def _split(ha1: List[int], off1: int, lim1: int, ha2: List[int], off2: int, lim2: int,
+           kvdf: List[int], kvdb: List[int], base: int, need_min: bool,
+           max_cost: int, budget: _Budget) -> Tuple[int, int, bool, bool]:
+    """
+    Myers' middle snake, searched from both ends at once in the shared
+    diagonal vectors *kvdf* and *kvdb* (diagonal d at base + d). Returns
+    the split point and whether each half still needs a minimal diff.
+    Unless *need_min*, Git's heuristics cut the search short once it gets
+    costly: a long enough snake, or else the furthest reaching path.
+    """
+    dmin, dmax = off1 - lim2, lim1 - off2
+    fmid, bmid = off1 - off2, lim1 - lim2
+    odd = (fmid - bmid) & 1
+    fmin = fmax = fmid
+    bmin = bmax = bmid
+    kvdf[base + fmid] = off1
+    kvdb[base + bmid] = lim1
+    ec = 0
+    while True:
+        ec += 1
+        got_snake = False
+        budget.spend(fmax - fmin + bmax - bmin + 2)
+        # Grow the range of diagonals by one on each side, or shrink it
+        # where it hits the box; the new outer ones read as unreachable
+        if fmin > dmin:
+            fmin -= 1
+            kvdf[base + fmin - 1] = -1
+        else:
+            fmin += 1
+        if fmax < dmax:
+            fmax += 1
+            kvdf[base + fmax + 1] = -1
+        else:
+            fmax -= 1
+        for d in range(fmax, fmin - 1, -2):
+            if kvdf[base + d - 1] >= kvdf[base + d + 1]:
+                i1 = kvdf[base + d - 1] + 1
+            else:
+                i1 = kvdf[base + d + 1]
+            prev1 = i1
+            i2 = i1 - d
+            while i1 < lim1 and i2 < lim2 and ha1[i1] == ha2[i2]:
+                i1 += 1
+                i2 += 1
+            if i1 - prev1 > SNAKE_COUNT:
+                got_snake = True
+                budget.spend(i1 - prev1)
+            kvdf[base + d] = i1
+            if odd and bmin <= d <= bmax and kvdb[base + d] <= i1:
+                return i1, i2, True, True
+
+        if bmin > dmin:
+            bmin -= 1
+            kvdb[base + bmin - 1] = _LINE_MAX
+        else:
+            bmin += 1
+        if bmax < dmax:
+            bmax += 1
+            kvdb[base + bmax + 1] = _LINE_MAX
+        else:
+            bmax -= 1
+        for d in range(bmax, bmin - 1, -2):
+            if kvdb[base + d - 1] < kvdb[base + d + 1]:
+                i1 = kvdb[base + d - 1]
+            else:
+                i1 = kvdb[base + d + 1] - 1
+            prev1 = i1
+            i2 = i1 - d
+            while i1 > off1 and i2 > off2 and ha1[i1 - 1] == ha2[i2 - 1]:
+                i1 -= 1
+                i2 -= 1
+            if prev1 - i1 > SNAKE_COUNT:
+                got_snake = True
+                budget.spend(prev1 - i1)
+            kvdb[base + d] = i1
+            if not odd and fmin <= d <= fmax and i1 <= kvdf[base + d]:
+                return i1, i2, True, True
+
+        if need_min:
+            continue
+
+        if got_snake and ec > HEURISTIC_MIN_COST:
+            # Take a path that went far from its corner and ends in a
+            # snake of SNAKE_COUNT lines
+            best = 0
+            for d in range(fmax, fmin - 1, -2):
+                i1 = kvdf[base + d]
+                i2 = i1 - d
+                v = (i1 - off1) + (i2 - off2) - abs(d - fmid)
+                if (v > HEURISTIC_FACTOR * ec and v > best
+                        and off1 + SNAKE_COUNT <= i1 < lim1 and off2 + SNAKE_COUNT <= i2 < lim2
+                        and all(ha1[i1 - k] == ha2[i2 - k] for k in range(1, SNAKE_COUNT + 1))):
+                    best, split = v, (i1, i2)
+            if best > 0:
+                return split[0], split[1], True, False
+
+            for d in range(bmax, bmin - 1, -2):
+                i1 = kvdb[base + d]
+                i2 = i1 - d
+                v = (lim1 - i1) + (lim2 - i2) - abs(d - bmid)
+                if (v > HEURISTIC_FACTOR * ec and v > best
+                        and off1 < i1 <= lim1 - SNAKE_COUNT and off2 < i2 <= lim2 - SNAKE_COUNT
+                        and all(ha1[i1 + k] == ha2[i2 + k] for k in range(SNAKE_COUNT))):
+                    best, split = v, (i1, i2)
+            if best > 0:
+                return split[0], split[1], False, True
+
+        if ec >= max_cost:
+            # Too costly: split on the path that got the furthest
+            fbest = fbest1 = -1
+            for d in range(fmax, fmin - 1, -2):
+                i1 = min(kvdf[base + d], lim1)
+                i2 = i1 - d
+                if lim2 < i2:
+                    i1, i2 = lim2 + d, lim2
+                if fbest < i1 + i2:
+                    fbest, fbest1 = i1 + i2, i1
+            bbest = bbest1 = _LINE_MAX
+            for d in range(bmax, bmin - 1, -2):
+                i1 = max(off1, kvdb[base + d])
+                i2 = i1 - d
+                if i2 < off2:
+                    i1, i2 = off2 + d, off2
+                if i1 + i2 < bbest:
+                    bbest, bbest1 = i1 + i2, i1
+            if (lim1 + lim2) - bbest < fbest - (off1 + off2):
+                return fbest1, fbest - fbest1, True, False
+            return bbest1, bbest - bbest1, False, True
+
+
+def _clean_mmatch(dis: bytearray, i: int, start: int, end: int) -> bool:
+    """
+    Whether line *i*, which has many matches, sits among lines with no
+    match (rather than among other many-match lines) and can be dropped.
+    """
+    start = max(start, i - SIMSCAN_WINDOW)
+    end = min(end, i + SIMSCAN_WINDOW)
+    before, many_before = 0, 1
+    r = 1
+    while i - r >= start:
+        if not dis[i - r]:
+            before += 1
+        elif dis[i - r] == 2:
+            many_before += 1
+        else:
+            break
+        r += 1
+    if not before:
+        return False
+    after, many_after = 0, 1
+    r = 1
+    while i + r <= end:
+        if not dis[i + r]:
+            after += 1
+        elif dis[i + r] == 2:
+            many_after += 1
+        else:
+            break
+        r += 1
+    if not after:
+        return False
+    many = many_before + many_after
+    return many * KPDIS_RUN < many + before + after
+
+
+def _myers(a: List[int], b: List[int], changed_a: bytearray, changed_b: bytearray,
+           minimal: bool = False, budget: Optional[_Budget] = None) -> None:
+    """
+    Git's classic diff of two whole sides: the common prefix and suffix
+    are trimmed, lines without a match on the other side are marked
+    changed up front, then the rest is split on middle snakes.
+    """
+    n, m = len(a), len(b)
+    budget = budget or _Budget(None)
+    budget.spend(n + m)
+    start = 0
+    while start < n and start < m and a[start] == b[start]:
+        start += 1
+    suffix = 0
+    while suffix < min(n, m) - start and a[n - 1 - suffix] == b[m - 1 - suffix]:
+        suffix += 1
+    end1, end2 = n - suffix - 1, m - suffix - 1
+
+    # 0: no match on the other side, 1: some, 2: too many to be useful
+    counts_a, counts_b = Counter(a), Counter(b)
+    limit = min(_bogosqrt(n), MAX_EQUAL_LIMIT)
+    dis1 = bytearray(n)
+    for i in range(start, end1 + 1):
+        matches = counts_b[a[i]]
+        dis1[i] = 0 if not matches else 2 if matches >= limit and not minimal else 1
+    limit = min(_bogosqrt(m), MAX_EQUAL_LIMIT)
+    dis2 = bytearray(m)
+    for i in range(start, end2 + 1):
+        matches = counts_a[b[i]]
+        dis2[i] = 0 if not matches else 2 if matches >= limit and not minimal else 1
+
+    rindex1 = []
+    for i in range(start, end1 + 1):
+        if dis1[i] == 1 or (dis1[i] == 2 and not _clean_mmatch(dis1, i, start, end1)):
+            rindex1.append(i)
+        else:
+            changed_a[i] = 1
+    rindex2 = []
+    for i in range(start, end2 + 1):
+        if dis2[i] == 1 or (dis2[i] == 2 and not _clean_mmatch(dis2, i, start, end2)):
+            rindex2.append(i)
+        else:
+            changed_b[i] = 1
+    ha1 = [a[i] for i in rindex1]
+    ha2 = [b[i] for i in rindex2]
+
+    diagonals = len(ha1) + len(ha2) + 3
+    kvdf = [0] * diagonals
+    kvdb = [0] * diagonals
+    base = len(ha2) + 1
+    max_cost = max(_bogosqrt(diagonals), MAX_COST_MIN)
+    stack = [(0, len(ha1), 0, len(ha2), minimal)]
+    while stack:
+        off1, lim1, off2, lim2, need_min = stack.pop()
+        while off1 < lim1 and off2 < lim2 and ha1[off1] == ha2[off2]:
+            off1 += 1
+            off2 += 1
+        while off1 < lim1 and off2 < lim2 and ha1[lim1 - 1] == ha2[lim2 - 1]:
+            lim1 -= 1
+            lim2 -= 1
+        if off1 == lim1:
+            for i in rindex2[off2:lim2]:
+                changed_b[i] = 1
+        elif off2 == lim2:
+            for i in rindex1[off1:lim1]:
+                changed_a[i] = 1
+        else:
+            i1, i2, min_lo, min_hi = _split(ha1, off1, lim1, ha2, off2, lim2, kvdf, kvdb, base, need_min, max_cost, budget)
+            stack.append((i1, lim1, i2, lim2, min_hi))
+            stack.append((off1, i1, off2, i2, min_lo))
+
+
+def _classic_region(a: List[int], b: List[int], line1: int, count1: int, line2: int, count2: int,
+                    changed_a: bytearray, changed_b: bytearray, minimal: bool, budget: _Budget) -> None:
+    # Run the classic diff on a region as if it were two whole files
+    sub_a, sub_b = bytearray(count1), bytearray(count2)
+    _myers(a[line1:line1 + count1], b[line2:line2 + count2], sub_a, sub_b, minimal, budget)
+    changed_a[line1:line1 + count1] = sub_a
+    changed_b[line2:line2 + count2] = sub_b
+
+
+def _find_lcs(a: List[int], b: List[int], line1: int, count1: int,
+              line2: int, count2: int, budget: _Budget) -> Union[None, bool, Block]:
+    """
+    Find the common run the histogram diff splits a region on: the
+    longest one whose rarest line is least frequent in the old side
+    (inclusive bounds). None if the sides have no line in common, False
+    if all their common lines are too frequent to be used.
+    """
+    end1, end2 = line1 + count1 - 1, line2 + count2 - 1
+    budget.spend(count1 + count2)
+    occurrences: Dict[int, List[int]] = {}
+    for i in range(line1, end1 + 1):
+        occurrences.setdefault(a[i], []).append(i)
+
+    best: Optional[Block] = None
+    best_count = MAX_CHAIN_LENGTH + 1
+    has_common = False
+    b_ptr = line2
+    while b_ptr <= end2:
+        b_next = b_ptr + 1
+        positions = occurrences.get(b[b_ptr])
+        if positions is not None:
+            has_common = True
+            if len(positions) <= best_count:
+                k = 0
+                while True:
+                    as_, bs = positions[k], b_ptr
+                    ae, be = as_, bs
+                    count = len(positions)
+                    while line1 < as_ and line2 < bs and a[as_ - 1] == b[bs - 1]:
+                        as_ -= 1
+                        bs -= 1
+                        count = min(count, len(occurrences[a[as_]]))
+                    while ae < end1 and be < end2 and a[ae + 1] == b[be + 1]:
+                        ae += 1
+                        be += 1
+                        count = min(count, len(occurrences[a[ae]]))
+                    b_next = max(b_next, be + 1)
+                    budget.spend(ae - as_ + 1)
+                    if (best[1] - best[0] if best else 0) < ae - as_ or count < best_count:
+                        best = (as_, ae, bs, be)
+                        best_count = count
+                    # Next occurrence past the run just found
+                    k += 1
+                    while k < len(positions) and positions[k] <= ae:
+                        k += 1
+                    if k == len(positions):
+                        break
+        b_ptr = b_next
+
+    if has_common and best_count > MAX_CHAIN_LENGTH:
+        return False
+    return best
+
+
+def _histogram(a: List[int], b: List[int], changed_a: bytearray, changed_b: bytearray,
+               minimal: bool = False, budget: Optional[_Budget] = None) -> None:
+    """
+    Git's histogram diff: split each region around its common run of
+    rarest lines; regions whose common lines are all very frequent go to
+    the classic diff.
+    """
+    budget = budget or _Budget(None)
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        line1, count1, line2, count2 = stack.pop()
+        if not count1:
+            changed_b[line2:line2 + count2] = b"\x01" * count2
+            continue
+        if not count2:
+            changed_a[line1:line1 + count1] = b"\x01" * count1
+            continue
+        lcs = _find_lcs(a, b, line1, count1, line2, count2, budget)
+        if lcs is False:
+            _classic_region(a, b, line1, count1, line2, count2, changed_a, changed_b, minimal, budget)
+        elif lcs is None:
+            changed_a[line1:line1 + count1] = b"\x01" * count1
+            changed_b[line2:line2 + count2] = b"\x01" * count2
+        else:
+            as_, ae, bs, be = lcs
+            stack.append((ae + 1, line1 + count1 - ae - 1, be + 1, line2 + count2 - be - 1))
+            stack.append((line1, as_ - line1, line2, bs - line2))
+
+
+class _Groups:
+    """
+    The runs of changed lines of one side, with Git's sliding moves. The
+    k-th group of a side, possibly empty, faces the k-th of the other.
+    """
+
+    def __init__(self, lines: List[int], changed: bytearray):
+        self.lines = lines
+        self.changed = changed
+        self.start = self.end = 0
+        while self._changed(self.end):
+            self.end += 1
+
+    def _changed(self, i: int) -> bool:
+        return 0 <= i < len(self.changed) and bool(self.changed[i])
+
+    def next(self) -> bool:
+        if self.end == len(self.lines):
+            return False
+        self.start = self.end = self.end + 1
+        while self._changed(self.end):
+            self.end += 1
+        return True
+
+    def previous(self) -> bool:
+        if self.start == 0:
+            return False
+        self.end = self.start = self.start - 1
+        while self._changed(self.start - 1):
+            self.start -= 1
+        return True
+
+    def slide_down(self) -> bool:
+        if self.end < len(self.lines) and self.lines[self.start] == self.lines[self.end]:
+            self.changed[self.start] = 0
+            self.changed[self.end] = 1
+            self.start += 1
+            self.end += 1
+            while self._changed(self.end):
+                self.end += 1
+            return True
+        return False
+
+    def slide_up(self) -> bool:
+        if self.start > 0 and self.lines[self.start - 1] == self.lines[self.end - 1]:
+            self.start -= 1
+            self.end -= 1
+            self.changed[self.start] = 1
+            self.changed[self.end] = 0
+            while self._changed(self.start - 1):
+                self.start -= 1
+            return True
+        return False
+
+
+def _indent(line: bytes) -> int:
+    # Width of the leading whitespace (tabs to 8), -1 for a blank line
+    width = 0
+    for c in line:
+        if c == 0x20:
+            width += 1
+        elif c == 0x09:
+            width += 8 - width % 8
+        elif c not in b"\n\r\v\f":
+            return width
+        if width >= MAX_INDENT:
+            return MAX_INDENT
+    return -1
+
+
+def _split_score(text: Sequence[bytes], split: int) -> Tuple[int, int]:
+    """(indent, penalty) of cutting *text* just before line *split*."""
+    end_of_file = split >= len(text)
+    indent = -1 if end_of_file else _indent(text[split])
+    pre_blank, pre_indent = 0, -1
+    for i in range(split - 1, -1, -1):
+        pre_indent = _indent(text[i])
+        if pre_indent != -1:
+            break
+        pre_blank += 1
+        if pre_blank == MAX_BLANKS:
+            pre_indent = 0
+            break
+    post_blank, post_indent = 0, -1
+    for i in range(split + 1, len(text)):
+        post_indent = _indent(text[i])
+        if post_indent != -1:
+            break
+        post_blank += 1
+        if post_blank == MAX_BLANKS:
+            post_indent = 0
+            break
+
+    penalty = 0
+    if pre_indent == -1 and pre_blank == 0:
+        penalty += START_OF_FILE_PENALTY
+    if end_of_file:
+        penalty += END_OF_FILE_PENALTY
+    post_blank = 1 + post_blank if indent == -1 else 0
+    total_blank = pre_blank + post_blank
+    penalty += TOTAL_BLANK_WEIGHT * total_blank + POST_BLANK_WEIGHT * post_blank
+    if indent == -1:
+        indent = post_indent
+    if indent != -1 and pre_indent != -1:
+        if indent > pre_indent:
+            penalty += RELATIVE_INDENT_WITH_BLANK_PENALTY if total_blank else RELATIVE_INDENT_PENALTY
+        elif indent < pre_indent:
+            if post_indent != -1 and post_indent > indent:
+                penalty += RELATIVE_OUTDENT_WITH_BLANK_PENALTY if total_blank else RELATIVE_OUTDENT_PENALTY
+            else:
+                penalty += RELATIVE_DEDENT_WITH_BLANK_PENALTY if total_blank else RELATIVE_DEDENT_PENALTY
+    return indent, penalty
+
+
+def _best_shift(text: Sequence[bytes], earliest_end: int, end: int, size: int) -> int:
+    # Try every end position of the group, the lowest wins a tie
+    best = None
+    best_shift = end
+    for shift in range(max(earliest_end, end - size - 1, end - INDENT_HEURISTIC_MAX_SLIDING), end + 1):
+        indent1, penalty1 = _split_score(text, shift)
+        indent2, penalty2 = _split_score(text, shift - size)
+        score = (indent1 + indent2, penalty1 + penalty2)
+        if best is None or INDENT_WEIGHT * ((score[0] > best[0]) - (score[0] < best[0])) + score[1] - best[1] <= 0:
+            best, best_shift = score, shift
+    return best_shift
+
+
+def _compact(text: Sequence[bytes], lines: List[int], changed: bytearray,
+             other_lines: List[int], other_changed: bytearray, indent_heuristic: bool) -> None:
+    """
+    Slide each group of changed lines (merging with the groups it meets)
+    to where it lines up with a change on the other side, or else to the
+    best place for the indent heuristic, or as far down as it goes, as
+    Git's xdl_change_compact does.
+    """
+    g = _Groups(lines, changed)
+    go = _Groups(other_lines, other_changed)
+    while True:
+        if g.end != g.start:
+            while True:
+                size = g.end - g.start
+                end_matching_other = -1
+                while g.slide_up():
+                    go.previous()
+                earliest_end = g.end
+                if go.end > go.start:
+                    end_matching_other = g.end
+                while g.slide_down():
+                    go.next()
+                    if go.end > go.start:
+                        end_matching_other = g.end
+                if size == g.end - g.start:
+                    break
+            if g.end == earliest_end:
+                pass
+            elif end_matching_other != -1:
+                while go.end == go.start:
+                    g.slide_up()
+                    go.previous()
+            elif indent_heuristic:
+                shift = _best_shift(text, earliest_end, g.end, size)
+                while g.end > shift:
+                    g.slide_up()
+                    go.previous()
+        if not g.next():
+            break
+        go.next()
+
+
+def diff_lines(a: Sequence[bytes], b: Sequence[bytes], algorithm: str = "myers",
+               indent_heuristic: bool = True, minimal: bool = False,
+               work_limit: Optional[int] = None) -> List[Block]:
+    """
+    Compare two lists of lines and return the changed blocks, in order,
+    as Git's xdiff finds them. With *minimal*, Myers never trades the
+    shortest diff for speed.
+
+    Raises:
+        DiffTooCostly: If finding the changes takes more than *work_limit*
+            steps (diagonals tried and lines compared).
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown diff algorithm '{algorithm}'")
+    ids_a, ids_b = _intern(a, b)
+    changed_a, changed_b = bytearray(len(ids_a)), bytearray(len(ids_b))
+    budget = _Budget(work_limit)
+    if algorithm == "histogram":
+        _histogram(ids_a, ids_b, changed_a, changed_b, minimal, budget)
+    else:
+        _myers(ids_a, ids_b, changed_a, changed_b, minimal, budget)
+    _compact(a, ids_a, changed_a, ids_b, changed_b, indent_heuristic)
+    _compact(b, ids_b, changed_b, ids_a, changed_a, indent_heuristic)
+
+    n, m = len(ids_a), len(ids_b)
+    blocks: List[Block] = []
+    i = j = 0
+    while i < n or j < m:
+        if i < n and j < m and not changed_a[i] and not changed_b[j]:
+            i += 1
+            j += 1
+            continue
+        i0, j0 = i, j
+        while i < n and changed_a[i]:
+            i += 1
+        while j < m and changed_b[j]:
+            j += 1
+        blocks.append((i0, i, j0, j))
+    return blocks
+
+
+def _range(start: int, count: int) -> str:
+    # "-3,0" for an insertion after line 3, "-4" for a single line 4
+    if count == 0:
+        return f"{start},0"
+    if count == 1:
+        return str(start + 1)
+    return f"{start + 1},{count}"
+
+
+def _func_line(lines: Sequence[bytes], before: int, limit: int) -> Optional[bytes]:
+    # Git's default: the last line above the hunk starting like a definition.
+    # Like git, only look down to *limit*, the previous hunk's start: the
+    # caller keeps the previous match when there is none in between.
+    for i in range(before - 1, limit - 1, -1):
+        line = lines[i]
+        if line[:1].isalpha() or line[:1] in (b"_", b"$"):
+            return line[:FUNC_LINE_LENGTH].rstrip()
+    return None
+
+
+def _emit(prefix: bytes, line: bytes) -> bytes:
+    if line.endswith(b"\n"):
+        return prefix + line
+    return prefix + line + b"\n\\ No newline at end of file\n"
+
+
+def unified_hunks(a: Sequence[bytes], b: Sequence[bytes], blocks: List[Block],
+                  context: int = DEFAULT_CONTEXT) -> Iterator[bytes]:
+    """
+    Lazily yield the hunks of a unified diff ("@@ -l,s +l,s @@" and its
+    lines), merging changes less than 2 * *context* lines apart.
+    """
+    func, searched = b"", 0
+    k = 0
+    while k < len(blocks):
+        last = k
+        while last + 1 < len(blocks) and blocks[last + 1][0] - blocks[last][1] <= 2 * context:
+            last += 1
+        a_start = max(0, blocks[k][0] - context)
+        b_start = blocks[k][2] - (blocks[k][0] - a_start)
+        a_end = min(len(a), blocks[last][1] + context)
+        b_end = blocks[last][3] + (a_end - blocks[last][1])
+
+        found = _func_line(a, a_start, searched)
+        if found is not None:
+            func = found
+        searched = a_start
+        out = [b"@@ -" + _range(a_start, a_end - a_start).encode() + b" +"
+               + _range(b_start, b_end - b_start).encode() + b" @@" + (b" " + func if func else b"") + b"\n"]
+        i = a_start
+        for a0, a1, b0, b1 in blocks[k:last + 1]:
+            out.extend(_emit(b" ", line) for line in a[i:a0])
+            out.extend(_emit(b"-", line) for line in a[a0:a1])
+            out.extend(_emit(b"+", line) for line in b[b0:b1])
+            i = a1
+        out.extend(_emit(b" ", line) for line in a[i:a_end])
+        yield b"".join(out)
+        k = last + 1
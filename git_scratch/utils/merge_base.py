@@ -0,0 +1,154 @@
+import heapq
+import itertools
+from typing import Dict, Iterable, List, Set, Tuple
+
+from git_scratch.utils.commit_graph import GENERATION_NUMBER_INFINITY, CommitInfo, read_commit_info
+
+# Paint flags: reachable from the first / second side, common to both
+# (nothing below needs to be looked at), already reported as a base
+LEFT = 1
+RIGHT = 2
+STALE = 4
+RESULT = 8
+
+
+class _PaintQueue:
+    """
+    Commits to visit, highest generation number first, then newest
+    committer date. A commit is only visited after all its descendants
+    in the queue, so its flags are final by then whenever the
+    commit-graph covers it. Keeps count of the queued commits that are
+    not STALE: once there are none, the walk is over.
+    """
+
+    def __init__(self):
+        self.flags: Dict[str, int] = {}
+        self.infos: Dict[str, CommitInfo] = {}
+        self.nonstale = 0
+        self._heap: List[Tuple[int, int, int, str]] = []
+        self._queued: Set[str] = set()
+        self._counter = itertools.count()
+
+    def info(self, oid: str) -> CommitInfo:
+        info = self.infos.get(oid)
+        if info is None:
+            info = self.infos[oid] = read_commit_info(oid)
+        return info
+
+    def paint(self, oid: str, flags: int) -> None:
+        old = self.flags.get(oid, 0)
+        new = old | flags
+        if new == old:
+            return
+        self.flags[oid] = new
+        if oid in self._queued:
+            if new & STALE and not old & STALE:
+                self.nonstale -= 1
+            return
+        self._queued.add(oid)
+        if not new & STALE:
+            self.nonstale += 1
+        info = self.info(oid)
+        heapq.heappush(self._heap, (-info.generation, -info.time, next(self._counter), oid))
+
+    def pop(self) -> Tuple[CommitInfo, int]:
+        oid = heapq.heappop(self._heap)[3]
+        self._queued.discard(oid)
+        flags = self.flags[oid]
+        if not flags & STALE:
+            self.nonstale -= 1
+        return self.infos[oid], flags
+
+
+def _paint_down_to_common(one: str, twos: Iterable[str]) -> Tuple[List[str], _PaintQueue]:
+    queue = _PaintQueue()
+    queue.paint(one, LEFT)
+    for two in twos:
+        queue.paint(two, RIGHT)
+
+    results = []
+    while queue.nonstale:
+        info, flags = queue.pop()
+        sides = flags & (LEFT | RIGHT | STALE)
+        if sides == LEFT | RIGHT:
+            if not flags & RESULT:
+                queue.flags[info.oid] |= RESULT
+                results.append(info.oid)
+            sides |= STALE
+        for parent in info.parents:
+            queue.paint(parent, sides)
+    return results, queue
+
+
+def is_ancestor(ancestor: str, descendant: str) -> bool:
+    """
+    Whether *ancestor* is reachable from *descendant* (or is it). With
+    generation numbers, lines of history that went below the generation
+    of *ancestor* are not followed.
+    """
+    target = read_commit_info(ancestor).generation
+    cutoff = 0 if target == GENERATION_NUMBER_INFINITY else target
+    seen = {descendant}
+    stack = [descendant]
+    while stack:
+        oid = stack.pop()
+        if oid == ancestor:
+            return True
+        info = read_commit_info(oid)
+        # A commit with the same generation can't lead to the ancestor
+        if info.generation <= cutoff:
+            continue
+        for parent in info.parents:
+            if parent not in seen:
+                seen.add(parent)
+                stack.append(parent)
+    return False
+
+
+def merge_bases(one: str, twos: Iterable[str], all_bases: bool = False) -> List[str]:
+    """
+    Return the best common ancestors of *one* and *twos* (Git's
+    merge-base), newest first; only the first one unless *all_bases*.
+
+    The two sides are painted down in generation order and the walk stops
+    as soon as every queued commit is known to be common to both, so the
+    history below the fork point is never visited.
+    """
+    twos = list(twos)
+    if one in twos:
+        return [one]
+    results, queue = _paint_down_to_common(one, twos)
+    bases = [oid for oid in results if not queue.flags[oid] & STALE]
+    # Newest first; a stable sort keeps Git's order for equal dates
+    bases.sort(key=lambda oid: -queue.infos[oid].time)
+    if len(bases) > 1:
+        bases = [b for b in bases if not any(o != b and is_ancestor(b, o) for o in bases)]
+    return bases if all_bases else bases[:1]
+
+
+def ahead_behind(left: str, right: str) -> Tuple[int, int]:
+    """
+    Count the commits reachable only from *left* and only from *right*
+    (`git rev-list --left-right --count left...right`).
+    """
+    queue = _PaintQueue()
+    if GENERATION_NUMBER_INFINITY in (queue.info(left).generation, queue.info(right).generation):
+        # Without generation numbers a commit's flags may still change
+        # after it was counted: count each side with an exclusion walk
+        from git_scratch.utils.rev_walk import walk_revisions
+        return (sum(1 for _ in walk_revisions([left], [right])),
+                sum(1 for _ in walk_revisions([right], [left])))
+
+    queue.paint(left, LEFT)
+    queue.paint(right, RIGHT)
+    counts = {LEFT: 0, RIGHT: 0}
+    while queue.nonstale:
+        info, flags = queue.pop()
+        sides = flags & (LEFT | RIGHT | STALE)
+        if sides == LEFT | RIGHT:
+            sides |= STALE
+        elif not sides & STALE:
+            counts[sides] += 1
+        for parent in info.parents:
+            queue.paint(parent, sides)
+    return counts[LEFT], counts[RIGHT]
@@ -0,0 +1,174 @@
+import hashlib
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MIDX_NAME = "multi-pack-index"
+MIDX_SIGNATURE = b"MIDX"
+
+CHUNK_PACK_NAMES = b"PNAM"
+CHUNK_OID_FANOUT = b"OIDF"
+CHUNK_OID_LOOKUP = b"OIDL"
+CHUNK_OBJECT_OFFSETS = b"OOFF"
+CHUNK_LARGE_OFFSETS = b"LOFF"
+
+LARGE_OFFSET_NEEDED = 0x80000000
+
+
+def binary_search(data, base: int, width: int, lo: int, hi: int, key: bytes) -> Optional[int]:
+    """
+    Find *key* in a sorted table of *width*-byte records starting at *base*
+    in *data* (bytes or mmap), between record positions *lo* and *hi*.
+    Returns the record position or None.
+    """
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = base + mid * width
+        current = data[start:start + len(key)]
+        if current < key:
+            lo = mid + 1
+        elif current > key:
+            hi = mid
+        else:
+            return mid
+    return None
+
+
+class MultiPackIndex:
+    """
+    Memory-mapped multi-pack-index: one sorted OID table covering several
+    packs, mapping each OID to (pack name, offset).
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._map
+
+        signature, version, oid_version, chunk_count, _, pack_count = struct.unpack_from(">4sBBBBI", data, 0)
+        if signature != MIDX_SIGNATURE or version != 1 or oid_version != 1:
+            self.close()
+            raise ValueError(f"Unsupported multi-pack-index: {path}")
+
+        # The table has one extra row whose offset marks the end of the last chunk
+        table = [struct.unpack_from(">4sQ", data, 12 + 12 * i) for i in range(chunk_count + 1)]
+        chunks: Dict[bytes, int] = {chunk_id: offset for chunk_id, offset in table[:-1]}
+        ends = {chunk_id: table[i + 1][1] for i, (chunk_id, _) in enumerate(table[:-1])}
+
+        names = data[chunks[CHUNK_PACK_NAMES]:ends[CHUNK_PACK_NAMES]].split(b"\x00")
+        self.pack_names = [n.decode() for n in names if n][:pack_count]
+
+        self.fanout = struct.unpack_from(">256I", data, chunks[CHUNK_OID_FANOUT])
+        self.count = self.fanout[255]
+        self._oids = chunks[CHUNK_OID_LOOKUP]
+        self._offsets = chunks[CHUNK_OBJECT_OFFSETS]
+        self._large = chunks.get(CHUNK_LARGE_OFFSETS)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._map.close()
+
+    def find(self, oid: bytes) -> Optional[Tuple[str, int]]:
+        """
+        Return (pack .idx name, offset) for the binary *oid*, or None.
+        """
+        first = oid[0]
+        lo = self.fanout[first - 1] if first else 0
+        pos = binary_search(self._map, self._oids, 20, lo, self.fanout[first], oid)
+        if pos is None:
+            return None
+        pack_id, offset = struct.unpack_from(">II", self._map, self._offsets + 8 * pos)
+        if self._large is not None and offset & LARGE_OFFSET_NEEDED:
+            offset = struct.unpack_from(">Q", self._map, self._large + 8 * (offset & ~LARGE_OFFSET_NEEDED))[0]
+        return self.pack_names[pack_id], offset
+
+    def iter_oids(self) -> Iterator[bytes]:
+        for i in range(self.count):
+            start = self._oids + 20 * i
+            yield self._map[start:start + 20]
+
+
+def write_multi_pack_index(pack_dir: str) -> Optional[str]:
+    """
+    Write a multi-pack-index covering every pack of *pack_dir*. When an
+    object is in several packs, the most recently modified pack wins.
+    Returns the path of the file, or None when there is no pack (any stale
+    multi-pack-index is then removed).
+    """
+    from git_scratch.utils.pack import PackIndex
+
+    midx_path = os.path.join(pack_dir, MIDX_NAME)
+    names = sorted(
+        n for n in os.listdir(pack_dir)
+        if n.startswith("pack-") and n.endswith(".idx")
+        and os.path.exists(os.path.join(pack_dir, n[:-4] + ".pack"))
+    )
+    if not names:
+        if os.path.exists(midx_path):
+            os.remove(midx_path)
+        return None
+
+    # Newest packs first so that their copy of a duplicated object is kept
+    by_age = sorted(
+        range(len(names)),
+        key=lambda i: os.stat(os.path.join(pack_dir, names[i][:-4] + ".pack")).st_mtime_ns,
+        reverse=True,
+    )
+    objects: Dict[bytes, Tuple[int, int]] = {}
+    for pack_id in by_age:
+        index = PackIndex(os.path.join(pack_dir, names[pack_id]))
+        try:
+            for oid, offset in index.iter_entries():
+                objects.setdefault(oid, (pack_id, offset))
+        finally:
+            index.close()
+
+    oids = sorted(objects)
+    fanout = [0] * 256
+    for oid in oids:
+        fanout[oid[0]] += 1
+    total = 0
+    for i in range(256):
+        total += fanout[i]
+        fanout[i] = total
+
+    offsets = bytearray()
+    large: List[int] = []
+    for oid in oids:
+        pack_id, offset = objects[oid]
+        if offset >= LARGE_OFFSET_NEEDED:
+            offsets += struct.pack(">II", pack_id, LARGE_OFFSET_NEEDED | len(large))
+            large.append(offset)
+        else:
+            offsets += struct.pack(">II", pack_id, offset)
+
+    pack_names = b"".join(n.encode() + b"\x00" for n in names)
+    pack_names += b"\x00" * (-len(pack_names) % 4)
+
+    chunks = [
+        (CHUNK_PACK_NAMES, pack_names),
+        (CHUNK_OID_FANOUT, struct.pack(">256I", *fanout)),
+        (CHUNK_OID_LOOKUP, b"".join(oids)),
+        (CHUNK_OBJECT_OFFSETS, bytes(offsets)),
+    ]
+    if large:
+        chunks.append((CHUNK_LARGE_OFFSETS, struct.pack(f">{len(large)}Q", *large)))
+
+    data = bytearray(struct.pack(">4sBBBBI", MIDX_SIGNATURE, 1, 1, len(chunks), 0, len(names)))
+    offset = len(data) + 12 * (len(chunks) + 1)
+    for chunk_id, chunk in chunks:
+        data += struct.pack(">4sQ", chunk_id, offset)
+        offset += len(chunk)
+    data += struct.pack(">4sQ", b"\x00" * 4, offset)
+    for _, chunk in chunks:
+        data += chunk
+    data += hashlib.sha1(data).digest()
+
+    tmp_path = midx_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, midx_path)
+    return midx_path
@@ -1,10 +1,9 @@
-import os
-import hashlib
-import zlib
+from git_scratch.utils.object_store import get_object_store
 
 def write_object(content: bytes, obj_type: str) -> str:
     """
-    Write a Git object to the .git/objects directory.
+    Write a Git object to the repository object store (by default, the
+    .git/objects directory).
 
     Args:
         content (bytes): Raw content of the object (e.g. file data, commit, tree).
@@ -16,18 +15,14 @@ def write_object(content: bytes, obj_type: str) -> str:
     if obj_type not in {"blob", "tree", "commit"}:
         raise ValueError(f"Invalid object type: {obj_type}")
 
-    header = f"{obj_type} {len(content)}\0".encode()
-    full_data = header + content
-    oid = hashlib.sha1(full_data).hexdigest()
+    return get_object_store().write(obj_type, content)
 
-    dir_path = os.path.join(".git", "objects", oid[:2])
-    file_path = os.path.join(dir_path, oid[2:])
-
-    if os.path.exists(file_path):
-        return oid
-
-    os.makedirs(dir_path, exist_ok=True)
-    with open(file_path, "wb") as f:
-        f.write(zlib.compress(full_data))
+def write_blob_from_file(file_path: str) -> str:
+    """
+    Store a file as a blob. With loose objects the file is never loaded
+    in memory as a whole.
 
-    return oid
\ No newline at end of file
+    Returns:
+        str: The SHA-1 object ID (OID) of the blob.
+    """
+    return get_object_store().write_file(file_path)
@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from git_scratch.utils.config import get_config_int
+
+DEFAULT_CACHE_LIMIT = 32 * 1024 * 1024
+# Rough per-entry overhead (key, tuple, dict slot) added to the content size
+ENTRY_OVERHEAD = 100
+
+
+class ObjectCache:
+    """
+    Byte-budgeted LRU cache of inflated objects, shared by the whole process.
+
+    Keys are hashable tuples, e.g. (objects dir, oid) for whole objects or
+    (pack path, offset) for delta bases. Objects bigger than a quarter of the
+    budget are not kept, so one large blob cannot flush everything else.
+    """
+
+    def __init__(self, limit: int = DEFAULT_CACHE_LIMIT):
+        self.limit = limit
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._configured_for: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(self, objects_dir: str) -> None:
+        """
+        Load the budget from the config of the repository owning
+        *objects_dir* (pit.objectCacheLimit, 0 disables the cache).
+        Only done when the current repository changes.
+        """
+        if self._configured_for == objects_dir:
+            return
+        self._configured_for = objects_dir
+        try:
+            limit = get_config_int("pit", "objectCacheLimit", DEFAULT_CACHE_LIMIT)
+        except ValueError as e:
+            print(f"[warn] {e}")
+            limit = DEFAULT_CACHE_LIMIT
+        self.set_limit(limit)
+
+    def set_limit(self, limit: int) -> None:
+        with self._lock:
+            self.limit = max(0, limit)
+            self._shrink()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Tuple[str, bytes]) -> None:
+        cost = len(value[1]) + ENTRY_OVERHEAD
+        if cost > self.limit // 4:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1]) + ENTRY_OVERHEAD
+            self._entries[key] = value
+            self.size += cost
+            self._shrink()
+
+    def _shrink(self) -> None:
+        while self.size > self.limit and self._entries:
+            _, value = self._entries.popitem(last=False)
+            self.size -= len(value[1]) + ENTRY_OVERHEAD
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = self.misses = self.evictions = 0
+            self._configured_for = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "limit": self.limit,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+object_cache = ObjectCache()
+
+
+def objects_dir() -> str:
+    return os.path.abspath(os.path.join(".git", "objects"))
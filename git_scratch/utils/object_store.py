@@ -0,0 +1,404 @@
+import contextlib
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from git_scratch.utils.config import get_config_value
+from git_scratch.utils.hash import CHUNK_SIZE
+from git_scratch.utils.pack import has_packed_object, iter_packed_oids, read_packed_object, read_packed_object_info
+
+OBJECT_TYPES = {"blob", "tree", "commit", "tag"}
+DEFAULT_BACKEND = "loose"
+SQLITE_DB_NAME = "objects.sqlite"
+
+
+def hash_object(obj_type: str, content: bytes) -> str:
+    return hashlib.sha1(f"{obj_type} {len(content)}\0".encode() + content).hexdigest()
+
+
+class ObjectStore(ABC):
+    """
+    Storage backend for Git objects.
+
+    Backends must implement read, write, exists and iter_prefix; read_info,
+    the batch variants and write_file have generic implementations that
+    backends may override when they can do better.
+    """
+
+    @abstractmethod
+    def read(self, oid: str) -> Tuple[str, bytes]:
+        """
+        Return (type, content) of *oid*.
+
+        Raises:
+            FileNotFoundError: If the object is not in the store.
+        """
+
+    def read_info(self, oid: str) -> Tuple[str, int]:
+        obj_type, content = self.read(oid)
+        return obj_type, len(content)
+
+    @abstractmethod
+    def write(self, obj_type: str, content: bytes) -> str:
+        """
+        Store an object and return its OID. Writing an object that already
+        exists is a no-op.
+        """
+
+    @abstractmethod
+    def exists(self, oid: str) -> bool:
+        """
+        Return whether *oid* is in the store.
+        """
+
+    @abstractmethod
+    def iter_prefix(self, prefix: str = "") -> Iterator[str]:
+        """
+        Yield the OIDs starting with *prefix*, in no particular order and
+        possibly more than once.
+        """
+
+    def write_file(self, file_path: str) -> str:
+        """
+        Store the content of *file_path* as a blob and return its OID.
+        """
+        with open(file_path, "rb") as f:
+            return self.write("blob", f.read())
+
+    def read_many(self, oids: Iterable[str]) -> Dict[str, Tuple[str, bytes]]:
+        """
+        Read several objects; missing ones are left out of the result.
+        """
+        found = {}
+        for oid in oids:
+            try:
+                found[oid] = self.read(oid)
+            except FileNotFoundError:
+                continue
+        return found
+
+    def write_many(self, objects: Iterable[Tuple[str, bytes]]) -> List[str]:
+        """
+        Store (type, content) pairs in one transaction and return their OIDs.
+        """
+        with self.transaction():
+            return [self.write(obj_type, content) for obj_type, content in objects]
+
+    def exists_many(self, oids: Iterable[str]) -> Set[str]:
+        return {oid for oid in oids if self.exists(oid)}
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Group writes; backends without transactions write immediately.
+        """
+        yield self
+
+    def close(self) -> None:
+        pass
+
+
+class LooseObjectStore(ObjectStore):
+    """
+    The standard layout: zlib-compressed files under .git/objects/xx/,
+    plus read-only access to the packfiles in .git/objects/pack.
+    """
+
+    def __init__(self, objects_dir: str = os.path.join(".git", "objects")):
+        self.objects_dir = objects_dir
+
+    def _path(self, oid: str) -> str:
+        return os.path.join(self.objects_dir, oid[:2], oid[2:])
+
+    def read(self, oid: str) -> Tuple[str, bytes]:
+        path = self._path(oid)
+        if not os.path.exists(path):
+            return read_packed_object(oid)
+
+        with open(path, "rb") as f:
+            data = zlib.decompress(f.read())
+        header_end = data.index(b"\x00")
+        obj_type, _ = data[:header_end].decode().split()
+        return obj_type, data[header_end + 1:]
+
+    def read_info(self, oid: str) -> Tuple[str, int]:
+        path = self._path(oid)
+        if not os.path.exists(path):
+            return read_packed_object_info(oid)
+
+        # Inflate only the header
+        with open(path, "rb") as f:
+            header = zlib.decompressobj().decompress(f.read(512), 64)
+        obj_type, size = header[:header.index(b"\x00")].decode().split()
+        return obj_type, int(size)
+
+    def exists(self, oid: str) -> bool:
+        return os.path.exists(self._path(oid)) or has_packed_object(oid)
+
+    def write(self, obj_type: str, content: bytes) -> str:
+        header = f"{obj_type} {len(content)}\0".encode()
+        full_data = header + content
+        oid = hashlib.sha1(full_data).hexdigest()
+        if self.exists(oid):
+            return oid
+
+        dir_path = os.path.join(self.objects_dir, oid[:2])
+        os.makedirs(dir_path, exist_ok=True)
+        with open(self._path(oid), "wb") as f:
+            f.write(zlib.compress(full_data))
+        return oid
+
+    def write_file(self, file_path: str) -> str:
+        """
+        Store a file as a blob without loading it in memory.
+
+        The size is taken from stat() for the header, then the file is read
+        in fixed-size chunks fed both to SHA-1 and to a zlib compressor
+        writing a temporary file, which is renamed into place once the OID
+        is known.
+        """
+        size = os.stat(file_path).st_size
+        header = f"blob {size}\0".encode()
+        sha = hashlib.sha1(header)
+        compressor = zlib.compressobj()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix="tmp_obj_", dir=self.objects_dir)
+        try:
+            read = 0
+            with os.fdopen(fd, "wb") as out, open(file_path, "rb") as f:
+                out.write(compressor.compress(header))
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha.update(chunk)
+                    out.write(compressor.compress(chunk))
+                    read += len(chunk)
+                out.write(compressor.flush())
+            if read != size:
+                raise ValueError(f"{file_path} changed while being read.")
+
+            oid = sha.hexdigest()
+            if self.exists(oid):
+                os.remove(tmp_path)
+                return oid
+
+            os.makedirs(os.path.join(self.objects_dir, oid[:2]), exist_ok=True)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self._path(oid))
+            return oid
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def iter_prefix(self, prefix: str = "") -> Iterator[str]:
+        prefix = prefix.lower()
+        if os.path.isdir(self.objects_dir):
+            for sub in os.listdir(self.objects_dir):
+                if len(sub) != 2 or not sub.startswith(prefix[:2]):
+                    continue
+                for name in os.listdir(os.path.join(self.objects_dir, sub)):
+                    oid = sub + name
+                    if len(oid) == 40 and oid.startswith(prefix):
+                        yield oid
+        for oid in iter_packed_oids():
+            if oid.startswith(prefix):
+                yield oid
+
+
+class SQLiteObjectStore(ObjectStore):
+    """
+    All objects in a single SQLite database in WAL mode, which avoids
+    creating one file per object. Objects already in *fallback* (e.g. the
+    loose objects and packs of an existing repository) stay readable and
+    are not copied.
+    """
+
+    def __init__(self, path: str, fallback: Optional[ObjectStore] = None):
+        self.path = path
+        self.fallback = fallback
+        # Shared by the worker threads of `add`; every access holds the lock
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            " oid TEXT PRIMARY KEY, type TEXT NOT NULL, size INTEGER NOT NULL, data BLOB NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def _row(self, oid: str, columns: str):
+        with self._lock:
+            return self._db.execute(f"SELECT {columns} FROM objects WHERE oid = ?", (oid,)).fetchone()
+
+    def read(self, oid: str) -> Tuple[str, bytes]:
+        row = self._row(oid, "type, data")
+        if row is not None:
+            return row[0], zlib.decompress(row[1])
+        if self.fallback is not None:
+            return self.fallback.read(oid)
+        raise FileNotFoundError(f"Object {oid} not found.")
+
+    def read_info(self, oid: str) -> Tuple[str, int]:
+        row = self._row(oid, "type, size")
+        if row is not None:
+            return row[0], row[1]
+        if self.fallback is not None:
+            return self.fallback.read_info(oid)
+        raise FileNotFoundError(f"Object {oid} not found.")
+
+    def exists(self, oid: str) -> bool:
+        if self._row(oid, "1") is not None:
+            return True
+        return self.fallback is not None and self.fallback.exists(oid)
+
+    def write(self, obj_type: str, content: bytes) -> str:
+        oid = hash_object(obj_type, content)
+        if self.fallback is not None and self.fallback.exists(oid):
+            return oid
+        compressed = zlib.compress(content)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO objects (oid, type, size, data) VALUES (?, ?, ?, ?)",
+                (oid, obj_type, len(content), compressed),
+            )
+        return oid
+
+    def read_many(self, oids: Iterable[str]) -> Dict[str, Tuple[str, bytes]]:
+        oids = list(oids)
+        found = {}
+        with self._lock:
+            for start in range(0, len(oids), 500):
+                batch = oids[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._db.execute(f"SELECT oid, type, data FROM objects WHERE oid IN ({marks})", batch)
+                for oid, obj_type, data in rows:
+                    found[oid] = (obj_type, zlib.decompress(data))
+        if self.fallback is not None:
+            found.update(self.fallback.read_many(oid for oid in oids if oid not in found))
+        return found
+
+    def iter_prefix(self, prefix: str = "") -> Iterator[str]:
+        prefix = prefix.lower()
+        with self._lock:
+            # "~" sorts after every hex digit
+            rows = self._db.execute(
+                "SELECT oid FROM objects WHERE oid >= ? AND oid < ?", (prefix, prefix + "~")
+            ).fetchall()
+        for (oid,) in rows:
+            yield oid
+        if self.fallback is not None:
+            yield from self.fallback.iter_prefix(prefix)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Run the enclosed writes in one SQLite transaction, committed on
+        success and rolled back on error. Nested blocks join the outer one.
+        """
+        with self._lock:
+            if self._depth == 0:
+                self._db.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            with self._lock:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._db.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._depth -= 1
+            if self._depth == 0:
+                self._db.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class MemoryObjectStore(ObjectStore):
+    """
+    Objects kept in a dict for the lifetime of the process, for tests and
+    throw-away jobs. Reads fall through to *fallback* when given.
+    """
+
+    def __init__(self, fallback: Optional[ObjectStore] = None):
+        self.fallback = fallback
+        self._objects: Dict[str, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def read(self, oid: str) -> Tuple[str, bytes]:
+        obj = self._objects.get(oid)
+        if obj is not None:
+            return obj
+        if self.fallback is not None:
+            return self.fallback.read(oid)
+        raise FileNotFoundError(f"Object {oid} not found.")
+
+    def exists(self, oid: str) -> bool:
+        if oid in self._objects:
+            return True
+        return self.fallback is not None and self.fallback.exists(oid)
+
+    def write(self, obj_type: str, content: bytes) -> str:
+        oid = hash_object(obj_type, content)
+        if self.fallback is not None and self.fallback.exists(oid):
+            return oid
+        with self._lock:
+            self._objects.setdefault(oid, (obj_type, bytes(content)))
+        return oid
+
+    def iter_prefix(self, prefix: str = "") -> Iterator[str]:
+        prefix = prefix.lower()
+        with self._lock:
+            oids = [oid for oid in self._objects if oid.startswith(prefix)]
+        yield from oids
+        if self.fallback is not None:
+            yield from self.fallback.iter_prefix(prefix)
+
+
+# Open stores: (abs objects dir, backend) -> store
+_stores: Dict[Tuple[str, str], ObjectStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_object_store() -> ObjectStore:
+    """
+    Return the object store of the current repository, as selected by
+    pit.objectStore in .git/config: "loose" (default), "sqlite" or "memory".
+    """
+    backend = (get_config_value("pit", "objectStore") or DEFAULT_BACKEND).strip().lower()
+    if backend not in {"loose", "sqlite", "memory"}:
+        print(f"[warn] Unknown pit.objectStore '{backend}', using loose objects.")
+        backend = DEFAULT_BACKEND
+
+    objects_dir = os.path.abspath(os.path.join(".git", "objects"))
+    key = (objects_dir, backend)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            loose = LooseObjectStore(objects_dir)
+            if backend == "sqlite":
+                os.makedirs(objects_dir, exist_ok=True)
+                store = SQLiteObjectStore(os.path.join(os.path.dirname(objects_dir), SQLITE_DB_NAME), fallback=loose)
+            elif backend == "memory":
+                store = MemoryObjectStore(fallback=loose)
+            else:
+                store = loose
+            _stores[key] = store
+        return store
+
+
+def close_object_stores() -> None:
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
@@ -0,0 +1,424 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from git_scratch.utils.delta import apply_delta, read_delta_size
+from git_scratch.utils.midx import MIDX_NAME, MultiPackIndex, binary_search
+from git_scratch.utils.object_cache import object_cache
+
+PACK_DIR = os.path.join(".git", "objects", "pack")
+
+IDX_MAGIC = b"\377tOc"
+
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+TYPE_NAMES = {OBJ_COMMIT: "commit", OBJ_TREE: "tree", OBJ_BLOB: "blob", OBJ_TAG: "tag"}
+
+# Loaded packs per pack directory: abs path -> (dir mtime, PackSet)
+_pack_cache: Dict[str, Tuple[int, "PackSet"]] = {}
+_pack_cache_lock = threading.Lock()
+
+
+def _map_file(path: str) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackIndex:
+    """
+    Memory-mapped version 2 pack index (.idx). Lookups use the 256-entry
+    fanout table to narrow the range, then a binary search on the OID table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._map = _map_file(path)
+        data = self._map
+
+        if data[:4] != IDX_MAGIC or struct.unpack_from(">I", data, 4)[0] != 2:
+            self.close()
+            raise ValueError(f"Unsupported pack index format: {path}")
+
+        self.fanout = struct.unpack_from(">256I", data, 8)
+        self.count = self.fanout[255]
+        self._oids = 8 + 1024
+        self._crcs = self._oids + 20 * self.count
+        self._offsets = self._crcs + 4 * self.count
+        self._large = self._offsets + 4 * self.count
+        self.pack_checksum = data[-40:-20]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._map.close()
+
+    def oid_at(self, pos: int) -> bytes:
+        start = self._oids + 20 * pos
+        return self._map[start:start + 20]
+
+    def crc_at(self, pos: int) -> int:
+        return struct.unpack_from(">I", self._map, self._crcs + 4 * pos)[0]
+
+    def offset_at(self, pos: int) -> int:
+        value = struct.unpack_from(">I", self._map, self._offsets + 4 * pos)[0]
+        if value & 0x80000000:
+            # MSB set: index into the 64-bit large offset table
+            value = struct.unpack_from(">Q", self._map, self._large + 8 * (value & 0x7FFFFFFF))[0]
+        return value
+
+    def find_position(self, oid: bytes) -> Optional[int]:
+        """
+        Return the position of the binary *oid* in the index, or None.
+        """
+        first = oid[0]
+        lo = self.fanout[first - 1] if first else 0
+        return binary_search(self._map, self._oids, 20, lo, self.fanout[first], oid)
+
+    def find_offset(self, oid: bytes) -> Optional[int]:
+        """
+        Return the pack offset of the binary *oid*, or None if not in this pack.
+        """
+        pos = self.find_position(oid)
+        return None if pos is None else self.offset_at(pos)
+
+    def pack_order(self) -> List[int]:
+        """
+        The index positions sorted by pack offset: the order in which the
+        objects are stored, used to number them in reachability bitmaps.
+        """
+        return sorted(range(self.count), key=self.offset_at)
+
+    def iter_oids(self) -> Iterator[bytes]:
+        for pos in range(self.count):
+            yield self.oid_at(pos)
+
+    def iter_entries(self) -> Iterator[Tuple[bytes, int]]:
+        for pos in range(self.count):
+            yield self.oid_at(pos), self.offset_at(pos)
+
+
+class Pack:
+    """
+    A .pack file and its index, both mapped lazily on first use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.idx_name = os.path.basename(path)[:-len(".pack")] + ".idx"
+        self._index: Optional[PackIndex] = None
+        self._map: Optional[mmap.mmap] = None
+
+    @property
+    def index(self) -> PackIndex:
+        if self._index is None:
+            self._index = PackIndex(self.path[:-len(".pack")] + ".idx")
+        return self._index
+
+    @property
+    def data(self) -> mmap.mmap:
+        if self._map is None:
+            self._map = _map_file(self.path)
+        return self._map
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def read(self, offset: int) -> Tuple[str, bytes]:
+        """
+        Read the object stored at *offset*, resolving OFS_DELTA and
+        REF_DELTA chains. Returns (type, content).
+        """
+        from git_scratch.utils.read_object import read_object
+
+        data = self.data
+        # (offset, delta) of the entries above the base, top of the chain first
+        chain = []
+        while True:
+            cached = object_cache.get((self.path, offset))
+            if cached is not None:
+                type_name, content = cached
+                break
+            obj_type, size, base, pos = _read_entry_header(data, offset)
+            inflated = _inflate(data, pos, size)
+            if obj_type == OBJ_OFS_DELTA:
+                chain.append((offset, inflated))
+                offset = base
+            elif obj_type == OBJ_REF_DELTA:
+                chain.append((offset, inflated))
+                # The base may live in another pack or as a loose object
+                type_name, content = read_object(base)
+                break
+            elif obj_type in TYPE_NAMES:
+                type_name, content = TYPE_NAMES[obj_type], inflated
+                if chain:
+                    object_cache.put((self.path, offset), (type_name, content))
+                break
+            else:
+                raise ValueError(f"Unknown pack object type {obj_type} in {self.path}.")
+
+        # Intermediate results are kept as delta bases for sibling objects;
+        # the requested object itself is cached by OID in read_object
+        for i in range(len(chain) - 1, -1, -1):
+            entry_offset, delta = chain[i]
+            content = apply_delta(content, delta)
+            if i:
+                object_cache.put((self.path, entry_offset), (type_name, content))
+        return type_name, content
+
+    def read_info(self, offset: int) -> Tuple[str, int]:
+        """
+        Return the type and size of the object at *offset* without
+        inflating it: the size of a deltified object is read from the first
+        bytes of its delta, its type from the base at the end of the chain.
+        """
+        from git_scratch.utils.read_object import read_object_info
+
+        data = self.data
+        obj_type, size, base, pos = _read_entry_header(data, offset)
+        if obj_type in TYPE_NAMES:
+            return TYPE_NAMES[obj_type], size
+
+        # Delta header: base size then result size, at most 20 bytes
+        header = _inflate_head(data, pos, 20)
+        _, size_pos = read_delta_size(header, 0)
+        result_size, _ = read_delta_size(header, size_pos)
+
+        while obj_type == OBJ_OFS_DELTA:
+            obj_type, _, base, _ = _read_entry_header(data, base)
+        if obj_type == OBJ_REF_DELTA:
+            type_name, _ = read_object_info(base)
+            return type_name, result_size
+        if obj_type not in TYPE_NAMES:
+            raise ValueError(f"Unknown pack object type {obj_type} in {self.path}.")
+        return TYPE_NAMES[obj_type], result_size
+
+
+class PackSet:
+    """
+    All the packs of a repository. OIDs are resolved through the
+    multi-pack-index when there is one; only packs it does not cover are
+    probed one by one.
+    """
+
+    def __init__(self, pack_dir: str):
+        self.packs: Dict[str, Pack] = {}
+        for name in sorted(os.listdir(pack_dir)):
+            if name.startswith("pack-") and name.endswith(".pack"):
+                if os.path.exists(os.path.join(pack_dir, name[:-5] + ".idx")):
+                    pack = Pack(os.path.join(pack_dir, name))
+                    self.packs[pack.idx_name] = pack
+
+        self.midx: Optional[MultiPackIndex] = None
+        midx_path = os.path.join(pack_dir, MIDX_NAME)
+        if os.path.exists(midx_path):
+            try:
+                self.midx = MultiPackIndex(midx_path)
+            except (ValueError, KeyError, struct.error):
+                self.midx = None
+
+        covered = set(self.midx.pack_names) if self.midx else set()
+        self.uncovered = [pack for name, pack in self.packs.items() if name not in covered]
+
+    def find(self, oid: bytes) -> Optional[Tuple[Pack, int]]:
+        if self.midx is not None:
+            found = self.midx.find(oid)
+            if found is not None and found[0] in self.packs:
+                return self.packs[found[0]], found[1]
+        for pack in self.uncovered:
+            offset = pack.index.find_offset(oid)
+            if offset is not None:
+                return pack, offset
+        return None
+
+    def iter_oids(self) -> Iterator[bytes]:
+        """
+        Yield the binary OIDs of every packed object (duplicates possible
+        across packs not covered by the multi-pack-index).
+        """
+        if self.midx is not None:
+            yield from self.midx.iter_oids()
+        for pack in self.uncovered:
+            yield from pack.index.iter_oids()
+
+    def close(self) -> None:
+        if self.midx is not None:
+            self.midx.close()
+        for pack in self.packs.values():
+            pack.close()
+
+
+def get_packs() -> Optional[PackSet]:
+    """
+    Return the packs of the current repository, reloading them only when
+    the pack directory changes.
+    """
+    pack_dir = os.path.abspath(PACK_DIR)
+    try:
+        mtime = os.stat(pack_dir).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _pack_cache_lock:
+        cached = _pack_cache.get(pack_dir)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        if cached:
+            cached[1].close()
+
+        packs = PackSet(pack_dir)
+        _pack_cache[pack_dir] = (mtime, packs)
+        return packs
+
+
+def list_packs() -> List[Pack]:
+    packs = get_packs()
+    return list(packs.packs.values()) if packs else []
+
+
+def close_packs() -> None:
+    """
+    Unmap every loaded pack, e.g. before deleting or replacing pack files
+    (mapped files cannot be removed on Windows).
+    """
+    with _pack_cache_lock:
+        for _, packs in _pack_cache.values():
+            packs.close()
+        _pack_cache.clear()
+
+
+def find_packed_object(oid: str) -> Optional[Tuple[Pack, int]]:
+    """
+    Locate *oid* in the repository packs.
+    Returns (pack, offset) or None.
+    """
+    packs = get_packs()
+    if packs is None:
+        return None
+    return packs.find(bytes.fromhex(oid))
+
+
+def has_packed_object(oid: str) -> bool:
+    return find_packed_object(oid) is not None
+
+
+def iter_packed_oids() -> Iterator[str]:
+    packs = get_packs()
+    if packs is None:
+        return
+    for oid in packs.iter_oids():
+        yield oid.hex()
+
+
+def _read_entry_header(data, offset: int) -> Tuple[int, int, Optional[object], int]:
+    """
+    Decode the header of the pack entry at *offset*.
+    Returns (type, inflated size, delta base, start of the zlib data) where
+    the base is an absolute offset for OFS_DELTA, a hex OID for REF_DELTA
+    and None otherwise.
+    """
+    pos = offset
+    byte = data[pos]
+    pos += 1
+    obj_type = (byte >> 4) & 0x07
+    size = byte & 0x0F
+    shift = 4
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        size |= (byte & 0x7F) << shift
+        shift += 7
+
+    base = None
+    if obj_type == OBJ_OFS_DELTA:
+        byte = data[pos]
+        pos += 1
+        rel = byte & 0x7F
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
+            rel = ((rel + 1) << 7) | (byte & 0x7F)
+        base = offset - rel
+    elif obj_type == OBJ_REF_DELTA:
+        base = data[pos:pos + 20].hex()
+        pos += 20
+
+    return obj_type, size, base, pos
+
+
+def _inflate(data, pos: int, size: int) -> bytes:
+    """
+    Inflate the zlib stream starting at *pos* in *data*.
+    """
+    d = zlib.decompressobj()
+    out = []
+    step = max(size, 4096)
+    while not d.eof:
+        chunk = data[pos:pos + step]
+        if not chunk:
+            raise ValueError("Truncated pack entry.")
+        out.append(d.decompress(chunk))
+        pos += step
+    inflated = b"".join(out)
+    if len(inflated) != size:
+        raise ValueError("Pack entry size mismatch.")
+    return inflated
+
+
+def _inflate_head(data, pos: int, want: int) -> bytes:
+    """
+    Inflate the first *want* bytes of the zlib stream starting at *pos* in
+    *data*, or all of it if it is shorter. The stream is fed in small
+    chunks, as a dynamic Huffman table may come before any output.
+    """
+    d = zlib.decompressobj()
+    out = b""
+    while len(out) < want and not d.eof:
+        chunk = data[pos:pos + 64]
+        if not chunk:
+            raise ValueError("Truncated pack entry.")
+        out += d.decompress(chunk, want - len(out))
+        pos += len(chunk) - len(d.unconsumed_tail)
+    return out
+
+
+def read_packed_object(oid: str) -> Tuple[str, bytes]:
+    """
+    Read *oid* from the repository packs.
+
+    Raises:
+        FileNotFoundError: If no pack contains the object.
+    """
+    location = find_packed_object(oid)
+    if location is None:
+        raise FileNotFoundError(f"Object {oid} not found.")
+    pack, offset = location
+    return pack.read(offset)
+
+
+def read_packed_object_info(oid: str) -> Tuple[str, int]:
+    """
+    Return the type and size of the packed object *oid*.
+
+    Raises:
+        FileNotFoundError: If no pack contains the object.
+    """
+    location = find_packed_object(oid)
+    if location is None:
+        raise FileNotFoundError(f"Object {oid} not found.")
+    pack, offset = location
+    return pack.read_info(offset)
+
@@ -0,0 +1,199 @@
+import os
+from typing import Iterable, List, Optional, Tuple
+
+from git_scratch.utils.commit import parse_commit_header
+from git_scratch.utils.delta import create_delta
+from git_scratch.utils.pack_writer import PackWriter
+from git_scratch.utils.read_object import read_object
+from git_scratch.utils.tree_walker import parse_tree
+
+DEFAULT_WINDOW = 10
+DEFAULT_DEPTH = 50
+# Objects bigger than this are stored whole: the delta search is pure Python
+BIG_FILE_THRESHOLD = 16 * 1024 * 1024
+
+
+class PackObject:
+    """
+    An object selected for packing, with the delta chosen for it (if any).
+    """
+
+    __slots__ = ("oid", "type", "content", "name", "base", "delta", "depth")
+
+    def __init__(self, oid: str, obj_type: str, content: bytes, name: str = ""):
+        self.oid = oid
+        self.type = obj_type
+        self.content = content
+        self.name = name
+        self.base: Optional["PackObject"] = None
+        self.delta: Optional[bytes] = None
+        self.depth = 0
+
+
+def name_hash(name: str) -> int:
+    """
+    Git's pack name hash: the last characters of a path weigh the most, so
+    that files with the same basename or extension sort next to each other.
+    """
+    value = 0
+    for c in name.encode():
+        if chr(c).isspace():
+            continue
+        value = ((value >> 2) + (c << 24)) & 0xFFFFFFFF
+    return value
+
+
+def collect_objects(tips: Iterable[str], extra_blobs: Iterable[str] = ()) -> List[PackObject]:
+    """
+    Enumerate every object reachable from *tips* (commits or annotated tags),
+    commits first, then trees and blobs with the path they were found at.
+    *extra_blobs* (e.g. staged but uncommitted blobs) are appended if present.
+    """
+    seen = set()
+    objects: List[PackObject] = []
+    commits: List[PackObject] = []
+
+    stack = list(tips)
+    while stack:
+        oid = stack.pop()
+        if oid in seen:
+            continue
+        seen.add(oid)
+        obj_type, content = read_object(oid)
+        if obj_type == "tag":
+            objects.append(PackObject(oid, obj_type, content))
+            target = content.split(b"\n", 1)[0]
+            if target.startswith(b"object "):
+                stack.append(target[7:].decode())
+        elif obj_type == "commit":
+            commit = PackObject(oid, obj_type, content)
+            objects.append(commit)
+            commits.append(commit)
+            _, parents = parse_commit_header(content)
+            stack.extend(reversed(parents))
+        else:
+            objects.append(PackObject(oid, obj_type, content))
+
+    for commit in commits:
+        tree_oid, _ = parse_commit_header(commit.content)
+        _collect_tree(tree_oid, "", seen, objects)
+
+    for oid in extra_blobs:
+        if oid in seen:
+            continue
+        try:
+            obj_type, content = read_object(oid)
+        except (FileNotFoundError, ValueError):
+            continue
+        seen.add(oid)
+        objects.append(PackObject(oid, obj_type, content))
+
+    return objects
+
+
+def _collect_tree(tree_oid: str, path: str, seen: set, objects: List[PackObject]) -> None:
+    stack = [(tree_oid, path)]
+    while stack:
+        oid, path = stack.pop()
+        if oid in seen:
+            continue
+        seen.add(oid)
+        obj_type, content = read_object(oid)
+        objects.append(PackObject(oid, obj_type, content, path))
+        if obj_type != "tree":
+            continue
+        for mode, name, child_oid in reversed(list(parse_tree(content))):
+            if mode == "160000":
+                # Submodule commits are not part of this repository
+                continue
+            stack.append((child_oid, f"{path}/{name}" if path else name))
+
+
+def find_deltas(objects: List[PackObject], window: int = DEFAULT_WINDOW, depth: int = DEFAULT_DEPTH) -> int:
+    """
+    Sliding-window delta search. Objects are sorted by type, name hash and
+    decreasing size so that similar objects are close to each other; each one
+    is compared with the *window* previous candidates and keeps the smallest
+    delta found. Returns the number of deltified objects.
+    """
+    if window <= 0:
+        return 0
+
+    candidates = sorted(
+        (o for o in objects if len(o.content) <= BIG_FILE_THRESHOLD),
+        key=lambda o: (o.type, name_hash(o.name), -len(o.content)),
+    )
+
+    count = 0
+    recent: List[PackObject] = []
+    for obj in candidates:
+        size = len(obj.content)
+        best: Optional[Tuple[PackObject, bytes]] = None
+        max_size = size // 2 - 20
+
+        for base in reversed(recent):
+            if base.type != obj.type or base.depth >= depth:
+                continue
+            base_size = len(base.content)
+            # Too different in size to produce a useful delta
+            if size < base_size // 32 or max_size <= 0 or abs(size - base_size) >= max_size:
+                continue
+            delta = create_delta(base.content, obj.content, max_size)
+            if delta is not None:
+                best = (base, delta)
+                max_size = len(delta) - 1
+
+        if best:
+            obj.base, obj.delta = best
+            obj.depth = obj.base.depth + 1
+            count += 1
+
+        recent.append(obj)
+        if len(recent) > window:
+            recent.pop(0)
+
+    return count
+
+
+def write_pack(objects: List[PackObject]) -> Optional[str]:
+    """
+    Write *objects* into a new pack, emitting each delta base before the
+    objects that depend on it. Returns the path of the new .pack.
+    """
+    writer = PackWriter(count=len(objects))
+    try:
+        for obj in objects:
+            _write_one(writer, obj)
+        return writer.finish()
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def _write_one(writer: PackWriter, obj: PackObject) -> None:
+    chain = []
+    while obj is not None and obj.oid not in writer:
+        chain.append(obj)
+        obj = obj.base
+    for item in reversed(chain):
+        if item.base is not None:
+            writer.add_delta(item.oid, item.base.oid, item.delta)
+        else:
+            writer.add(item.oid, item.type, item.content)
+
+
+def remove_loose_objects(oids: Iterable[str]) -> int:
+    """
+    Delete the loose copies of *oids*. Returns the number of files removed.
+    """
+    removed = 0
+    for oid in oids:
+        path = os.path.join(".git", "objects", oid[:2], oid[2:])
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+    return removed
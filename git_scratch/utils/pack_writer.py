@@ -0,0 +1,232 @@
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from git_scratch.utils.hash import CHUNK_SIZE
+from git_scratch.utils.pack import IDX_MAGIC, OBJ_OFS_DELTA, PACK_DIR, close_packs
+
+TYPE_CODES = {"commit": 1, "tree": 2, "blob": 3, "tag": 4}
+
+
+def encode_entry_header(type_code: int, size: int) -> bytes:
+    """
+    Encode the type and inflated size of a pack entry.
+    """
+    out = bytearray()
+    byte = (type_code << 4) | (size & 0x0F)
+    size >>= 4
+    while size:
+        out.append(byte | 0x80)
+        byte = size & 0x7F
+        size >>= 7
+    out.append(byte)
+    return bytes(out)
+
+
+def encode_ofs_delta_offset(relative: int) -> bytes:
+    """
+    Encode the distance back to an OFS_DELTA base.
+    """
+    out = [relative & 0x7F]
+    relative >>= 7
+    while relative:
+        relative -= 1
+        out.append(0x80 | (relative & 0x7F))
+        relative >>= 7
+    return bytes(reversed(out))
+
+
+class PackWriter:
+    """
+    Append objects to a temporary packfile and publish it, with its .idx,
+    under .git/objects/pack once finished.
+
+    The object count may be unknown up front: the header is then patched and
+    the checksum recomputed when the pack is finished.
+    """
+
+    def __init__(self, count: Optional[int] = None, pack_dir: str = PACK_DIR):
+        self.pack_dir = pack_dir
+        os.makedirs(pack_dir, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(prefix="tmp_pack_", dir=pack_dir)
+        self.file = os.fdopen(fd, "wb")
+        self.expected_count = count
+        self.sha = hashlib.sha1()
+        self.offset = 0
+        # (binary oid, crc32, offset) of every written entry
+        self.entries: List[Tuple[bytes, int, int]] = []
+        self.offsets: Dict[str, int] = {}
+        self._rehash = False
+        self._write(b"PACK" + struct.pack(">II", 2, count or 0))
+
+    def _write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.sha.update(data)
+        self.offset += len(data)
+
+    def __contains__(self, oid: str) -> bool:
+        return oid in self.offsets
+
+    def add(self, oid: str, obj_type: str, data: bytes, compressed: Optional[bytes] = None) -> int:
+        """
+        Append a whole object. *compressed* may carry the already deflated
+        *data*. Returns the offset of the entry.
+        """
+        if compressed is None:
+            compressed = zlib.compress(data)
+        return self.add_deflated(oid, obj_type, len(data), compressed)
+
+    def add_deflated(self, oid: str, obj_type: str, size: int, compressed: bytes) -> int:
+        """
+        Append an object of *size* bytes given only in deflated form.
+        Returns the offset of the entry.
+        """
+        header = encode_entry_header(TYPE_CODES[obj_type], size)
+        return self._add_entry(oid, header, compressed)
+
+    def add_delta(self, oid: str, base_oid: str, delta: bytes) -> int:
+        """
+        Append *oid* as an OFS_DELTA against *base_oid*, which must already
+        be in this pack. Returns the offset of the entry.
+        """
+        offset = self.offset
+        header = encode_entry_header(OBJ_OFS_DELTA, len(delta))
+        header += encode_ofs_delta_offset(offset - self.offsets[base_oid])
+        return self._add_entry(oid, header, zlib.compress(delta))
+
+    def add_file(self, file_path: str, exists=None) -> str:
+        """
+        Stream a file into the pack as a blob, hashing and deflating it in
+        fixed-size chunks. If the blob is already in this pack, or
+        *exists(oid)* says it is already stored elsewhere, the entry is
+        truncated away again. Returns the OID of the blob.
+        """
+        size = os.stat(file_path).st_size
+        sha = hashlib.sha1(f"blob {size}\0".encode())
+        compressor = zlib.compressobj()
+        offset = self.offset
+        header = encode_entry_header(TYPE_CODES["blob"], size)
+        crc = zlib.crc32(header)
+        self._write(header)
+
+        read = 0
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha.update(chunk)
+                read += len(chunk)
+                compressed = compressor.compress(chunk)
+                crc = zlib.crc32(compressed, crc)
+                self._write(compressed)
+        compressed = compressor.flush()
+        crc = zlib.crc32(compressed, crc)
+        self._write(compressed)
+        if read != size:
+            raise ValueError(f"{file_path} changed while being read.")
+
+        oid = sha.hexdigest()
+        if oid in self.offsets or (exists is not None and exists(oid)):
+            self._truncate(offset)
+            return oid
+
+        self.entries.append((bytes.fromhex(oid), crc, offset))
+        self.offsets[oid] = offset
+        return oid
+
+    def _truncate(self, offset: int) -> None:
+        """
+        Drop everything written after *offset*. The running checksum is no
+        longer valid, so the pack is re-hashed when finished.
+        """
+        self.file.flush()
+        self.file.seek(offset)
+        self.file.truncate()
+        self.offset = offset
+        self._rehash = True
+
+    def _add_entry(self, oid: str, header: bytes, compressed: bytes) -> int:
+        offset = self.offset
+        self._write(header)
+        self._write(compressed)
+        crc = zlib.crc32(compressed, zlib.crc32(header))
+        self.entries.append((bytes.fromhex(oid), crc, offset))
+        self.offsets[oid] = offset
+        return offset
+
+    def abort(self) -> None:
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def finish(self) -> Optional[str]:
+        """
+        Write the trailer and the index, then atomically rename both into
+        place (the .pack first, so that the .idx never refers to a missing
+        pack). Returns the path of the .pack, or None if nothing was written.
+        """
+        if not self.entries:
+            self.abort()
+            return None
+
+        if self._rehash or self.expected_count != len(self.entries):
+            self.file.flush()
+            self.file.seek(8)
+            self.file.write(struct.pack(">I", len(self.entries)))
+            self.file.close()
+            self.sha = hashlib.sha1()
+            with open(self.tmp_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    self.sha.update(chunk)
+            self.file = open(self.tmp_path, "ab")
+
+        checksum = self.sha.digest()
+        self.file.write(checksum)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+        base = os.path.join(self.pack_dir, f"pack-{checksum.hex()}")
+        tmp_idx = self.tmp_path + ".idx"
+        write_pack_index(tmp_idx, self.entries, checksum)
+        # An identical pack may already exist and be mapped by this process
+        close_packs()
+        os.replace(self.tmp_path, base + ".pack")
+        os.replace(tmp_idx, base + ".idx")
+        return base + ".pack"
+
+
+def write_pack_index(path: str, entries: List[Tuple[bytes, int, int]], pack_checksum: bytes) -> None:
+    """
+    Write a version 2 pack index for *entries* given as (binary oid, crc32, offset).
+    """
+    entries = sorted(entries)
+    fanout = [0] * 256
+    for oid, _, _ in entries:
+        fanout[oid[0]] += 1
+    total = 0
+    for i in range(256):
+        total += fanout[i]
+        fanout[i] = total
+
+    small = []
+    large = []
+    for _, _, offset in entries:
+        if offset < 0x80000000:
+            small.append(offset)
+        else:
+            small.append(0x80000000 | len(large))
+            large.append(offset)
+
+    data = bytearray(IDX_MAGIC + struct.pack(">I", 2))
+    data += struct.pack(">256I", *fanout)
+    data += b"".join(oid for oid, _, _ in entries)
+    data += struct.pack(f">{len(entries)}I", *(crc for _, crc, _ in entries))
+    data += struct.pack(f">{len(small)}I", *small)
+    data += struct.pack(f">{len(large)}Q", *large)
+    data += pack_checksum
+    data += hashlib.sha1(data).digest()
+
+    with open(path, "wb") as f:
+        f.write(data)
@@ -0,0 +1,39 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def ordered_map(func: Callable[[T], R], items: Iterable[T], jobs: Optional[int] = None) -> Iterator[R]:
+    """
+    Apply *func* to *items* on up to *jobs* threads and yield the results in
+    input order. At most 2 * jobs calls are in flight, so the results of a
+    long list do not pile up in memory while the consumer catches up.
+
+    hashlib and zlib release the GIL on large buffers, which is what makes
+    threads worthwhile here.
+    """
+    jobs = jobs or default_jobs()
+    if jobs <= 1:
+        yield from map(func, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(func, item))
+                if len(pending) >= 2 * jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -1,23 +1,40 @@
-import os
-import zlib
+from git_scratch.utils.object_cache import object_cache, objects_dir
+from git_scratch.utils.object_store import get_object_store
 
 def read_object(oid: str) -> tuple[str, bytes]:
     """
     Read and decompress a Git object by its OID.
+    The object comes from the configured object store (loose objects and
+    packfiles by default).
+    Recently read objects are served from the process-wide object cache.
     Returns:
         - type (e.g., 'tree', 'blob')
         - content (raw bytes after header)
     """
-    path = os.path.join(".git", "objects", oid[:2], oid[2:])
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Object {oid} not found.")
+    repo = objects_dir()
+    object_cache.configure(repo)
+    key = (repo, oid)
+    cached = object_cache.get(key)
+    if cached is not None:
+        return cached
 
-    with open(path, "rb") as f:
-        compressed = f.read()
+    obj = get_object_store().read(oid)
+    object_cache.put(key, obj)
+    return obj
 
-    data = zlib.decompress(compressed)
-    header_end = data.index(b"\x00")
-    header = data[:header_end].decode()
-    obj_type, _ = header.split()
-    content = data[header_end + 1:]
-    return obj_type, content
+def read_object_info(oid: str) -> tuple[str, int]:
+    """
+    Return the type and size of an object, inflating only its header.
+    """
+    cached = object_cache.get((objects_dir(), oid))
+    if cached is not None:
+        return cached[0], len(cached[1])
+
+    return get_object_store().read_info(oid)
+
+def iter_object_ids(prefix: str = "") -> list[str]:
+    """
+    Return the sorted, de-duplicated OIDs of every stored object starting
+    with *prefix*.
+    """
+    return sorted(set(get_object_store().iter_prefix(prefix.lower())))
@@ -1,5 +1,6 @@
+import re
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class GitError(Exception):
@@ -10,6 +11,14 @@ class InvalidHeadError(GitError):
     """Raised when HEAD points to an invalid ref or commit, or refers to a missing or invalid object."""
 
 
+class RevisionError(GitError):
+    """Raised when a revision cannot be resolved to an object."""
+
+
+class AmbiguousRevisionError(RevisionError):
+    """Raised when an abbreviated SHA-1 matches several objects."""
+
+
 def _is_valid_oid(oid: str) -> bool:
     return len(oid) == 40 and all(c in "0123456789abcdef" for c in oid.lower())
 
@@ -76,3 +85,160 @@ Returns a description of the HEAD for display purposes
         return ref
     else:
         return f"HEAD detached at {oid[:7]}"
+
+
+def list_refs(include_head: bool = True) -> Dict[str, str]:
+    """
+    Return every ref of the repository (loose refs, packed-refs and HEAD)
+    mapped to the OID it points to. Symbolic refs are resolved.
+    """
+    git_dir = Path(".git")
+    refs: Dict[str, str] = {}
+
+    packed = git_dir / "packed-refs"
+    if packed.is_file():
+        for line in packed.read_text().splitlines():
+            line = line.strip()
+            if not line or line.startswith("#") or line.startswith("^"):
+                continue
+            oid, refname = line.split(" ", 1)
+            refs[refname] = oid
+
+    refs_dir = git_dir / "refs"
+    if refs_dir.is_dir():
+        for path in sorted(refs_dir.rglob("*")):
+            if path.is_file():
+                oid = _resolve_ref_file(path)
+                if oid:
+                    refs[path.relative_to(git_dir).as_posix()] = oid
+
+    if include_head:
+        head_path = git_dir / "HEAD"
+        if head_path.is_file():
+            oid = _resolve_ref_file(head_path)
+            if oid:
+                refs["HEAD"] = oid
+
+    return refs
+
+
+def all_ref_tips() -> List[str]:
+    """
+    The OIDs `--all` starts from, in Git's order: HEAD, then every ref by
+    name. Walks break date ties by this order.
+    """
+    refs = list_refs()
+    names = (["HEAD"] if "HEAD" in refs else []) + sorted(name for name in refs if name != "HEAD")
+    return list(dict.fromkeys(refs[name] for name in names))
+
+
+def _resolve_ref_file(path: Path, depth: int = 0) -> Optional[str]:
+    content = path.read_text().strip()
+    if content.startswith("ref: "):
+        target = content[len("ref: "):]
+        target_path = Path(".git") / target
+        if depth < 5 and target_path.is_file():
+            return _resolve_ref_file(target_path, depth + 1)
+        return _read_packed_ref(target)
+    return content.lower() if _is_valid_oid(content) else None
+
+
+def _read_packed_ref(refname: str) -> Optional[str]:
+    packed = Path(".git") / "packed-refs"
+    if not packed.is_file():
+        return None
+    for line in packed.read_text().splitlines():
+        if line.endswith(" " + refname) and not line.startswith(("#", "^")):
+            return line.split(" ", 1)[0]
+    return None
+
+
+def resolve_revision(rev: str) -> str:
+    """
+    Resolve *rev* to a full OID. Accepts full or abbreviated (4+ hex) SHA-1s,
+    HEAD, branch and tag names (loose or packed), full ref names,
+    "<rev>~<n>" and "<rev>^<n>" for ancestors and parents, and
+    "<rev>:<path>" to name an entry of the tree of a commit.
+
+    Raises:
+        RevisionError: If the revision is unknown.
+        AmbiguousRevisionError: If an abbreviated SHA-1 matches several objects.
+    """
+    from git_scratch.utils.read_object import iter_object_ids
+
+    if ":" in rev:
+        base, path = rev.split(":", 1)
+        if not base:
+            raise RevisionError(f"unsupported revision '{rev}'")
+        return _resolve_tree_path(resolve_revision(base), path, rev)
+
+    suffix = _ANCESTRY_SUFFIX.search(rev)
+    if suffix and suffix.start() > 0:
+        oid = resolve_revision(rev[:suffix.start()])
+        for op, count in re.findall(r"([~^])(\d*)", suffix.group()):
+            n = int(count) if count else 1
+            if op == "~":
+                for _ in range(n):
+                    oid = _nth_parent(oid, 1, rev)
+            elif n:
+                oid = _nth_parent(oid, n, rev)
+        return oid
+
+    if _is_valid_oid(rev):
+        return rev.lower()
+
+    refs = list_refs()
+    for candidate in (rev, f"refs/{rev}", f"refs/tags/{rev}", f"refs/heads/{rev}"):
+        if candidate in refs:
+            return refs[candidate]
+
+    if 4 <= len(rev) < 40 and all(c in "0123456789abcdef" for c in rev.lower()):
+        matches = iter_object_ids(rev)
+        if len(matches) == 1:
+            return matches[0]
+        if len(matches) > 1:
+            raise AmbiguousRevisionError(f"ambiguous revision '{rev}'")
+
+    raise RevisionError(f"unknown revision '{rev}'")
+
+
+_ANCESTRY_SUFFIX = re.compile(r"(?:[~^]\d*)+$")
+
+
+def _nth_parent(oid: str, n: int, rev: str) -> str:
+    from git_scratch.utils.commit_graph import peel_to_commit, read_commit_info
+
+    commit_oid = peel_to_commit(oid)
+    if commit_oid is None:
+        raise RevisionError(f"'{rev}': {oid} is not a commit")
+    parents = read_commit_info(commit_oid).parents
+    if len(parents) < n:
+        raise RevisionError(f"unknown revision '{rev}'")
+    return parents[n - 1]
+
+
+def _resolve_tree_path(oid: str, path: str, rev: str) -> str:
+    from git_scratch.utils.read_object import read_object
+    from git_scratch.utils.tree_walker import parse_tree
+
+    obj_type, content = read_object(oid)
+    while obj_type == "tag":
+        oid = content.split(b"\n", 1)[0][len(b"object "):].decode()
+        obj_type, content = read_object(oid)
+    if obj_type == "commit":
+        oid = content.split(b"\n", 1)[0][len(b"tree "):].decode()
+        obj_type, content = read_object(oid)
+
+    parts = [p for p in path.split("/") if p]
+    for i, part in enumerate(parts):
+        if obj_type != "tree":
+            raise RevisionError(f"path '{path}' does not exist in '{rev}'")
+        for _, name, child_oid in parse_tree(content):
+            if name == part:
+                oid = child_oid
+                break
+        else:
+            raise RevisionError(f"path '{path}' does not exist in '{rev}'")
+        if i < len(parts) - 1:
+            obj_type, content = read_object(oid)
+    return oid
@@ -0,0 +1,307 @@
+import heapq
+import itertools
+import re
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from git_scratch.utils.bloom import bloom_filter_contains, bloom_key
+from git_scratch.utils.commit_graph import CommitInfo, get_commit_graph, peel_to_commit, read_commit_info
+from git_scratch.utils.merge_base import merge_bases
+from git_scratch.utils.read_object import read_object
+from git_scratch.utils.refs import RevisionError, resolve_revision
+from git_scratch.utils.tree_diff import walk_trees
+from git_scratch.utils.tree_walker import normalize_pathspecs, parse_tree
+
+# Extra rounds of the limiting walk once only excluded commits are left,
+# in case of clock skew (Git uses the same value)
+SLOP = 5
+
+_RELATIVE_DATE = re.compile(r"^(\d+)[ .]*(second|minute|hour|day|week|month|year)s?[ .]*ago$")
+_UNIT_SECONDS = {
+    "second": 1, "minute": 60, "hour": 3600, "day": 86400,
+    "week": 7 * 86400, "month": 30 * 86400, "year": 365 * 86400,
+}
+
+
+def parse_date(value: str) -> int:
+    """
+    Parse a --since/--until date: a Unix timestamp ("@1700000000" or
+    bare digits), an ISO 8601 date, or "<n> <unit>s ago".
+
+    Raises:
+        ValueError: If the date is not understood.
+    """
+    value = value.strip()
+    if value.startswith("@") and value[1:].isdigit():
+        return int(value[1:])
+    if value.isdigit() and len(value) > 8:
+        return int(value)
+    match = _RELATIVE_DATE.match(value.lower())
+    if match:
+        return int(time.time()) - int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid date '{value}'")
+    if parsed.tzinfo is None:
+        parsed = parsed.astimezone()  # local time, as Git does
+    return int(parsed.timestamp())
+
+
+def resolve_commits(revs: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split revision arguments into the commits to start from and the
+    excluded ones ("^rev", the left side of "a..b", the merge bases of
+    "a...b").
+
+    Raises:
+        RevisionError: If a revision is unknown or not a commit.
+    """
+    includes, excludes = [], []
+    for rev in revs:
+        if "..." in rev:
+            left, right = split_symmetric(rev)
+            includes.extend((left, right))
+            excludes.extend(merge_bases(left, [right], all_bases=True))
+            continue
+        if ".." in rev:
+            left, right = rev.split("..", 1)
+            pairs = [(left or "HEAD", excludes), (right or "HEAD", includes)]
+        elif rev.startswith("^"):
+            pairs = [(rev[1:], excludes)]
+        else:
+            pairs = [(rev, includes)]
+        for name, target in pairs:
+            target.append(resolve_commit(name))
+    return includes, excludes
+
+
+def resolve_commit(name: str) -> str:
+    """
+    Resolve *name* to a commit OID, following annotated tags.
+
+    Raises:
+        RevisionError: If *name* is unknown or not a commit.
+    """
+    commit = peel_to_commit(resolve_revision(name))
+    if commit is None:
+        raise RevisionError(f"'{name}' is not a commit")
+    return commit
+
+
+def split_symmetric(rev: str) -> Tuple[str, str]:
+    """Resolve both sides of "a...b" (HEAD where one is left out)."""
+    left, right = rev.split("...", 1)
+    return resolve_commit(left or "HEAD"), resolve_commit(right or "HEAD")
+
+
+class _DateQueue:
+    """
+    Commits to visit, newest committer date first; ties keep insertion order.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, str]] = []
+        self._counter = itertools.count()
+        self.infos: Dict[str, CommitInfo] = {}
+
+    def info(self, oid: str) -> CommitInfo:
+        info = self.infos.get(oid)
+        if info is None:
+            info = self.infos[oid] = read_commit_info(oid)
+        return info
+
+    def push(self, oid: str) -> None:
+        heapq.heappush(self._heap, (-self.info(oid).time, next(self._counter), oid))
+
+    def pop(self) -> CommitInfo:
+        return self.infos[heapq.heappop(self._heap)[2]]
+
+    def oids(self) -> Iterator[str]:
+        return (oid for _, _, oid in self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+
+class PathLimiter:
+    """
+    History simplification for a path-limited walk: a commit is shown
+    only if it changes the selected paths, and a merge that takes them
+    unchanged from one parent is only followed through that parent.
+
+    Comparisons with the first parent first ask the commit's changed-path
+    Bloom filter in the commit-graph, which rules out most commits
+    without reading a single tree.
+    """
+
+    def __init__(self, pathspecs: Sequence[str]):
+        self.pathspecs = list(pathspecs)
+        self.graph = get_commit_graph()
+        self.keys: List[List[List[int]]] = []
+        if self.graph is not None and self.graph.bloom_settings is not None:
+            version, num_hashes = self.graph.bloom_settings
+            # A path may be changed only if it and its directories all are
+            for spec, _ in normalize_pathspecs(pathspecs) or []:
+                parts = spec.split("/")
+                self.keys.append([bloom_key("/".join(parts[:i]), version, num_hashes)
+                                  for i in range(len(parts), 0, -1)])
+
+    def _maybe_changed(self, info: CommitInfo) -> bool:
+        if not self.keys:
+            return True
+        pos = self.graph.find(bytes.fromhex(info.oid))
+        if pos is None:
+            return True
+        data = self.graph.bloom_filter(pos)
+        return any(all(bloom_filter_contains(data, key) for key in keys) for keys in self.keys)
+
+    def _differs(self, old_tree: Optional[str], new_tree: str) -> bool:
+        if old_tree == new_tree:
+            return False
+        return next(walk_trees([old_tree, new_tree], pathspecs=self.pathspecs), None) is not None
+
+    def simplify(self, info: CommitInfo, queue: "_DateQueue") -> Tuple[bool, List[str]]:
+        """Return (show the commit, parents to follow)."""
+        if not info.parents:
+            return self._differs(None, info.tree), []
+        for i, parent in enumerate(info.parents):
+            if i == 0 and not self._maybe_changed(info):
+                return False, [parent]
+            if not self._differs(queue.info(parent).tree, info.tree):
+                return False, [parent]
+        return True, info.parents
+
+
+def walk_revisions(includes: Iterable[str], excludes: Iterable[str] = (),
+                   since: Optional[int] = None, until: Optional[int] = None,
+                   pathspecs: Optional[Sequence[str]] = None) -> Iterator[CommitInfo]:
+    """
+    Yield the commits reachable from *includes* but not from *excludes*,
+    newest committer date first, each once.
+
+    Without exclusions the walk is fully lazy: it stops as soon as the
+    consumer does. Commits older than *since* end the walk along their
+    line; commits newer than *until* are walked through but not yielded.
+    With *pathspecs*, history is simplified (see PathLimiter).
+    """
+    limiter = PathLimiter(pathspecs) if normalize_pathspecs(pathspecs) else None
+    queue = _DateQueue()
+    seen: Set[str] = set()
+    uninteresting: Set[str] = set()
+    for oid in excludes:
+        if oid not in seen:
+            seen.add(oid)
+            uninteresting.add(oid)
+            queue.push(oid)
+    for oid in includes:
+        if oid not in seen:
+            seen.add(oid)
+            queue.push(oid)
+
+    if not uninteresting:
+        while queue:
+            info = queue.pop()
+            if since is not None and info.time < since:
+                continue
+            show, parents = limiter.simplify(info, queue) if limiter else (True, info.parents)
+            for parent in parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    queue.push(parent)
+            if show and (until is None or info.time <= until):
+                yield info
+        return
+
+    for info in _limit(queue, seen, uninteresting, since, limiter):
+        if info.oid not in uninteresting and (until is None or info.time <= until):
+            yield info
+
+
+def _limit(queue: _DateQueue, seen: Set[str], uninteresting: Set[str],
+           since: Optional[int], limiter: Optional[PathLimiter] = None) -> List[CommitInfo]:
+    """
+    Walk until only excluded commits are left to visit, marking everything
+    reachable from an excluded commit, and return the interesting commits
+    in date order. A commit may be marked after it was collected, so the
+    caller filters the result.
+    """
+    collected: List[CommitInfo] = []
+    slop = SLOP
+    while queue:
+        info = queue.pop()
+        parents = info.parents
+        if info.oid in uninteresting:
+            _mark_uninteresting(info.parents, queue.infos, uninteresting)
+        elif since is not None and info.time < since:
+            continue
+        else:
+            show, parents = limiter.simplify(info, queue) if limiter else (True, info.parents)
+            if show:
+                collected.append(info)
+        for parent in parents:
+            if parent not in seen:
+                seen.add(parent)
+                queue.push(parent)
+
+        if all(oid in uninteresting for oid in queue.oids()):
+            slop -= 1
+            if slop == 0:
+                break
+        else:
+            slop = SLOP
+    return collected
+
+
+def _mark_uninteresting(oids: Iterable[str], infos: Dict[str, CommitInfo], uninteresting: Set[str]) -> None:
+    # Commits already visited pass the mark on to their own parents
+    stack = list(oids)
+    while stack:
+        oid = stack.pop()
+        if oid in uninteresting:
+            continue
+        uninteresting.add(oid)
+        if oid in infos:
+            stack.extend(infos[oid].parents)
+
+
+def list_objects(commits: Iterable[CommitInfo], excluded_trees: Iterable[str] = ()) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (oid, path) for the trees and blobs of *commits*, each once, as
+    `git rev-list --objects` lists them: every commit's tree depth first,
+    in tree order. Objects reachable from *excluded_trees* are left out.
+    """
+    seen: Set[str] = set()
+    stack = list(excluded_trees)
+    while stack:
+        oid = stack.pop()
+        if oid in seen:
+            continue
+        seen.add(oid)
+        for mode, _, child in _tree_entries(oid):
+            if mode == "40000":
+                stack.append(child)
+            elif mode != "160000":
+                seen.add(child)
+
+    for info in commits:
+        pending = [(info.tree, "", True)]
+        while pending:
+            oid, path, is_tree = pending.pop()
+            if oid in seen:
+                continue
+            seen.add(oid)
+            yield oid, path
+            if not is_tree:
+                continue
+            entries = [
+                (child, f"{path}/{name}" if path else name, mode == "40000")
+                for mode, name, child in _tree_entries(oid) if mode != "160000"
+            ]
+            pending.extend(reversed(entries))
+
+
+def _tree_entries(oid: str) -> Iterator[Tuple[str, str, str]]:
+    _, content = read_object(oid)
+    return parse_tree(content)
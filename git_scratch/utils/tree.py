@@ -1,55 +1,58 @@
-
-import os
-from typing import List, Dict, Tuple
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+from git_scratch.utils.cache_tree import CacheTree
 from git_scratch.utils.object import write_object
-from git_scratch.utils.index_utils import load_index
-
+from git_scratch.utils.object_store import get_object_store, hash_object
+from git_scratch.utils.index_utils import index_transaction, load_index
 
-def build_tree(entries: List[Dict], base_path: str = "") -> bytes:
-    tree_entries: Dict[str, Tuple[str, bytes]] = {}
 
-    for entry in entries:
-        rel_path = entry["path"]
-        if not rel_path.startswith(base_path):
-            continue
+def _write_tree(content: bytes) -> str:
+    return write_object(content, "tree")
 
-        sub_path = rel_path[len(base_path):].lstrip("/")
-        parts = sub_path.split("/", 1)
+@contextlib.contextmanager
+def _tree_writer(jobs: Optional[int]) -> Iterator[Callable[[bytes], str]]:
+    """
+    Yield the function storing each new tree. With several *jobs*, the
+    OID is computed right away, as the parent tree needs it, while the
+    compression and the write happen on a pool of threads; every tree is
+    stored when the block exits.
+    """
+    if not jobs or jobs <= 1:
+        yield _write_tree
+        return
 
-        if len(parts) == 1:
-            mode = entry["mode"]
-            oid = bytes.fromhex(entry["oid"])
-            name = parts[0]
-            tree_entries[name] = (mode, oid)
-        else:
-            dir_name = parts[0]
-            sub_base = os.path.join(base_path, dir_name)
-            if dir_name not in tree_entries:
-                sub_tree = build_tree(entries, sub_base)
-                sub_oid = write_object(sub_tree, "tree")
-                tree_entries[dir_name] = ("40000", bytes.fromhex(sub_oid))
+    store = get_object_store()
+    futures = []
 
-    result = b""
-    for name in sorted(tree_entries):
-        mode, oid = tree_entries[name]
-        result += f"{mode} {name}".encode() + b"\x00" + oid
+    def write(content: bytes) -> str:
+        futures.append(pool.submit(store.write, "tree", content))
+        return hash_object("tree", content)
 
-    return result
+    with store.transaction(), ThreadPoolExecutor(max_workers=jobs) as pool:
+        yield write
+        for future in futures:
+            future.result()
 
-def create_root_tree_object() -> str:
+def create_root_tree_object(jobs: Optional[int] = None) -> str:
     """
-    Loads the index, recursively builds the root Git tree object,
-    stores it, and returns its OID.
-    This function orchestrates the creation of the complete tree.
+    Builds the root Git tree object of the index, stores it, and returns
+    its OID.
+    Only the directories changed since the last call are rehashed: the
+    others come from the cache-tree kept in the index, which is updated.
+    Trees are stored on *jobs* threads.
     """
-    index_entries = load_index()
-    if not index_entries:
-        raise ValueError("Index is empty or not found. Nothing to commit.")
-
-    # Utilise la fonction build_tree existante pour obtenir le contenu binaire du tree racine pour l'arbre racine, base_path est vide
-    tree_content_bytes = build_tree(index_entries, base_path="")
-    
-    # Stocke cet objet tree racine dans le dépôt Git
-    tree_oid = write_object(tree_content_bytes, "tree")
-    
-    return tree_oid
\ No newline at end of file
+    try:
+        with index_transaction() as index:
+            if not len(index):
+                raise ValueError("Index is empty or not found. Nothing to commit.")
+            # The trees must all be stored before the cache-tree refers to them
+            with _tree_writer(jobs) as write_tree:
+                return index.write_tree(write_tree)
+    except FileExistsError:
+        # Index locked by another process: build every tree without caching
+        index_entries = sorted(load_index(), key=lambda e: e["path"].encode())
+        if not index_entries:
+            raise ValueError("Index is empty or not found. Nothing to commit.")
+        with _tree_writer(jobs) as write_tree:
+            return CacheTree().update(index_entries, write_tree)
@@ -0,0 +1,147 @@
+import stat
+from typing import Iterator, List, Optional, Sequence, Tuple
+from git_scratch.utils.read_object import read_object
+from git_scratch.utils.tree_walker import match_pathspecs, normalize_pathspecs, parse_tree
+
+TREE_MODE = "40000"
+NULL_OID = "0" * 40
+
+# (mode, oid) of a path in one of the trees, or None where it is missing
+TreeEntry = Optional[Tuple[str, str]]
+
+
+def _read_tree(oid: Optional[str]) -> List[Tuple[str, str, str]]:
+    if oid is None:
+        return []
+    obj_type, content = read_object(oid)
+    if obj_type != "tree":
+        raise ValueError(f"object {oid} is not a tree")
+    return list(parse_tree(content))
+
+
+def _sort_key(mode: str, name: str) -> bytes:
+    # Git orders a directory as if its name ended with "/"
+    return (name + "/" if mode == TREE_MODE else name).encode()
+
+
+def _merge_level(base: str, tree_oids: Sequence[Optional[str]],
+                 pathspecs) -> Iterator[Tuple[str, List[TreeEntry], bool]]:
+    """
+    Merge the sorted entries of one directory across the trees. Yields
+    (path, entries, matched) for the names whose entries differ; matched
+    is False for directories only walked to reach a pathspec below them.
+    """
+    levels = [_read_tree(oid) for oid in tree_oids]
+    positions = [0] * len(levels)
+    while True:
+        keys = [
+            _sort_key(*level[pos][:2]) if pos < len(level) else None
+            for level, pos in zip(levels, positions)
+        ]
+        present = [k for k in keys if k is not None]
+        if not present:
+            return
+        key = min(present)
+
+        entries: List[TreeEntry] = []
+        name = None
+        for i, level in enumerate(levels):
+            if keys[i] == key:
+                mode, name, oid = level[positions[i]]
+                entries.append((mode, oid))
+                positions[i] += 1
+            else:
+                entries.append(None)
+
+        # Identical in every tree: nothing below can differ either
+        if all(e == entries[0] for e in entries):
+            continue
+
+        path = f"{base}/{name}" if base else name
+        is_tree = key.endswith(b"/")
+        matched = True
+        if pathspecs is not None:
+            matched, inside = match_pathspecs(path, is_tree, pathspecs)
+            if not matched and not inside:
+                continue
+        yield path, entries, matched
+
+
+def walk_trees(tree_oids: Sequence[Optional[str]], recursive: bool = True,
+               pathspecs: Optional[Sequence[str]] = None,
+               show_trees: bool = False) -> Iterator[Tuple[str, List[TreeEntry]]]:
+    """
+    Walk several trees side by side and lazily yield (path, entries) for
+    every path whose (mode, oid) is not the same in all of them, in Git
+    order. A None tree OID stands for an empty tree.
+
+    Subtrees with the same OID everywhere are skipped without being read,
+    so the cost follows the number of changed paths, not the tree size.
+    With *recursive*, changed directories are descended into instead of
+    being reported; *show_trees* reports them as well. Only the subtrees
+    that can hold paths selected by *pathspecs* (path prefixes) are read.
+    """
+    specs = normalize_pathspecs(pathspecs)
+    stack = [_merge_level("", tree_oids, specs)]
+    stack_specs = [specs]
+    while stack:
+        item = next(stack[-1], None)
+        if item is None:
+            stack.pop()
+            stack_specs.pop()
+            continue
+
+        path, entries, matched = item
+        is_tree = any(e is not None and e[0] == TREE_MODE for e in entries)
+        if not is_tree:
+            yield path, entries
+            continue
+        if not recursive:
+            yield path, entries
+            continue
+        if show_trees:
+            yield path, entries
+        subtrees = [e[1] if e is not None and e[0] == TREE_MODE else None for e in entries]
+        # Below a selected directory, everything is selected
+        sub_specs = None if matched else stack_specs[-1]
+        stack.append(_merge_level(path, subtrees, sub_specs))
+        stack_specs.append(sub_specs)
+
+
+def _file_type(mode: str) -> int:
+    return stat.S_IFMT(int(mode, 8))
+
+
+def diff_trees(old_oid: Optional[str], new_oid: Optional[str], recursive: bool = True,
+               pathspecs: Optional[Sequence[str]] = None, show_trees: bool = False) -> Iterator[dict]:
+    """
+    Compare two trees and lazily yield one record per change, with the
+    keys status (A, D, M or T for a type change), path, old_mode,
+    new_mode, old_oid and new_oid. Missing sides have mode "0" and the
+    null OID.
+    """
+    for path, (old, new) in walk_trees([old_oid, new_oid], recursive, pathspecs, show_trees):
+        old_mode, old_oid_hex = old or ("0", NULL_OID)
+        new_mode, new_oid_hex = new or ("0", NULL_OID)
+        if old is None:
+            status = "A"
+        elif new is None:
+            status = "D"
+        elif _file_type(old_mode) != _file_type(new_mode):
+            status = "T"
+        else:
+            status = "M"
+        yield {
+            "status": status,
+            "path": path,
+            "old_mode": old_mode,
+            "new_mode": new_mode,
+            "old_oid": old_oid_hex,
+            "new_oid": new_oid_hex,
+        }
+
+
+def format_raw(change: dict) -> str:
+    """Format a change the way `git diff-tree` prints it."""
+    return (f":{int(change['old_mode'], 8):06o} {int(change['new_mode'], 8):06o} "
+            f"{change['old_oid']} {change['new_oid']} {change['status']}\t{change['path']}")
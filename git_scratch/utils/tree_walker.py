@@ -1,28 +1,115 @@
 from git_scratch.utils.read_object import read_object
-from typing import List
+from typing import Iterator, List, Optional, Sequence, Tuple
 import os
 
-def entries_from_tree(tree_oid: str, base_path: str = "") -> List[dict]:
-    """Walk *tree_oid* recursively and return index‑style dict entries."""
-    entries: List[dict] = []
-    obj_type, content = read_object(tree_oid)
-    if obj_type != "tree":
-        raise ValueError("Expected tree object")
 
+def parse_tree(content: bytes) -> Iterator[Tuple[str, str, str]]:
+    """Yield the (mode, name, oid) entries of a raw tree object."""
     i = 0
     while i < len(content):
         mode_end = content.find(b" ", i)
         name_end = content.find(b"\x00", mode_end)
         mode = content[i:mode_end].decode()
         name = content[mode_end + 1 : name_end].decode()
-        oid_bytes = content[name_end + 1 : name_end + 21]
-        oid = oid_bytes.hex()
+        oid = content[name_end + 1 : name_end + 21].hex()
         i = name_end + 21
+        yield mode, name, oid
+
+
+def normalize_pathspecs(pathspecs: Optional[Sequence[str]]) -> Optional[List[Tuple[str, bool]]]:
+    """
+    Turn path prefixes into (path, directory only) pairs; None selects
+    everything. A trailing "/" restricts a pathspec to directories.
+    """
+    if not pathspecs:
+        return None
+    return [(p.strip("/"), p.endswith("/")) for p in pathspecs if p.strip("/")] or None
+
+
+def match_pathspecs(path: str, is_tree: bool, pathspecs: List[Tuple[str, bool]]) -> Tuple[bool, bool]:
+    """
+    Return (matched, inside): *path* is selected by a pathspec, or is a
+    directory that holds paths selected by one, e.g. "a" for "a/b" or "a/".
+    """
+    inside = False
+    for spec, dir_only in pathspecs:
+        if path == spec:
+            if not is_tree:
+                if not dir_only:
+                    return True, False
+            elif dir_only:
+                inside = True
+            else:
+                return True, False
+        elif path.startswith(spec + "/"):
+            return True, False
+        elif is_tree and spec.startswith(path + "/"):
+            inside = True
+    return False, inside
+
+
+def iter_tree(tree_oid: str, recursive: bool = False, show_trees: bool = False,
+              pathspecs: Optional[Sequence[str]] = None,
+              content: Optional[bytes] = None) -> Iterator[Tuple[str, str, str]]:
+    """
+    Lazily yield the (mode, oid, path) entries of *tree_oid*, in tree order.
 
-        rel_path = os.path.join(base_path, name)
-        if mode == "40000":  # subtree
-            entries.extend(entries_from_tree(oid, rel_path))
+    Subtrees are read only when they are descended into: with *recursive*,
+    or to reach the paths selected by *pathspecs*. They are then reported
+    only with *show_trees*. *content* is the raw tree, if already read.
+    """
+    if content is None:
+        obj_type, content = read_object(tree_oid)
+        if obj_type != "tree":
+            raise ValueError("Expected tree object")
+
+    stack = [(parse_tree(content), "", normalize_pathspecs(pathspecs))]
+    while stack:
+        entries, base, specs = stack[-1]
+        item = next(entries, None)
+        if item is None:
+            stack.pop()
+            continue
+
+        mode, name, oid = item
+        path = f"{base}/{name}" if base else name
+        is_tree = mode == "40000"
+        matched, inside = (True, False) if specs is None else match_pathspecs(path, is_tree, specs)
+        if not matched and not inside:
+            continue
+        if is_tree and (inside or recursive):
+            if show_trees:
+                yield mode, oid, path
+            _, sub_content = read_object(oid)
+            # Below a selected directory, everything is selected
+            stack.append((parse_tree(sub_content), path, None if matched else specs))
         else:
-            entries.append({"path": rel_path, "oid": oid, "mode": mode})
+            yield mode, oid, path
+
 
-    return entries
\ No newline at end of file
+def entries_from_tree(tree_oid: str, base_path: str = "") -> List[dict]:
+    """Walk *tree_oid* recursively and return index‑style dict entries."""
+    return [
+        {"path": os.path.join(base_path, path), "oid": oid, "mode": mode}
+        for mode, oid, path in iter_tree(tree_oid, recursive=True)
+    ]
+
+
+def peel_to_tree(oid: str) -> str:
+    """
+    Return the tree OID of a tree-ish: a tree, or a commit or tag pointing
+    to one.
+
+    Raises:
+        ValueError: If *oid* does not lead to a tree.
+    """
+    obj_type, content = read_object(oid)
+    while obj_type == "tag":
+        oid = content.split(b"\n", 1)[0][len(b"object "):].decode()
+        obj_type, content = read_object(oid)
+    if obj_type == "commit":
+        oid = content.split(b"\n", 1)[0][len(b"tree "):].decode()
+        obj_type, _ = read_object(oid)
+    if obj_type != "tree":
+        raise ValueError(f"object {oid} is not a tree-ish")
+    return oid
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from git_scratch.utils.config import get_config_bool
+from git_scratch.utils.fsmonitor import FSMonitorAnswer
+
+CACHE_VERSION = 1
+
+
+def get_untracked_cache_path() -> Path:
+    return Path(os.getcwd()) / ".git" / "pit-untracked-cache.json"
+
+
+def _gitignore_state() -> str:
+    """
+    Identify the ignore rules in force: the cache is only valid for them.
+    """
+    sha = hashlib.sha1(f"v{CACHE_VERSION}\0".encode())
+    try:
+        with open(".gitignore", "rb") as f:
+            sha.update(f.read())
+    except FileNotFoundError:
+        pass
+    return sha.hexdigest()
+
+
+class UntrackedCache:
+    """
+    Per-directory listing of the working tree, persisted in .git.
+
+    For each directory, the cache keeps its mtime and the names of the
+    files and subdirectories that are not ignored. A directory's mtime
+    changes whenever an entry is created, removed or renamed in it, so a
+    directory with the same mtime does not need to be scanned again.
+    Ignored directories are never entered.
+
+    With an fsmonitor answer for the token the cache was saved at, the
+    directories the daemon did not report are not even stat'ed.
+    """
+
+    def __init__(self, spec, enabled: bool = True):
+        self.spec = spec
+        self.enabled = enabled
+        self.state = _gitignore_state()
+        self.dirs: Dict[str, dict] = {}
+        self.written_ns = 0
+        self.fsmonitor_token: Optional[str] = None
+        self.scanned = 0
+        self._dirty = False
+        if enabled:
+            self._load()
+
+    def _load(self) -> None:
+        path = get_untracked_cache_path()
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            written_ns = path.stat().st_mtime_ns
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION or data.get("gitignore") != self.state:
+            return
+        self.dirs = data.get("dirs", {})
+        self.written_ns = written_ns
+        self.fsmonitor_token = data.get("fsmonitor_token")
+
+    def _scan(self, rel_dir: str, mtime_ns: int) -> dict:
+        files: List[str] = []
+        subdirs: List[str] = []
+        with os.scandir(rel_dir or ".") as it:
+            for entry in it:
+                if entry.name == ".git":
+                    continue
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    # Nothing below an ignored directory can be re-included
+                    if not self.spec.match_file(rel_path + "/"):
+                        subdirs.append(entry.name)
+                elif not self.spec.match_file(rel_path):
+                    files.append(entry.name)
+        self.scanned += 1
+        self._dirty = True
+        return {"mtime_ns": mtime_ns, "files": sorted(files), "dirs": sorted(subdirs)}
+
+    def _listing(self, rel_dir: str, changed_dirs: Optional[Set[str]]) -> Optional[dict]:
+        cached = self.dirs.get(rel_dir)
+        if cached and changed_dirs is not None and rel_dir not in changed_dirs:
+            return cached
+        try:
+            mtime_ns = os.stat(rel_dir or ".").st_mtime_ns
+        except FileNotFoundError:
+            return None
+        # A directory changed in the same tick as the cache write may have
+        # changed again since, without its mtime moving
+        if cached and cached["mtime_ns"] == mtime_ns and mtime_ns < self.written_ns:
+            return cached
+        return self._scan(rel_dir, mtime_ns)
+
+    def iter_files(self, fsmonitor: Optional[FSMonitorAnswer] = None) -> Iterator[str]:
+        """
+        Yield the path of every file that is not ignored, in sorted order.
+        The listings are refreshed as a side effect; call save() afterwards.
+        """
+        changed_dirs = None
+        if (fsmonitor is not None and fsmonitor.paths is not None
+                and self.fsmonitor_token and self.fsmonitor_token == fsmonitor.since):
+            changed_dirs = fsmonitor.changed_dirs()
+
+        seen: Dict[str, dict] = {}
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            listing = self._listing(rel_dir, changed_dirs)
+            if listing is None:
+                continue
+            seen[rel_dir] = listing
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            for name in listing["files"]:
+                yield prefix + name
+            stack.extend(prefix + name for name in reversed(listing["dirs"]))
+
+        token = fsmonitor.token if fsmonitor is not None else None
+        if seen.keys() != self.dirs.keys() or token != self.fsmonitor_token:
+            self._dirty = True
+        self.dirs = seen
+        self.fsmonitor_token = token
+
+    def save(self) -> None:
+        """
+        Write the cache back if anything was rescanned. Errors are ignored:
+        the cache is only an optimisation.
+        """
+        if not self.enabled or not self._dirty:
+            return
+        path = get_untracked_cache_path()
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix="untracked_", dir=path.parent)
+            with os.fdopen(fd, "w") as f:
+                json.dump({
+                    "version": CACHE_VERSION,
+                    "gitignore": self.state,
+                    "fsmonitor_token": self.fsmonitor_token,
+                    "dirs": self.dirs,
+                }, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._dirty = False
+
+
+def list_files(spec, fsmonitor: Optional[FSMonitorAnswer] = None) -> List[str]:
+    """
+    Return every non-ignored file of the working tree, going through the
+    untracked cache unless pit.untrackedCache is false.
+    """
+    try:
+        enabled = get_config_bool("pit", "untrackedCache", True)
+    except ValueError as e:
+        print(f"[warn] {e}")
+        enabled = True
+    cache = UntrackedCache(spec, enabled)
+    files = list(cache.iter_files(fsmonitor))
+    cache.save()
+    return files
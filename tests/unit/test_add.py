@@ -1,9 +1,9 @@
 from typer.testing import CliRunner
 import hashlib
-import json
 import os
 
 from git_scratch.main import app
+from git_scratch.utils.index_utils import load_index
 
 runner = CliRunner()
 
@@ -32,11 +32,10 @@ def test_add_creates_object_and_index_entry(tmp_path):
         obj_path = git_dir / "objects" / expected_oid[:2] / expected_oid[2:]
         assert obj_path.exists(), " Object was not created"
 
-        index_path = git_dir / "index.json"
-        assert index_path.exists(), " index.json file is missing"
+        index_path = git_dir / "index"
+        assert index_path.exists(), " index file is missing"
 
-        with open(index_path) as f:
-            index = json.load(f)
+        index = load_index()
 
         assert len(index) == 1, " Index does not contain exactly 1 entry"
         entry = index[0]
@@ -46,3 +45,65 @@ def test_add_creates_object_and_index_entry(tmp_path):
 
     finally:
         os.chdir(old_cwd)
+
+
+def test_add_directory_above_threshold_writes_single_pack(tmp_path, monkeypatch):
+    import subprocess
+
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "config", "pit.bulkCheckinThreshold", "3"], cwd=tmp_path, check=True)
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(5):
+        (src / f"f{i}.txt").write_text(f"file {i}\n" * (i + 1))
+    (src / "dup.txt").write_text("file 0\n")  # same blob as f0.txt
+    monkeypatch.chdir(tmp_path)
+
+    result = runner.invoke(app, ["add", "src"])
+    assert result.exit_code == 0, result.output
+
+    objects_dir = tmp_path / ".git" / "objects"
+    loose = [p for p in objects_dir.iterdir() if len(p.name) == 2]
+    assert loose == [], "Blobs should not be written as loose objects"
+    packs = list((objects_dir / "pack").glob("pack-*.pack"))
+    assert len(packs) == 1
+    assert list((objects_dir / "pack").glob("tmp_pack_*")) == []
+
+    verify = subprocess.run(
+        ["git", "verify-pack", "-v", str(packs[0])], capture_output=True, text=True, check=True
+    ).stdout
+    assert "non delta: 5 objects" in verify
+
+    index = {e["path"]: e["oid"] for e in load_index()}
+    assert len(index) == 6
+    for path, oid in index.items():
+        expected = subprocess.check_output(["git", "hash-object", path], cwd=tmp_path).decode().strip()
+        assert oid == expected
+
+
+def test_parallel_add_matches_single_threaded(tmp_path, monkeypatch):
+    import subprocess
+
+    index_by_jobs = {}
+    for jobs in ("1", "8"):
+        repo = tmp_path / f"repo{jobs}"
+        repo.mkdir()
+        subprocess.run(["git", "init"], cwd=repo, check=True)
+        for d in ("b", "a", "a/z"):
+            (repo / "src" / d).mkdir(parents=True, exist_ok=True)
+            for i in range(10):
+                (repo / "src" / d / f"f{i}.txt").write_text(f"{d} {i}\n" * (i * 100 + 1))
+        monkeypatch.chdir(repo)
+
+        result = runner.invoke(app, ["add", "src", "-j", jobs])
+        assert result.exit_code == 0, result.output
+
+        index_by_jobs[jobs] = [{k: e[k] for k in ("path", "oid", "mode")} for e in load_index()]
+        for entry in index_by_jobs[jobs]:
+            obj_type = subprocess.check_output(["git", "cat-file", "-t", entry["oid"]], cwd=repo).decode().strip()
+            assert obj_type == "blob"
+
+    assert index_by_jobs["1"] == index_by_jobs["8"]
+    paths = [e["path"] for e in index_by_jobs["8"]]
+    assert len(paths) == 30
+    assert paths[0] == os.path.join("src", "a", "f0.txt")
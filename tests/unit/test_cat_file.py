@@ -20,3 +20,46 @@ def test_cat_file_all_modes(tmp_path):
         result_pit = runner.invoke(app, ["cat-file", flag, oid])
 
         assert result_git.stdout.strip() == result_pit.stdout.strip()
+
+
+def init_repo_with_pack(tmp_path):
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    for i in range(3):
+        (tmp_path / "file.txt").write_text(f"version {i}\n" * 20)
+        subprocess.run(["git", "add", "file.txt"], cwd=tmp_path, check=True)
+        subprocess.run(
+            ["git", "-c", "user.name=T", "-c", "user.email=t@example.com", "commit", "-m", f"c{i}"],
+            cwd=tmp_path, check=True
+        )
+        if i == 1:
+            # Mélange d'objets packés et d'objets loose
+            subprocess.run(["git", "repack", "-adq"], cwd=tmp_path, check=True)
+    return tmp_path
+
+
+def test_cat_file_batch_check_all_objects_matches_git(tmp_path, monkeypatch):
+    repo = init_repo_with_pack(tmp_path)
+    monkeypatch.chdir(repo)
+
+    git_output = subprocess.run(
+        ["git", "cat-file", "--batch-check", "--batch-all-objects"],
+        capture_output=True, text=True, check=True
+    ).stdout
+    result = runner.invoke(app, ["cat-file", "--batch-check", "--batch-all-objects"])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout == git_output
+
+
+def test_cat_file_batch_reads_names_from_stdin(tmp_path, monkeypatch):
+    repo = init_repo_with_pack(tmp_path)
+    monkeypatch.chdir(repo)
+
+    names = "HEAD\nHEAD:file.txt\n" + "0" * 40 + "\nno-such-ref\n"
+    git_output = subprocess.run(
+        ["git", "cat-file", "--batch"], input=names.encode(), capture_output=True, check=True
+    ).stdout
+    result = runner.invoke(app, ["cat-file", "--batch"], input=names)
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout_bytes == git_output
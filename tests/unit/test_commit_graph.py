@@ -0,0 +1,113 @@
+import os
+import subprocess
+import pytest
+from typer.testing import CliRunner
+from git_scratch.main import app
+from git_scratch.utils.commit_graph import CommitGraph, read_commit_info
+
+runner = CliRunner()
+
+
+def git(*args):
+    return subprocess.check_output(["git", *args]).decode().strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    git("config", "user.name", "Test")
+    git("config", "user.email", "test@example.com")
+    for i in range(3):
+        (tmp_path / "f").write_text(str(i))
+        git("add", "f")
+        git("commit", "-qm", f"c{i}")
+    base = git("rev-parse", "HEAD")
+    tree = git("rev-parse", "HEAD^{tree}")
+    # Octopus merge: its third parent goes to the EDGE chunk
+    sides = [git("commit-tree", tree, "-p", base, "-m", f"side {i}") for i in range(2)]
+    merge = git("commit-tree", tree, "-p", base, "-p", sides[0], "-p", sides[1], "-m", "octopus")
+    git("update-ref", "refs/heads/master", merge)
+    return tmp_path
+
+
+def test_commit_graph_write_is_git_compatible(repo):
+    result = runner.invoke(app, ["commit-graph", "write"])
+    assert result.exit_code == 0, result.output
+    assert "Wrote 6 commit(s)" in result.stdout
+    subprocess.run(["git", "commit-graph", "verify"], check=True)
+
+    def read_graph():
+        graph = CommitGraph(".git/objects/info/commit-graph")
+        commits = [graph.commit(pos) for pos in range(len(graph))]
+        graph.close()
+        return [(c.oid, c.tree, c.parents, c.time, c.generation) for c in commits]
+
+    # Ours must be unmapped before git replaces the file (Windows)
+    ours = read_graph()
+    subprocess.run(["git", "commit-graph", "write", "--reachable", "--no-changed-paths"], check=True)
+    theirs = read_graph()
+    assert len(ours) == 6
+    assert ours == theirs
+
+
+def test_history_walks_use_the_commit_graph(repo, monkeypatch):
+    import git_scratch.utils.read_object as read_object_module
+    from git_scratch.utils.refs import resolve_revision
+
+    head = git("rev-parse", "HEAD")
+    assert runner.invoke(app, ["commit-graph", "write"]).exit_code == 0
+
+    read = []
+    original = read_object_module.read_object
+    monkeypatch.setattr(read_object_module, "read_object", lambda oid: read.append(oid) or original(oid))
+    info = read_commit_info(head)
+    assert info.parents == git("rev-parse", "HEAD^1", "HEAD^2", "HEAD^3").split()
+    assert info.tree == git("rev-parse", "HEAD^{tree}")
+    assert info.generation == 5
+    assert resolve_revision("HEAD^3~2") == git("rev-parse", "HEAD~2")
+    assert read == []
+
+
+def test_changed_path_filters_match_git_and_skip_tree_reads(repo, monkeypatch):
+    import git_scratch.utils.read_object as read_object_module
+    from git_scratch.utils.rev_walk import walk_revisions
+
+    (repo / "dir").mkdir()
+    (repo / "dir" / "g").write_text("g")
+    git("add", "dir")
+    git("commit", "-qm", "dir")
+    for i in range(5):
+        (repo / "f").write_text(f"more {i}")
+        git("commit", "-qam", f"f{i}")
+
+    subprocess.run(["git", "commit-graph", "write", "--reachable", "--changed-paths"], check=True)
+    theirs = CommitGraph(".git/objects/info/commit-graph")
+    expected = [bytes(theirs.bloom_filter(pos)) for pos in range(len(theirs))]
+    theirs.close()
+    os.remove(".git/objects/info/commit-graph")
+
+    result = runner.invoke(app, ["commit-graph", "write", "--changed-paths"])
+    assert result.exit_code == 0, result.output
+    subprocess.run(["git", "commit-graph", "verify"], check=True)
+    ours = CommitGraph(".git/objects/info/commit-graph")
+    assert ours.bloom_settings == (1, 7)
+    assert [bytes(ours.bloom_filter(pos)) for pos in range(len(ours))] == expected
+    ours.close()
+
+    # The filters survive a rewrite that does not ask for them
+    assert runner.invoke(app, ["commit-graph", "write"]).exit_code == 0
+    graph = CommitGraph(".git/objects/info/commit-graph")
+    assert graph.bloom_settings == (1, 7)
+    graph.close()
+
+    read = []
+    original = read_object_module.read_object
+    monkeypatch.setattr(read_object_module, "read_object", lambda oid: read.append(oid) or original(oid))
+    import git_scratch.utils.tree_diff as tree_diff
+    monkeypatch.setattr(tree_diff, "read_object", read_object_module.read_object)
+    walk = walk_revisions([git("rev-parse", "HEAD")], pathspecs=["dir"])
+    assert [info.oid for info in walk] == [git("rev-parse", "HEAD~5")]
+    # Only the trees of the "dir" commit and of the root commit are read:
+    # the five "f" commits are ruled out by their filters alone
+    assert len(read) == 4
@@ -0,0 +1,156 @@
+import random
+import subprocess
+import time
+import pytest
+from typer.testing import CliRunner
+from git_scratch.main import app
+from git_scratch.utils.line_diff import diff_lines, split_lines, unified_hunks
+
+runner = CliRunner()
+
+
+def git(*args):
+    return subprocess.check_output(["git", *args]).decode()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """Two commits touching code, a binary file and modes, plus pending changes."""
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q", "-b", "main")
+    git("config", "user.name", "Test")
+    git("config", "user.email", "test@example.com")
+    (tmp_path / "src").mkdir()
+    code = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(30))
+    (tmp_path / "src" / "code.py").write_text(code)
+    (tmp_path / "notes").write_text("one\ntwo\nthree")
+    (tmp_path / "image.bin").write_bytes(b"\x89PNG\x00\x01")
+    (tmp_path / "gone").write_text("bye\n")
+    (tmp_path / "run.sh").write_text("echo hi\n")
+    git("add", "-A")
+    git("commit", "-qm", "first")
+
+    lines = code.splitlines(keepends=True)
+    lines[10:13] = ["def inserted():\n", "    pass\n", "\n"]
+    lines.insert(60, "# trailing comment\n")
+    (tmp_path / "src" / "code.py").write_text("".join(lines))
+    (tmp_path / "notes").write_text("one\n2\nthree\n")
+    (tmp_path / "image.bin").write_bytes(b"\x89PNG\x00\x02")
+    (tmp_path / "gone").unlink()
+    (tmp_path / "run.sh").chmod(0o755)
+    (tmp_path / "new.txt").write_text("fresh\n")
+    git("add", "-A")
+    git("commit", "-qm", "second")
+
+    # Staged and unstaged changes on top
+    (tmp_path / "notes").write_text("one\n2\n3\n")
+    git("add", "notes")
+    (tmp_path / "notes").write_text("zero\none\n2\n3\n")
+    (tmp_path / "src" / "code.py").write_text("".join(lines[:-5]))
+    return tmp_path
+
+
+CASES = [
+    [],
+    ["--cached"],
+    ["HEAD~1", "HEAD"],
+    ["HEAD~1..HEAD"],
+    ["HEAD~1"],
+    ["--cached", "HEAD~1"],
+    ["HEAD~1", "HEAD", "--", "src"],
+    ["-U1", "HEAD~1", "HEAD"],
+    ["--histogram", "HEAD~1", "HEAD"],
+    ["--no-indent-heuristic", "HEAD~1", "HEAD"],
+]
+
+
+def test_diff_matches_git(repo):
+    for args in CASES:
+        result = runner.invoke(app, ["diff", *args])
+        assert result.exit_code == 0, result.output
+        assert result.stdout == git("diff", *args), args
+
+
+def test_diff_size_limit_shows_binary(repo):
+    with open(".git/config", "a") as f:
+        f.write("[pit]\n\tdiffSizeLimit = 16\n")
+    result = runner.invoke(app, ["diff", "HEAD~1", "HEAD", "--", "notes", "src"])
+    assert result.exit_code == 0, result.output
+    assert "Binary files a/src/code.py and b/src/code.py differ\n" in result.stdout
+    # Small files are still diffed
+    assert "@@ -1,3 +1,3 @@\n one\n-two\n-three\n\\ No newline at end of file\n+2\n+three\n" in result.stdout
+
+
+@pytest.mark.parametrize("algorithm,lines,vocab", [("myers", 120000, None), ("histogram", 27000, 60)])
+def test_diff_reordered_file_stops_at_work_limit(repo, algorithm, lines, vocab):
+    rng = random.Random(3)
+    content = [f"{i if vocab is None else rng.randrange(vocab):05d}\n" for i in range(lines)]
+    (repo / "big.txt").write_text("".join(content))
+    git("add", "big.txt")
+    rng.shuffle(content)
+    (repo / "big.txt").write_text("".join(content))
+
+    start = time.monotonic()
+    result = runner.invoke(app, ["diff", f"--diff-algorithm={algorithm}", "--", "big.txt"])
+    elapsed = time.monotonic() - start
+    assert result.exit_code == 0, result.output
+    # Under the size limit, but far too costly to diff line by line
+    assert result.stdout.endswith("Binary files a/big.txt and b/big.txt differ\n")
+    assert elapsed < 15
+
+
+def test_diff_matches_git_on_packed_objects(repo):
+    # Varied edits give deltas git deflates behind long Huffman tables
+    rng = random.Random(1)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_(){}[]:;.,=+-*/"
+    words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(2, 12))) for _ in range(400)]
+    lines = [" ".join(rng.choices(words, k=8)) + "\n" for _ in range(300)]
+    for version in range(8):
+        for _ in range(20):
+            lines[rng.randrange(len(lines))] = " ".join(rng.choices(words, k=8)) + "\n"
+        (repo / "varied.txt").write_text("".join(lines))
+        git("add", "varied.txt")
+        git("commit", "-qm", f"varied {version}")
+    git("gc", "-q", "--aggressive")
+    git("prune-packed")
+
+    for args in (["HEAD~9", "HEAD"], ["HEAD~4", "HEAD", "--", "varied.txt"], ["HEAD~1"]):
+        result = runner.invoke(app, ["diff", *args])
+        assert result.exit_code == 0, result.output
+        assert result.stdout == git("diff", *args), args
+def test_diff_unknown_revision(repo):
+    result = runner.invoke(app, ["diff", "nope"])
+    assert result.exit_code == 1
+    assert "unknown revision" in result.output
+
+
+@pytest.mark.parametrize("algorithm", ["myers", "histogram"])
+def test_diff_lines_match_git_on_random_edits(tmp_path, algorithm):
+    rng = random.Random(7)
+    vocab = [b"\n", b"}\n", b"    x += 1\n", b"\treturn y\n"] + [b"line %d\n" % i for i in range(20)]
+    for _ in range(20):
+        a = [rng.choice(vocab) for _ in range(rng.choice([10, 200]))]
+        b = list(a)
+        for _ in range(rng.randint(1, 30)):
+            i = rng.randrange(len(b) + 1)
+            if rng.random() < 0.5:
+                del b[i:i + rng.randint(1, 3)]
+            else:
+                b[i:i] = rng.sample(vocab, rng.randint(1, 3))
+        (tmp_path / "a").write_bytes(b"".join(a))
+        (tmp_path / "b").write_bytes(b"".join(b))
+        expected = subprocess.run(
+            ["git", "diff", "--no-index", f"--diff-algorithm={algorithm}", "a", "b"],
+            cwd=tmp_path, capture_output=True,
+        ).stdout
+        expected = expected[expected.find(b"@@"):] if b"@@" in expected else b""
+
+        old, new = split_lines(b"".join(a)), split_lines(b"".join(b))
+        blocks = diff_lines(old, new, algorithm)
+        # Applying the blocks to the old side gives the new side back
+        patched, pos = [], 0
+        for a0, a1, b0, b1 in blocks:
+            patched += old[pos:a0] + new[b0:b1]
+            pos = a1
+        assert patched + old[pos:] == new
+        assert b"".join(unified_hunks(old, new, blocks)) == expected
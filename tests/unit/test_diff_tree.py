@@ -0,0 +1,92 @@
+import subprocess
+import pytest
+from typer.testing import CliRunner
+from git_scratch.main import app
+from git_scratch.utils.tree_diff import diff_trees, walk_trees
+
+runner = CliRunner()
+
+
+def git(*args, cwd):
+    return subprocess.check_output(["git", *args], cwd=cwd).decode()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q", cwd=tmp_path)
+    git("config", "user.name", "Test", cwd=tmp_path)
+    git("config", "user.email", "test@example.com", cwd=tmp_path)
+    for i in range(20):
+        (tmp_path / f"dir{i}").mkdir()
+        (tmp_path / f"dir{i}" / "file.txt").write_text(str(i))
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "x").write_text("1")
+    (tmp_path / "a" / "y").write_text("1")
+    (tmp_path / "f").write_text("f")
+    (tmp_path / "mode.sh").write_text("echo")
+    git("add", "-A", cwd=tmp_path)
+    git("commit", "-qm", "first", cwd=tmp_path)
+
+    (tmp_path / "a" / "b" / "x").write_text("2")
+    (tmp_path / "f").unlink()
+    (tmp_path / "f").mkdir()
+    (tmp_path / "f" / "z").write_text("z")
+    (tmp_path / "a" / "link").symlink_to("y")
+    (tmp_path / "mode.sh").chmod(0o755)
+    git("add", "-A", cwd=tmp_path)
+    git("commit", "-qm", "second", cwd=tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("args", [
+    [],
+    ["-r"],
+    ["-t"],
+    ["-r", "--", "a/b"],
+    ["--", "a/b/x"],
+    ["-t", "--", "a/b"],
+    ["-r", "--", "a/b/x/"],
+    ["-r", "--", "f", "mode.sh"],
+])
+def test_diff_tree_matches_git(repo, args):
+    result = runner.invoke(app, ["diff-tree", "HEAD~1", "HEAD", *args])
+    assert result.exit_code == 0, result.output
+    assert result.stdout == git("diff-tree", "HEAD~1", "HEAD", *args, cwd=repo)
+
+
+def test_diff_tree_skips_identical_subtrees(repo, monkeypatch):
+    import git_scratch.utils.tree_diff as tree_diff
+
+    old = git("rev-parse", "HEAD~1^{tree}", cwd=repo).strip()
+    new = git("rev-parse", "HEAD^{tree}", cwd=repo).strip()
+    read = []
+    original = tree_diff.read_object
+    monkeypatch.setattr(tree_diff, "read_object", lambda oid: read.append(oid) or original(oid))
+
+    changes = diff_trees(old, new)
+    # Lazy: nothing is read before the first record is asked for
+    assert read == []
+    assert [c["path"] for c in changes] == ["a/b/x", "a/link", "f", "f/z", "mode.sh"]
+    # The roots, a, a/b and the new f: none of the 20 unchanged directories
+    assert len(read) == 2 + 2 + 2 + 1
+
+    # Mode changes, and more than two trees
+    assert next(diff_trees(old, new, pathspecs=["mode.sh"]))["status"] == "M"
+    walked = dict(walk_trees([old, new, old], pathspecs=["a/b"]))
+    assert len(walked["a/b/x"]) == 3 and walked["a/b/x"][0] == walked["a/b/x"][2]
+
+    # Type changes: a regular file replaced by a symlink at the same path
+    (repo / "a" / "y").unlink()
+    (repo / "a" / "y").symlink_to("b/x")
+    git("add", "-A", cwd=repo)
+    git("commit", "-qm", "third", cwd=repo)
+    newer = git("rev-parse", "HEAD^{tree}", cwd=repo).strip()
+    change = next(diff_trees(new, newer, pathspecs=["a/y"]))
+    assert (change["status"], change["old_mode"], change["new_mode"]) == ("T", "100644", "120000")
+
+
+def test_diff_tree_unknown_revision(repo):
+    result = runner.invoke(app, ["diff-tree", "HEAD", "nope"])
+    assert result.exit_code == 1
+    assert "nope" in result.stdout
@@ -0,0 +1,121 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+import pytest
+from typer.testing import CliRunner
+from git_scratch.main import app
+from git_scratch.utils.fsmonitor import FSMonitorDaemon, fsmonitor_request
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".git").mkdir()
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.txt").write_text("a")
+    return tmp_path
+
+
+def test_daemon_reports_paths_changed_since_token(repo):
+    daemon = FSMonitorDaemon()
+    try:
+        # Unknown token: the client has to scan
+        first = daemon.query("")
+        assert first["paths"] is None
+
+        Path("src/a.txt").write_text("changed")
+        Path("new/deep").mkdir(parents=True)
+        Path("new/deep/n.txt").write_text("n")
+        Path(".git/index").write_text("not reported")
+        second = daemon.query(first["token"])
+        assert set(second["paths"]) >= {"src/a.txt", "new", "new/deep", "new/deep/n.txt"}
+        assert not any(p.startswith(".git") for p in second["paths"])
+
+        # Files in the new directories are watched too
+        Path("new/deep/n.txt").write_text("again")
+        assert daemon.query(second["token"])["paths"] == ["new/deep/n.txt"]
+
+        # Nothing changed: same token, no path
+        third = daemon.query(daemon.token)
+        assert third == {"token": daemon.token, "paths": []}
+
+        # Lost events: tokens from before the overflow must scan
+        daemon._overflow()
+        assert daemon.query(second["token"])["paths"] is None
+        assert daemon.query(daemon.token)["paths"] == []
+    finally:
+        daemon.inotify.close()
+
+
+def test_status_and_add_use_fsmonitor(repo, monkeypatch):
+    import git_scratch.utils.untracked_cache as cache_module
+
+    Path(".git/config").write_text("[pit]\n\tfsmonitor = true\n")
+    runner = CliRunner()
+    assert runner.invoke(app, ["add", "src"]).exit_code == 0
+
+    daemon = FSMonitorDaemon()
+    thread = threading.Thread(target=daemon.serve)
+    thread.start()
+    try:
+        for _ in range(100):
+            if fsmonitor_request("ping"):
+                break
+            time.sleep(0.05)
+        assert fsmonitor_request("ping"), "the daemon did not answer"
+        # First run: full scan, then the token is saved
+        assert "added:   src/a.txt" in runner.invoke(app, ["status"]).stdout
+
+        scanned, stats = [], []
+        real_scandir, real_stat = os.scandir, os.stat
+        monkeypatch.setattr(cache_module.os, "scandir", lambda p: scanned.append(p) or real_scandir(p))
+        def counting_stat(p, *args, **kwargs):
+            if ".git" not in str(p):
+                stats.append(p)
+            return real_stat(p, *args, **kwargs)
+        monkeypatch.setattr(os, "stat", counting_stat)
+        result = runner.invoke(app, ["status"])
+        assert "added:   src/a.txt" in result.stdout
+        assert scanned == [] and stats == []
+
+        Path("src/a.txt").write_text("changed")
+        Path("src/b.txt").write_text("b")
+        result = runner.invoke(app, ["status"])
+        assert "modified:   src/a.txt" in result.stdout
+        assert "src/b.txt" in result.stdout
+        # Only the reported paths and their directory are looked at
+        assert scanned == ["src"] and set(stats) == {"src", "src/a.txt"}
+
+        # The modified file stays modified while nothing touches it
+        assert "modified:   src/a.txt" in runner.invoke(app, ["status"]).stdout
+
+        result = runner.invoke(app, ["add", "src"])
+        assert "src/a.txt added" in result.stdout
+        assert "src/b.txt added" in result.stdout
+    finally:
+        fsmonitor_request("quit")
+        thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert not os.path.exists(".git/fsmonitor.sock")
+
+
+def test_fsmonitor_without_unix_sockets_falls_back_to_scanning(repo, monkeypatch):
+    import socket
+
+    # As on Windows: no daemon can be reached, nothing crashes
+    monkeypatch.delattr(socket, "AF_UNIX")
+    assert fsmonitor_request("ping") is None
+    Path(".git/config").write_text("[pit]\n\tfsmonitor = true\n")
+    runner = CliRunner()
+    assert runner.invoke(app, ["add", "src"]).exit_code == 0
+    result = runner.invoke(app, ["status"])
+    assert result.exit_code == 0, result.output
+    assert "added:   src/a.txt" in result.stdout
+    result = runner.invoke(app, ["fsmonitor", "status"])
+    assert result.exit_code == 1
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+    assert "not running" in result.stdout
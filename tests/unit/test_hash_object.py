@@ -56,3 +56,26 @@ def test_hash_object_matches_git_and_writes_blob(tmp_path):
     finally:
         os.chdir(current_dir)  # On revient dans le dossier original à la fin
 
+
+def test_hash_object_streams_large_file(tmp_path, monkeypatch):
+    # Plus grand que plusieurs chunks de lecture
+    file = tmp_path / "big.bin"
+    file.write_bytes(os.urandom(300_000) * 3)
+
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    hash_git = subprocess.run(
+        ["git", "hash-object", str(file)],
+        cwd=tmp_path, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+
+    monkeypatch.chdir(tmp_path)
+    result = runner.invoke(app, ["hash-object", "-w", file.name])
+    assert result.exit_code == 0
+    assert result.stdout.strip() == hash_git
+
+    # L'objet écrit est lisible par Git et aucun fichier temporaire ne reste
+    git_content = subprocess.run(
+        ["git", "cat-file", "blob", hash_git], cwd=tmp_path, capture_output=True, check=True
+    ).stdout
+    assert git_content == file.read_bytes()
+    assert not list((tmp_path / ".git" / "objects").glob("tmp_obj_*"))
@@ -62,3 +62,124 @@ def test_pit_log_matches_git_log(tmp_path):
 
     # 4. Vérifie que les deux sorties sont identiques
     assert pit_output == git_output
+
+
+def init_merge_repo(tmp_path: Path):
+    """
+    main: c0 - c1 - c3 - merge, side: c1 - c2 (merged), with one day between
+    commits so that the date order is well defined.
+    """
+    os.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q", "-b", "main"], check=True)
+
+    def commit(message, day):
+        date = f"2024-01-{day:02d}T12:00:00+0200"
+        env = {**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+        subprocess.run(
+            ["git", "-c", "user.name=Test User", "-c", "user.email=test@example.com",
+             "commit", "-q", "--allow-empty", "-m", message], check=True, env=env)
+
+    commit("c0", 1)
+    commit("c1", 2)
+    subprocess.run(["git", "checkout", "-q", "-b", "side"], check=True)
+    commit("c2", 3)
+    subprocess.run(["git", "checkout", "-q", "main"], check=True)
+    commit("c3\n\nWith a body.", 4)
+    env = {**os.environ, "GIT_AUTHOR_DATE": "2024-01-05T12:00:00+0200", "GIT_COMMITTER_DATE": "2024-01-05T12:00:00+0200"}
+    subprocess.run(["git", "-c", "user.name=Test User", "-c", "user.email=test@example.com",
+                    "merge", "-q", "--no-ff", "--no-edit", "side"], check=True, env=env)
+    subprocess.run(["git", "checkout", "-q", "side"], check=True)
+    commit("c4", 6)
+    subprocess.run(["git", "checkout", "-q", "main"], check=True)
+
+
+def test_pit_log_walks_merges_and_filters_like_git(tmp_path):
+    init_merge_repo(tmp_path)
+
+    for args in ([], ["--oneline"], ["-n", "2"], ["--all", "--oneline"], ["side", "^main", "--oneline"],
+                 ["main..side", "--oneline"], ["--oneline", "--since=2024-01-03"],
+                 ["--oneline", "--until=2024-01-03T23:00:00+0200"], ["--all", "-n", "3", "--oneline"]):
+        git_output = subprocess.run(["git", "log", "--no-decorate", "--no-color", *args],
+                                    capture_output=True, text=True, check=True).stdout
+        result = runner.invoke(app, ["log", *args])
+        assert result.exit_code == 0, result.output
+        assert result.stdout == git_output, args
+
+
+def test_pit_log_stops_walking_early(tmp_path, monkeypatch):
+    import git_scratch.utils.rev_walk as rev_walk
+
+    init_merge_repo(tmp_path)
+    read = []
+    original = rev_walk.read_commit_info
+    monkeypatch.setattr(rev_walk, "read_commit_info", lambda oid: read.append(oid) or original(oid))
+    result = runner.invoke(app, ["log", "-n", "1", "--oneline"])
+    assert "Merge branch 'side'" in result.stdout
+    # The merge and its two parents, nothing further back
+    assert len(read) == 3
+
+    result = runner.invoke(app, ["log", "nope"])
+    assert result.exit_code == 1
+    assert "unknown revision 'nope'" in result.stdout
+
+
+def init_path_repo(tmp_path: Path):
+    """
+    Commits touching "src/" or "docs/", with a merge that takes "src/"
+    from its second parent and another that leaves it alone.
+    """
+    os.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q", "-b", "main"], check=True)
+    day = iter(range(1, 28))
+
+    def commit(path, message):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path / path, "a") as f:
+            f.write(message + "\n")
+        date = f"2024-02-{next(day):02d}T12:00:00+0000"
+        env = {**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+        subprocess.run(["git", "add", "-A"], check=True)
+        subprocess.run(["git", "-c", "user.name=Test User", "-c", "user.email=test@example.com",
+                        "commit", "-q", "-m", message], check=True, env=env)
+
+    def merge(branch):
+        date = f"2024-02-{next(day):02d}T12:00:00+0000"
+        env = {**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+        subprocess.run(["git", "-c", "user.name=Test User", "-c", "user.email=test@example.com",
+                        "merge", "-q", "--no-ff", "--no-edit", branch], check=True, env=env)
+
+    commit("docs/readme", "d0")
+    commit("src/lib/a.py", "s0")
+    subprocess.run(["git", "checkout", "-q", "-b", "feature"], check=True)
+    commit("src/lib/b.py", "s1")
+    commit("docs/guide", "d1")
+    subprocess.run(["git", "checkout", "-q", "main"], check=True)
+    commit("docs/readme", "d2")
+    merge("feature")
+    subprocess.run(["git", "checkout", "-q", "-b", "docs-only", "HEAD~1"], check=True)
+    commit("docs/other", "d3")
+    subprocess.run(["git", "checkout", "-q", "main"], check=True)
+    commit("src/main.py", "s2")
+    merge("docs-only")
+    commit("docs/readme", "d4")
+
+
+def test_pit_log_limits_history_to_paths_like_git(tmp_path):
+    init_path_repo(tmp_path)
+
+    cases = (["--", "src"], ["--", "src/lib"], ["--", "docs"], ["--", "src/lib/b.py"], ["--", "nothing"],
+             ["--oneline", "src"], ["HEAD~2", "--", "src"], ["feature..main", "--", "docs"],
+             ["--all", "--", "docs/other"], ["--", "src/main.py", "docs/guide"])
+    for with_filters in (False, True):
+        if with_filters:
+            assert runner.invoke(app, ["commit-graph", "write", "--changed-paths"]).exit_code == 0
+        for args in cases:
+            git_output = subprocess.run(["git", "log", "--no-decorate", "--no-color", *args],
+                                        capture_output=True, text=True, check=True).stdout
+            result = runner.invoke(app, ["log", *args])
+            assert result.exit_code == 0, result.output
+            assert result.stdout == git_output, (with_filters, args)
+
+    result = runner.invoke(app, ["log", "src", "nope"])
+    assert result.exit_code == 1
+    assert "ambiguous argument 'nope'" in result.stdout
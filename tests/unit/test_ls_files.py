@@ -25,3 +25,32 @@ def test_ls_files(monkeypatch, tmp_path):
     assert "file1.txt" in result.output
     assert "src/main.py" in result.output
 
+
+
+def test_binary_index_is_shared_with_git(monkeypatch, tmp_path):
+    import subprocess
+
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    (tmp_path / "b.txt").write_text("b\n")
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "a.txt").write_text("a\n")
+    monkeypatch.chdir(tmp_path)
+
+    # Written by pit, read by git
+    assert runner.invoke(app, ["add", "b.txt"]).exit_code == 0
+    assert runner.invoke(app, ["add", "dir"]).exit_code == 0
+    staged = subprocess.check_output(["git", "ls-files", "-s"], cwd=tmp_path).decode()
+    expected = subprocess.check_output(["git", "hash-object", "dir/a.txt", "b.txt"], cwd=tmp_path).decode().split()
+    assert staged.splitlines() == [
+        f"100644 {expected[1]} 0\tb.txt",
+        f"100644 {expected[0]} 0\tdir/a.txt",
+    ]
+
+    # Written by git (version 4, with a cache-tree extension), read by pit
+    (tmp_path / "c.txt").write_text("c\n")
+    subprocess.run(["git", "add", "c.txt"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "update-index", "--index-version", "4"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "write-tree"], cwd=tmp_path, check=True, capture_output=True)
+    result = runner.invoke(app, ["ls-files"])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == ["b.txt", "c.txt", "dir/a.txt"]
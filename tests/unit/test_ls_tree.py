@@ -55,3 +55,31 @@ def test_ls_tree_matches_git(tmp_path):
     # Affiche les deux résultats en cas d’échec
     assert result.exit_code == 0, f"pit command failed: {result.output}"
     assert pit_output == git_output, f"\nExpected:\n{git_output}\n\nGot:\n{pit_output}"
+
+
+def test_ls_tree_recursive_and_paths_match_git(tmp_path, monkeypatch):
+    import git_scratch.utils.tree_walker as tree_walker
+
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "init", "-q"], check=True)
+    for rel in ["a/b/x", "a/y", "f/z", "top.txt", "other/deep/file"]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel)
+    subprocess.run(["git", "add", "-A"], check=True)
+    tree_oid = subprocess.check_output(["git", "write-tree"]).decode().strip()
+
+    for args in (["-r"], ["-t", "-r"], ["a/"], ["a/b/x", "f"], ["-t", "a/b/x"],
+                 ["-r", "--name-only"], ["-r", "-z", "--", "a"]):
+        git_output = subprocess.check_output(["git", "ls-tree", tree_oid, *args]).decode()
+        result = runner.invoke(app, ["ls-tree", tree_oid, *args])
+        assert result.exit_code == 0, result.output
+        assert result.stdout == git_output, args
+
+    # Only the trees on the way to the requested path are read
+    read = []
+    original = tree_walker.read_object
+    monkeypatch.setattr(tree_walker, "read_object", lambda oid: read.append(oid) or original(oid))
+    result = runner.invoke(app, ["ls-tree", "-r", tree_oid, "a/b"])
+    assert result.stdout.endswith("\ta/b/x\n")
+    assert len(read) == 2  # a and a/b
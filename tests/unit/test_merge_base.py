@@ -0,0 +1,89 @@
+import os
+import subprocess
+import pytest
+from typer.testing import CliRunner
+from git_scratch.main import app
+
+runner = CliRunner()
+
+
+def git(*args):
+    return subprocess.run(["git", *args], capture_output=True, text=True)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """
+    A long main line, two branches x and y off it, and a criss-cross
+    merge between them (p and q have two merge bases).
+    """
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q", "-b", "main")
+    git("config", "user.name", "Test")
+    git("config", "user.email", "test@example.com")
+    dates = iter(range(1, 100))
+
+    def env():
+        date = f"@{1700000000 + 60 * next(dates)} +0000"
+        return {**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+
+    def commit(message):
+        subprocess.run(["git", "commit", "-q", "--allow-empty", "-m", message], check=True, env=env())
+
+    def merge(branch):
+        subprocess.run(["git", "merge", "-q", "--no-ff", "--no-edit", branch], check=True, env=env())
+
+    for i in range(20):
+        commit(f"base {i}")
+    git("branch", "x")
+    git("branch", "y")
+    commit("main")
+    git("checkout", "-q", "x")
+    commit("x1")
+    commit("x2")
+    git("checkout", "-q", "y")
+    commit("y1")
+    git("checkout", "-q", "-b", "p", "x")
+    merge("y")
+    git("checkout", "-q", "-b", "q", "y")
+    merge("x")
+    commit("q1")
+    git("checkout", "-q", "main")
+    return tmp_path
+
+
+CASES = [
+    ["merge-base", "main", "x"], ["merge-base", "--all", "p", "q"], ["merge-base", "x", "y", "main"],
+    ["merge-base", "--is-ancestor", "x", "p"], ["merge-base", "--is-ancestor", "p", "x"],
+    ["rev-list", "--left-right", "--count", "p...q"], ["rev-list", "--left-right", "--count", "main...q"],
+    ["rev-list", "--left-right", "main...p"], ["rev-list", "--count", "x...y"], ["rev-list", "main..q"],
+]
+
+
+@pytest.mark.parametrize("with_graph", [False, True])
+def test_merge_base_and_rev_list_match_git(repo, with_graph):
+    if with_graph:
+        assert runner.invoke(app, ["commit-graph", "write"]).exit_code == 0
+    for args in CASES:
+        expected = git(*args)
+        result = runner.invoke(app, args)
+        assert result.exit_code == expected.returncode, args
+        assert result.stdout == expected.stdout, args
+
+
+def test_ahead_behind_stops_at_the_fork_point(repo, monkeypatch):
+    import git_scratch.utils.merge_base as merge_base_module
+    from git_scratch.utils.merge_base import ahead_behind, merge_bases
+
+    assert runner.invoke(app, ["commit-graph", "write"]).exit_code == 0
+    read = []
+    original = merge_base_module.read_commit_info
+    monkeypatch.setattr(merge_base_module, "read_commit_info", lambda oid: read.append(oid) or original(oid))
+
+    main, q = git("rev-parse", "main", "q").stdout.split()
+    assert ahead_behind(main, q) == (1, 5)
+    # Both sides, the fork point and its parent: the 19 commits below are never read
+    assert len(read) <= 9
+    read.clear()
+    assert merge_bases(main, [q]) == [git("rev-parse", "main~1").stdout.strip()]
+    assert len(read) <= 9
@@ -0,0 +1,73 @@
+import subprocess
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from git_scratch.main import app
+from git_scratch.utils.pack import get_packs
+from git_scratch.utils.read_object import read_object
+
+runner = CliRunner()
+
+
+def init_multi_pack_repo(tmp_path: Path) -> Path:
+    """
+    Create a Git repository with one incremental pack per commit.
+    """
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    for i in range(1, 4):
+        (tmp_path / f"file{i}.txt").write_text(f"content {i}\n" * (i * 50))
+        subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+        subprocess.run(
+            ["git", "-c", "user.name=T", "-c", "user.email=t@example.com",
+             "commit", "-m", f"commit {i}"],
+            cwd=tmp_path, check=True
+        )
+        subprocess.run(["git", "repack", "-q"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "prune-packed"], cwd=tmp_path, check=True)
+    return tmp_path
+
+
+def test_multi_pack_index_write_is_valid_for_git(tmp_path, monkeypatch):
+    repo = init_multi_pack_repo(tmp_path)
+    monkeypatch.chdir(repo)
+
+    result = runner.invoke(app, ["multi-pack-index", "write"])
+    assert result.exit_code == 0, result.output
+    assert (repo / ".git" / "objects" / "pack" / "multi-pack-index").exists()
+
+    subprocess.run(["git", "multi-pack-index", "verify"], cwd=repo, check=True)
+
+
+def test_lookups_go_through_multi_pack_index(tmp_path, monkeypatch):
+    repo = init_multi_pack_repo(tmp_path)
+    monkeypatch.chdir(repo)
+    runner.invoke(app, ["multi-pack-index", "write"])
+
+    packs = get_packs()
+    assert packs.midx is not None
+    assert len(packs.packs) == 3
+    assert packs.uncovered == []
+
+    oids = subprocess.check_output(
+        ["git", "cat-file", "--batch-all-objects", "--batch-check=%(objectname) %(objecttype)"],
+        cwd=repo
+    ).decode().splitlines()
+    for line in oids:
+        oid, expected_type = line.split()
+        obj_type, _ = read_object(oid)
+        assert obj_type == expected_type
+
+    # Resolved through the multi-pack-index alone: no .idx had to be mapped
+    assert all(pack._index is None for pack in packs.packs.values())
+
+
+def test_midx_written_by_git_is_readable(tmp_path, monkeypatch):
+    repo = init_multi_pack_repo(tmp_path)
+    subprocess.run(["git", "multi-pack-index", "write"], cwd=repo, check=True)
+    monkeypatch.chdir(repo)
+
+    head = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo).decode().strip()
+    obj_type, content = read_object(head)
+    assert obj_type == "commit"
+    assert b"commit 3" in content
@@ -0,0 +1,49 @@
+import subprocess
+
+from git_scratch.utils.object_cache import ENTRY_OVERHEAD, ObjectCache, object_cache
+from git_scratch.utils.read_object import read_object
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache = ObjectCache(limit=4 * (900 + ENTRY_OVERHEAD))
+    for name in "abcd":
+        cache.put(name, ("blob", b"x" * 900))
+
+    assert cache.get("a") == ("blob", b"x" * 900)  # "a" becomes the most recent
+    cache.put("e", ("blob", b"y" * 900))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size <= cache.limit
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_objects_larger_than_quarter_budget_are_not_cached():
+    cache = ObjectCache(limit=1000)
+    cache.put("big", ("blob", b"z" * 600))
+    assert cache.get("big") is None
+    assert len(cache) == 0
+
+
+def test_read_object_uses_cache_and_config_limit(tmp_path, monkeypatch):
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    (tmp_path / "f.txt").write_text("cached content\n")
+    oid = subprocess.check_output(["git", "hash-object", "-w", "f.txt"], cwd=tmp_path).decode().strip()
+    subprocess.run(["git", "config", "pit.objectCacheLimit", "2m"], cwd=tmp_path, check=True)
+    monkeypatch.chdir(tmp_path)
+    object_cache.clear()
+
+    assert read_object(oid) == ("blob", b"cached content\n")
+    assert object_cache.limit == 2 * 1024 * 1024
+    misses = object_cache.misses
+
+    # A second read is served from memory even if the file disappears
+    obj_path = tmp_path / ".git" / "objects" / oid[:2] / oid[2:]
+    obj_path.chmod(0o644)
+    obj_path.unlink()
+    assert read_object(oid) == ("blob", b"cached content\n")
+    assert object_cache.misses == misses
+    assert object_cache.hits >= 1
@@ -0,0 +1,101 @@
+import subprocess
+
+import pytest
+from typer.testing import CliRunner
+
+from git_scratch.main import app
+from git_scratch.utils.object_store import (
+    LooseObjectStore,
+    MemoryObjectStore,
+    ObjectStore,
+    SQLiteObjectStore,
+    close_object_stores,
+    get_object_store,
+)
+from git_scratch.utils.read_object import read_object
+
+runner = CliRunner()
+
+
+@pytest.fixture(params=["loose", "sqlite", "memory"])
+def store(request, tmp_path):
+    if request.param == "loose":
+        store = LooseObjectStore(str(tmp_path / "objects"))
+    elif request.param == "sqlite":
+        store = SQLiteObjectStore(str(tmp_path / "objects.sqlite"))
+    else:
+        store = MemoryObjectStore()
+    yield store
+    store.close()
+
+
+def test_backends_share_the_same_interface(store, tmp_path):
+    oid = store.write("blob", b"hello\n")
+    assert oid == "ce013625030ba8dba906f756967f9e9ca394464a"
+    assert store.write("blob", b"hello\n") == oid
+    assert store.exists(oid)
+    assert store.read(oid) == ("blob", b"hello\n")
+    assert store.read_info(oid) == ("blob", 6)
+    assert set(store.iter_prefix("ce01")) == {oid}
+    assert set(store.iter_prefix("ffff")) == set()
+
+    missing = "0" * 40
+    assert not store.exists(missing)
+    with pytest.raises(FileNotFoundError):
+        store.read(missing)
+
+    big = tmp_path / "big.bin"
+    big.write_bytes(b"\x00\x01" * 100000)
+    file_oid = store.write_file(str(big))
+    expected = subprocess.check_output(["git", "hash-object", str(big)]).decode().strip()
+    assert file_oid == expected
+
+    oids = store.write_many([("blob", b"a"), ("tree", b""), ("blob", b"b")])
+    assert store.exists_many(oids + [missing]) == set(oids)
+    found = store.read_many(oids + [missing])
+    assert found[oids[1]] == ("tree", b"")
+    assert missing not in found
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class ReadOnly(ObjectStore):
+        def read(self, oid):
+            raise FileNotFoundError(oid)
+
+    with pytest.raises(TypeError):
+        ReadOnly()
+
+
+def test_sqlite_transaction_rolls_back_on_error(tmp_path):
+    store = SQLiteObjectStore(str(tmp_path / "objects.sqlite"))
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            oid = store.write("blob", b"lost\n")
+            raise RuntimeError("boom")
+    assert not store.exists(oid)
+    store.close()
+
+
+def test_sqlite_backend_selected_from_config(tmp_path, monkeypatch):
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "config", "pit.objectStore", "sqlite"], cwd=tmp_path, check=True)
+    (tmp_path / "a.txt").write_text("stored in sqlite\n")
+    monkeypatch.chdir(tmp_path)
+
+    try:
+        assert isinstance(get_object_store(), SQLiteObjectStore)
+        result = runner.invoke(app, ["add", "a.txt"])
+        assert result.exit_code == 0, result.output
+        tree = runner.invoke(app, ["write-tree"])
+        assert tree.exit_code == 0, tree.output
+
+        objects_dir = tmp_path / ".git" / "objects"
+        assert [p for p in objects_dir.iterdir() if len(p.name) == 2] == []
+        assert (tmp_path / ".git" / "objects.sqlite").exists()
+
+        tree_oid = tree.stdout.strip()
+        assert read_object(tree_oid)[0] == "tree"
+        result = runner.invoke(app, ["rev-parse", tree_oid[:7]])
+        assert result.stdout.strip() == tree_oid
+    finally:
+        close_object_stores()
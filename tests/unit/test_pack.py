@@ -0,0 +1,102 @@
+import random
+import subprocess
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from git_scratch.main import app
+from git_scratch.utils.read_object import read_object
+
+runner = CliRunner()
+
+
+def init_packed_repo(tmp_path: Path, repack_args: list[str]) -> Path:
+    """
+    Create a Git repository whose objects only live in a packfile,
+    with several versions of the same file so that deltas are produced.
+    """
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    lines = [f"line {i} of a file long enough to be deltified\n" for i in range(200)]
+    for version in range(5):
+        lines[version * 10] = f"changed in version {version}\n"
+        (tmp_path / "file.txt").write_text("".join(lines))
+        subprocess.run(["git", "add", "file.txt"], cwd=tmp_path, check=True)
+        subprocess.run(
+            ["git", "-c", "user.name=T", "-c", "user.email=t@example.com",
+             "commit", "-m", f"version {version}"],
+            cwd=tmp_path, check=True
+        )
+    subprocess.run(["git", *repack_args], cwd=tmp_path, check=True)
+    subprocess.run(["git", "prune-packed"], cwd=tmp_path, check=True)
+    return tmp_path
+
+
+def all_objects(repo: Path) -> list[str]:
+    output = subprocess.check_output(
+        ["git", "cat-file", "--batch-all-objects", "--batch-check=%(objectname)"],
+        cwd=repo
+    ).decode()
+    return output.split()
+
+
+@pytest.mark.parametrize("repack_args", [
+    ["repack", "-adf"],
+    ["-c", "repack.useDeltaBaseOffset=false", "repack", "-adf"],
+])
+def test_read_object_from_pack_matches_git(tmp_path, monkeypatch, repack_args):
+    repo = init_packed_repo(tmp_path, repack_args)
+    monkeypatch.chdir(repo)
+
+    loose = [p for p in (repo / ".git" / "objects").iterdir() if len(p.name) == 2]
+    assert not loose, "All objects should be packed"
+
+    for oid in all_objects(repo):
+        expected_type = subprocess.check_output(["git", "cat-file", "-t", oid], cwd=repo).decode().strip()
+        expected_content = subprocess.check_output(["git", "cat-file", expected_type, oid], cwd=repo)
+        obj_type, content = read_object(oid)
+        assert obj_type == expected_type
+        assert content == expected_content
+
+
+def test_cat_file_and_rev_parse_on_packed_objects(tmp_path, monkeypatch):
+    repo = init_packed_repo(tmp_path, ["gc", "--quiet"])
+    monkeypatch.chdir(repo)
+
+    head = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo).decode().strip()
+
+    result = runner.invoke(app, ["rev-parse", head])
+    assert result.exit_code == 0, result.output
+    assert result.stdout.strip() == head
+
+    result = runner.invoke(app, ["cat-file", "-t", head])
+    assert result.exit_code == 0, result.output
+    assert result.stdout.strip() == "commit"
+
+
+def test_batch_check_on_aggressive_gc_pack(tmp_path, monkeypatch):
+    # Varied insertions make git deflate deltas with dynamic Huffman
+    # tables longer than their first few output bytes
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    rng = random.Random(1)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_(){}[]:;.,=+-*/"
+    words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(2, 12))) for _ in range(400)]
+    lines = [" ".join(rng.choices(words, k=8)) + "\n" for _ in range(300)]
+    for version in range(8):
+        for _ in range(20):
+            lines[rng.randrange(len(lines))] = " ".join(rng.choices(words, k=8)) + "\n"
+        (tmp_path / "file.txt").write_text("".join(lines))
+        subprocess.run(["git", "add", "file.txt"], cwd=tmp_path, check=True)
+        subprocess.run(
+            ["git", "-c", "user.name=T", "-c", "user.email=t@example.com",
+             "commit", "-qm", f"version {version}"],
+            cwd=tmp_path, check=True
+        )
+    subprocess.run(["git", "gc", "-q", "--aggressive"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "prune-packed"], cwd=tmp_path, check=True)
+    monkeypatch.chdir(tmp_path)
+
+    result = runner.invoke(app, ["cat-file", "--batch-all-objects", "--batch-check"])
+    assert result.exit_code == 0, result.output
+    expected = subprocess.check_output(["git", "cat-file", "--batch-all-objects", "--batch-check"], cwd=tmp_path)
+    assert result.stdout == expected.decode()
@@ -0,0 +1,98 @@
+import subprocess
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from git_scratch.main import app
+from git_scratch.utils.delta import apply_delta, create_delta
+
+runner = CliRunner()
+
+
+def init_test_repo(tmp_path: Path) -> Path:
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    (tmp_path / "src").mkdir()
+    for i in range(1, 5):
+        (tmp_path / "data.txt").write_text("".join(f"row {n}\n" for n in range(i * 150)))
+        (tmp_path / "src" / "main.py").write_text(f"print('version {i}')\n" * 40)
+        subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+        subprocess.run(
+            ["git", "-c", "user.name=T", "-c", "user.email=t@example.com",
+             "commit", "-m", f"commit {i}"],
+            cwd=tmp_path, check=True
+        )
+    return tmp_path
+
+
+def loose_objects(repo: Path) -> list[Path]:
+    objects = repo / ".git" / "objects"
+    return [p for d in objects.iterdir() if len(d.name) == 2 for p in d.iterdir()]
+
+
+def test_create_delta_roundtrip():
+    base = b"".join(b"line %d\n" % i for i in range(500))
+    target = base[:1000] + b"inserted text\n" + base[1200:] + b"appended\n"
+    delta = create_delta(base, target)
+    assert len(delta) < len(target) // 10
+    assert apply_delta(base, delta) == target
+
+
+def test_repack_writes_valid_pack_and_drops_loose_objects(tmp_path, monkeypatch):
+    repo = init_test_repo(tmp_path)
+    expected_count = len(loose_objects(repo))
+    monkeypatch.chdir(repo)
+
+    result = runner.invoke(app, ["repack", "-d"])
+    assert result.exit_code == 0, result.output
+
+    assert loose_objects(repo) == []
+    packs = list((repo / ".git" / "objects" / "pack").glob("pack-*.idx"))
+    assert len(packs) == 1
+
+    verify = subprocess.run(
+        ["git", "verify-pack", "-v", str(packs[0])],
+        cwd=repo, capture_output=True, text=True, check=True
+    ).stdout
+    assert f"non delta: {expected_count}" not in verify, "No object was deltified"
+    subprocess.run(["git", "fsck", "--full"], cwd=repo, check=True)
+
+    head = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo).decode().strip()
+    result = runner.invoke(app, ["cat-file", "-p", head])
+    assert result.exit_code == 0, result.output
+    assert "commit 4" in result.stdout
+
+
+def test_gc_replaces_existing_packs(tmp_path, monkeypatch):
+    repo = init_test_repo(tmp_path)
+    subprocess.run(["git", "repack", "-d"], cwd=repo, check=True)
+    (repo / "new.txt").write_text("after first pack\n")
+    subprocess.run(["git", "add", "new.txt"], cwd=repo, check=True)
+    subprocess.run(
+        ["git", "-c", "user.name=T", "-c", "user.email=t@example.com", "commit", "-m", "more"],
+        cwd=repo, check=True
+    )
+    monkeypatch.chdir(repo)
+
+    result = runner.invoke(app, ["gc"])
+    assert result.exit_code == 0, result.output
+
+    assert loose_objects(repo) == []
+    assert len(list((repo / ".git" / "objects" / "pack").glob("pack-*.pack"))) == 1
+    subprocess.run(["git", "fsck", "--full"], cwd=repo, check=True)
+
+    blob = subprocess.check_output(["git", "rev-parse", "HEAD:new.txt"], cwd=repo).decode().strip()
+    result = runner.invoke(app, ["cat-file", "-p", blob])
+    assert result.stdout == "after first pack\n\n"
+
+
+def test_repack_warns_on_invalid_write_bitmaps(tmp_path, monkeypatch):
+    repo = init_test_repo(tmp_path)
+    with open(repo / ".git" / "config", "a") as f:
+        f.write("[pit]\n\twriteBitmaps = maybe\n")
+    monkeypatch.chdir(repo)
+
+    result = runner.invoke(app, ["repack", "-d"])
+    assert result.exit_code == 0, result.output
+    assert "[warn]" in result.output
+    assert not list((repo / ".git" / "objects" / "pack").glob("*.bitmap"))
+    subprocess.run(["git", "fsck", "--full"], cwd=repo, check=True)
@@ -0,0 +1,99 @@
+import os
+import subprocess
+import pytest
+from typer.testing import CliRunner
+from git_scratch.main import app
+from git_scratch.utils.bitmap import ewah_decode, ewah_encode
+
+runner = CliRunner()
+
+
+def git(*args):
+    return subprocess.check_output(["git", *args]).decode()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """Two branches with shared files, a merge and an annotated tag."""
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q", "-b", "main")
+    git("config", "user.name", "Test")
+    git("config", "user.email", "test@example.com")
+    (tmp_path / "src").mkdir()
+    for i in range(4):
+        (tmp_path / "src" / f"m{i}.py").write_text(f"main {i}\n")
+        (tmp_path / "README").write_text(f"v{i}\n")
+        git("add", "-A")
+        git("commit", "-qm", f"main {i}")
+    git("tag", "-a", "v1", "-m", "release", "HEAD~1")
+    git("checkout", "-q", "-b", "side", "HEAD~2")
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "guide").write_text("guide\n")
+    git("add", "-A")
+    git("commit", "-qm", "side")
+    git("checkout", "-q", "main")
+    git("merge", "-q", "--no-edit", "side")
+    return tmp_path
+
+
+CASES = [["HEAD"], ["--all"], ["HEAD~2..HEAD"], ["side..main"], ["v1"], ["main...side"], ["^side", "main"]]
+
+
+def test_rev_list_objects_match_git(repo):
+    for args in CASES:
+        for options in ([], ["--objects"], ["--count"], ["--objects", "--count"]):
+            result = runner.invoke(app, ["rev-list", *options, *args])
+            assert result.exit_code == 0, result.output
+            assert result.stdout == git("rev-list", *options, *args), (options, args)
+
+
+def test_gc_writes_bitmaps_git_can_use(repo):
+    result = runner.invoke(app, ["gc"])
+    assert result.exit_code == 0, result.output
+    bitmaps = [name for name in os.listdir(".git/objects/pack") if name.endswith(".bitmap")]
+    assert len(bitmaps) == 1
+    subprocess.run(["git", "rev-list", "--test-bitmap", "main"], check=True, capture_output=True)
+
+    # Commits made after the pack are numbered past its objects
+    (repo / "later").write_text("later\n")
+    git("add", "later")
+    git("commit", "-qm", "later")
+    for args in CASES:
+        for options in (["--count"], ["--objects", "--count"]):
+            result = runner.invoke(app, ["rev-list", *options, *args])
+            assert result.stdout == git("rev-list", "--use-bitmap-index", *options, *args), (options, args)
+        result = runner.invoke(app, ["rev-list", "--objects", "--use-bitmap-index", *args])
+        expected = git("rev-list", "--objects", "--use-bitmap-index", *args)
+        assert sorted(result.stdout.split()) == sorted(line[:40] for line in expected.splitlines()), args
+
+
+def test_gc_goes_on_when_the_bitmap_cannot_be_written(repo, monkeypatch):
+    from git_scratch.utils.pack import Pack
+
+    def unreadable(self, offset):
+        raise ValueError("Pack entry size mismatch.")
+
+    monkeypatch.setattr(Pack, "read_info", unreadable)
+    result = runner.invoke(app, ["gc"])
+    assert result.exit_code == 0, result.output
+    assert "no bitmap written" in result.output
+    assert not [name for name in os.listdir(".git/objects/pack") if name.endswith(".bitmap")]
+    # The commit-graph is still refreshed
+    subprocess.run(["git", "commit-graph", "verify"], check=True, capture_output=True)
+    assert os.path.exists(".git/objects/info/commit-graph")
+def test_bitmap_counts_do_not_read_trees(repo, monkeypatch):
+    import git_scratch.utils.bitmap as bitmap_module
+
+    assert runner.invoke(app, ["gc"]).exit_code == 0
+    read = []
+    original = bitmap_module.read_object
+    monkeypatch.setattr(bitmap_module, "read_object", lambda oid: read.append(oid) or original(oid))
+    result = runner.invoke(app, ["rev-list", "--objects", "--count", "main", "^side"])
+    assert result.stdout == git("rev-list", "--objects", "--count", "main", "^side")
+    assert read == []
+
+
+def test_ewah_round_trip():
+    for bits in (0, 1, (1 << 64) - 1, (1 << 300) | 0b1011, ((1 << 640) - 1) << 64 | 5):
+        data = ewah_encode(bits)
+        assert ewah_decode(data, 0) == (bits, len(data))
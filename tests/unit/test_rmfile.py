@@ -3,6 +3,7 @@ import json
 from pathlib import Path
 from typer.testing import CliRunner
 from git_scratch.main import app
+from git_scratch.utils.index_utils import load_index
 
 runner = CliRunner()
 
@@ -20,7 +21,7 @@ def test_rmfile_removes_file_and_index(tmp_path):
     index_data = [
         {
             "mode": "100644",
-            "oid": "fake_oid_for_test",
+            "oid": "ce013625030ba8dba906f756967f9e9ca394464a",
             "path": "test.txt"
         }
     ]
@@ -35,9 +36,9 @@ def test_rmfile_removes_file_and_index(tmp_path):
     # Vérifie que le fichier a bien été supprimé
     assert not file_path.exists()
 
-    # Vérifie que l'entrée a bien été retirée de l'index
-    updated_index = json.loads(index_file.read_text())
-    assert updated_index == []
+    # Vérifie que l'entrée a bien été retirée de l'index (migré vers .git/index)
+    assert load_index() == []
+    assert not index_file.exists()
 
     # Vérifie le message en sortie
     assert "removed from working directory" in result.output
@@ -0,0 +1,77 @@
+import os
+import subprocess
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from git_scratch.main import app
+from git_scratch.utils.index_utils import load_index
+
+runner = CliRunner()
+
+
+def init_repo(tmp_path: Path, count: int = 50) -> Path:
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    for i in range(count):
+        (tmp_path / "src").mkdir(exist_ok=True)
+        (tmp_path / "src" / f"f{i:02}.txt").write_text(f"file {i}\n")
+    return tmp_path
+
+
+def git_tree(repo: Path) -> str:
+    env = {**os.environ, "GIT_INDEX_FILE": str(repo / ".git" / "git-index")}
+    subprocess.run(["git", "add", "-A"], cwd=repo, env=env, check=True)
+    return subprocess.check_output(["git", "write-tree"], cwd=repo, env=env).decode().strip()
+
+
+def test_small_changes_go_to_the_journal(tmp_path, monkeypatch):
+    repo = init_repo(tmp_path)
+    monkeypatch.chdir(repo)
+    assert runner.invoke(app, ["add", "src"]).exit_code == 0
+    subprocess.run(["git", "config", "pit.splitIndex", "true"], cwd=repo, check=True)
+
+    index_file = repo / ".git" / "index"
+    journal = repo / ".git" / "index.journal"
+    base = index_file.read_bytes()
+
+    (repo / "src" / "f01.txt").write_text("changed\n")
+    assert runner.invoke(app, ["add", "src/f01.txt"]).exit_code == 0
+    assert runner.invoke(app, ["rm", "src/f02.txt"]).exit_code == 0
+    result = runner.invoke(app, ["write-tree"])
+    assert result.exit_code == 0, result.output
+
+    # The base index was not rewritten; readers see the merged view
+    assert index_file.read_bytes() == base
+    assert journal.exists()
+    entries = {e["path"]: e["oid"] for e in load_index()}
+    assert len(entries) == 49
+    assert entries["src/f01.txt"] == subprocess.check_output(
+        ["git", "hash-object", "src/f01.txt"], cwd=repo).decode().strip()
+    assert result.stdout.strip() == git_tree(repo)
+
+    # Past pit.splitIndexMaxPercentChange (20% of 49 entries), the journal is merged
+    for i in range(10, 25):
+        (repo / "src" / f"f{i:02}.txt").write_text(f"new {i}\n")
+    assert runner.invoke(app, ["add", "src"]).exit_code == 0
+    assert not journal.exists()
+    assert index_file.read_bytes() != base
+    assert [e["path"] for e in load_index()] == sorted(entries)
+    staged = subprocess.check_output(["git", "ls-files"], cwd=repo).decode().split()
+    assert staged == sorted(entries)
+
+
+def test_journal_of_a_rewritten_index_is_ignored(tmp_path, monkeypatch):
+    repo = init_repo(tmp_path, count=10)
+    monkeypatch.chdir(repo)
+    assert runner.invoke(app, ["add", "src"]).exit_code == 0
+    subprocess.run(["git", "config", "pit.splitIndex", "true"], cwd=repo, check=True)
+    subprocess.run(["git", "config", "pit.splitIndexMaxPercentChange", "100"], cwd=repo, check=True)
+
+    assert runner.invoke(app, ["rm", "src/f00.txt"]).exit_code == 0
+    assert len(load_index()) == 9
+
+    # Git rewrites .git/index without knowing about the journal
+    (repo / "extra.txt").write_text("extra\n")
+    subprocess.run(["git", "add", "extra.txt"], cwd=repo, check=True)
+    paths = [e["path"] for e in load_index()]
+    assert "src/f00.txt" in paths and "extra.txt" in paths
@@ -5,7 +5,7 @@ import pytest
 from typer.testing import CliRunner
 from git_scratch.main import app
 from git_scratch.commands.status import git_hash_object
-from git_scratch.utils.index_utils import get_index_path
+from git_scratch.utils.index_utils import save_index
 
 @pytest.fixture
 
@@ -35,9 +35,7 @@ def test_status_shows_modified_file(runner):
     tracked = Path("tracked.txt")
     tracked.write_text("version 1")
     oid = git_hash_object(str(tracked))
-    idx = get_index_path()
-    idx.parent.mkdir(parents=True, exist_ok=True)
-    idx.write_text(json.dumps([{"path": str(tracked), "oid": oid}]))
+    save_index([{"path": str(tracked), "oid": oid, "mode": "100644"}])
     # Modification du fichier
     tracked.write_text("version 2")
     result = runner.invoke(app, ["status"])
@@ -63,9 +61,7 @@ def test_status_multiple_changes(runner):
     tracked = Path("t1.txt")
     tracked.write_text("v1")
     oid = git_hash_object(str(tracked))
-    idx = get_index_path()
-    idx.parent.mkdir(parents=True, exist_ok=True)
-    idx.write_text(json.dumps([{"path": str(tracked), "oid": oid}]))
+    save_index([{"path": str(tracked), "oid": oid, "mode": "100644"}])
     tracked.write_text("v2")
     # Fichier non tracké
     untracked = Path("u1.txt")
@@ -75,3 +71,87 @@ def test_status_multiple_changes(runner):
     out = result.stdout.lower()
     assert "modified" in out and "t1.txt" in out
     assert "untracked" in out and "u1.txt" in out
+
+
+def test_status_skips_rehash_when_stat_matches(runner, monkeypatch):
+    import git_scratch.commands.status as status_module
+
+    tracked = Path("cached.txt")
+    tracked.write_text("same content")
+    # Old enough not to be racily clean once the index is written
+    os.utime(tracked, ns=(1_000_000_000, 1_000_000_000))
+    assert runner.invoke(app, ["add", "cached.txt"]).exit_code == 0
+
+    hashed = []
+    monkeypatch.setattr(status_module, "git_hash_object", lambda p: hashed.append(p) or git_hash_object(p))
+    result = runner.invoke(app, ["status"])
+    assert result.exit_code == 0
+    assert "cached.txt" in result.stdout
+    assert hashed == []
+
+    # Same size, different content and mtime: the stat data no longer matches
+    tracked.write_text("diff content")
+    result = runner.invoke(app, ["status"])
+    assert "modified:   cached.txt" in result.stdout
+    assert hashed == ["cached.txt"]
+
+
+def test_racily_clean_entries_are_rehashed(tmp_path):
+    from git_scratch.utils.index_utils import is_stat_clean, parse_index, serialize_index, stat_data
+
+    f = tmp_path / "racy.txt"
+    f.write_text("racy")
+    st = os.stat(f)
+    entry = {"path": "racy.txt", "oid": git_hash_object(str(f)), "mode": "100644", **stat_data(st)}
+
+    # Index written in the same tick as the file: stat data cannot be trusted
+    assert not is_stat_clean(entry, st, st.st_mtime_ns)
+    assert is_stat_clean(entry, st, st.st_mtime_ns + 1)
+
+    # Such entries are smudged on write, so a later index write cannot hide them
+    smudged = parse_index(serialize_index([entry], st.st_mtime_ns))[0]
+    assert smudged["size"] == 0
+    assert not is_stat_clean(smudged, st, st.st_mtime_ns + 10**9)
+    kept = parse_index(serialize_index([entry], st.st_mtime_ns + 1))[0]
+    assert kept["size"] == st.st_size
+
+
+def test_status_untracked_cache_skips_unchanged_dirs(runner, monkeypatch):
+    import git_scratch.utils.untracked_cache as cache_module
+
+    Path(".gitignore").write_text("build/\n")
+    for d in ("src", "docs", "build"):
+        Path(d).mkdir()
+        (Path(d) / "a.txt").write_text(d)
+        # Old enough not to be racily clean once the cache is written
+        os.utime(d, ns=(1_000_000_000, 1_000_000_000))
+    os.utime(".", ns=(1_000_000_000, 1_000_000_000))
+
+    scanned = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(cache_module.os, "scandir", lambda p: scanned.append(p) or real_scandir(p))
+
+    result = runner.invoke(app, ["status"])
+    assert "src/a.txt" in result.stdout and "docs/a.txt" in result.stdout
+    assert "build" not in result.stdout
+    # Ignored directories are never entered
+    assert sorted(scanned) == [".", "docs", "src"]
+
+    scanned.clear()
+    result = runner.invoke(app, ["status"])
+    assert "src/a.txt" in result.stdout
+    assert scanned == []
+
+    # A new file changes the mtime of its directory only
+    Path("src/b.txt").write_text("b")
+    scanned.clear()
+    result = runner.invoke(app, ["status"])
+    assert "src/b.txt" in result.stdout
+    assert scanned == ["src"]
+
+    # New ignore rules invalidate the whole cache
+    Path(".gitignore").write_text("build/\ndocs/\n")
+    scanned.clear()
+    result = runner.invoke(app, ["status"])
+    assert "docs/a.txt" not in result.stdout
+    assert sorted(scanned) == [".", "src"]
@@ -0,0 +1,76 @@
+import subprocess
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from git_scratch.main import app
+from git_scratch.utils.index_utils import load_index
+
+runner = CliRunner()
+
+
+def git(repo: Path, *args: str) -> str:
+    return subprocess.check_output(["git", *args], cwd=repo).decode()
+
+
+def init_repo(tmp_path: Path) -> Path:
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    for i in range(50):
+        (tmp_path / f"f{i:02}.txt").write_text(f"file {i}\n")
+    return tmp_path
+
+
+def test_update_index_stdin_stages_many_paths(tmp_path, monkeypatch):
+    repo = init_repo(tmp_path)
+    monkeypatch.chdir(repo)
+    names = "".join(f"f{i:02}.txt\n" for i in range(50))
+
+    # New paths need --add; the index is left untouched on error
+    result = runner.invoke(app, ["update-index", "--stdin"], input=names)
+    assert result.exit_code == 1
+    assert "missing --add" in result.output
+    assert not (repo / ".git" / "index").exists()
+
+    result = runner.invoke(app, ["update-index", "--add", "--stdin"], input=names)
+    assert result.exit_code == 0, result.output
+    assert result.output == ""
+
+    expected = git(repo, "hash-object", *[f"f{i:02}.txt" for i in range(50)]).split()
+    staged = git(repo, "ls-files", "-s").splitlines()
+    assert staged == [f"100644 {oid} 0\tf{i:02}.txt" for i, oid in enumerate(expected)]
+
+    # --remove drops paths deleted from the working tree
+    (repo / "f00.txt").unlink()
+    result = runner.invoke(app, ["update-index", "--remove", "-z", "--stdin"], input="f00.txt\0f01.txt\0")
+    assert result.exit_code == 0, result.output
+    assert len(load_index()) == 49
+
+
+def test_update_index_index_info(tmp_path, monkeypatch):
+    repo = init_repo(tmp_path)
+    git(repo, "add", ".")
+    git(repo, "-c", "user.name=T", "-c", "user.email=t@example.com", "commit", "-q", "-m", "init")
+    tree_listing = git(repo, "ls-tree", "-r", "HEAD")
+    (repo / ".git" / "index").unlink()
+    monkeypatch.chdir(repo)
+
+    result = runner.invoke(app, ["update-index", "--index-info"], input=tree_listing)
+    assert result.exit_code == 0, result.output
+    assert git(repo, "write-tree").strip() == git(repo, "rev-parse", "HEAD^{tree}").strip()
+
+    removal = "0 0000000000000000000000000000000000000000\tf10.txt\n"
+    result = runner.invoke(app, ["update-index", "--index-info"], input=removal)
+    assert result.exit_code == 0, result.output
+    assert "f10.txt" not in [e["path"] for e in load_index()]
+
+
+def test_locked_index_is_not_written(tmp_path, monkeypatch):
+    repo = init_repo(tmp_path)
+    monkeypatch.chdir(repo)
+    (repo / ".git" / "index.lock").write_text("")
+
+    result = runner.invoke(app, ["add", "f01.txt"])
+    assert result.exit_code == 1
+    assert "index.lock" in result.output
+    assert not (repo / ".git" / "index").exists()
+    assert (repo / ".git" / "index.lock").exists()
@@ -1,4 +1,5 @@
 import json
+import os
 import zlib
 import hashlib
 from typer.testing import CliRunner
@@ -42,3 +43,76 @@ def test_write_tree(tmp_path, monkeypatch):
 
     obj_path = git_dir / "objects" / oid[:2] / oid[2:]
     assert obj_path.exists(), f"Tree object file does not exist at {obj_path}"
+
+
+def test_write_tree_only_rehashes_dirty_directories(tmp_path, monkeypatch):
+    import subprocess
+    import git_scratch.utils.tree as tree_module
+
+    subprocess.run(["git", "init"], cwd=tmp_path, check=True)
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "c").mkdir()
+    (tmp_path / "a" / "b" / "x.txt").write_text("x\n")
+    (tmp_path / "a" / "z.txt").write_text("z\n")
+    (tmp_path / "a.txt").write_text("a\n")
+    (tmp_path / "c" / "y.txt").write_text("y\n")
+    monkeypatch.chdir(tmp_path)
+    assert runner.invoke(app, ["add", "."]).exit_code == 0
+
+    written = []
+    original = tree_module.write_object
+    monkeypatch.setattr(tree_module, "write_object", lambda c, t: written.append(t) or original(c, t))
+
+    def git_tree():
+        # Computed by Git from a separate index, so that it does not use ours
+        env = {**os.environ, "GIT_INDEX_FILE": str(tmp_path / ".git" / "git-index")}
+        subprocess.run(["git", "add", "-A"], cwd=tmp_path, env=env, check=True)
+        return subprocess.check_output(["git", "write-tree"], cwd=tmp_path, env=env).decode().strip()
+
+    result = runner.invoke(app, ["write-tree"])
+    assert result.exit_code == 0, result.output
+    assert result.stdout.strip() == git_tree()
+    assert len(written) == 4  # root, a, a/b and c
+
+    # Unchanged index: the root comes straight from the cache-tree
+    written.clear()
+    assert runner.invoke(app, ["write-tree"]).stdout.strip() == git_tree()
+    assert written == []
+
+    # Only c/ and the root are rebuilt
+    (tmp_path / "c" / "y.txt").write_text("changed\n")
+    assert runner.invoke(app, ["add", "c/y.txt"]).exit_code == 0
+    result = runner.invoke(app, ["write-tree"])
+    assert len(written) == 2
+    assert result.stdout.strip() == git_tree()
+
+
+def test_write_tree_matches_git_ordering_serial_and_parallel(tmp_path, monkeypatch):
+    import subprocess
+
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    # Directories sort as if their name ended with "/"
+    for rel in ["a-b", "a.txt", "a/x", "a0", "a/b/c", "ab/y", "z"]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel)
+    deep = tmp_path.joinpath(*[f"d{i}" for i in range(60)])
+    deep.mkdir(parents=True)
+    (deep / "leaf.txt").write_text("leaf")
+    monkeypatch.chdir(tmp_path)
+    subprocess.run(["git", "add", "-A"], cwd=tmp_path, check=True)
+
+    oids = []
+    for args in (["write-tree", "-j", "4"], ["write-tree"]):
+        # A fresh index has no cache-tree: every tree is built
+        os.remove(tmp_path / ".git" / "index")
+        assert runner.invoke(app, ["add", "."]).exit_code == 0
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.output
+        oids.append(result.stdout.strip())
+        if "-j" in args:
+            # Every tree was stored by the parallel run, before anything else writes them
+            listing = subprocess.check_output(["git", "ls-tree", "-r", "-t", oids[0]], cwd=tmp_path).decode()
+            assert "leaf.txt" in listing
+    expected = subprocess.check_output(["git", "write-tree"], cwd=tmp_path).decode().strip()
+    assert oids == [expected, expected]